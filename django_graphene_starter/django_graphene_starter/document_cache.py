@@ -0,0 +1,91 @@
+import hashlib
+from collections import OrderedDict, namedtuple
+from functools import partial
+from threading import Lock
+from typing import Callable, Hashable
+
+from django.conf import settings
+from graphql import GraphQLSchema, parse, validate
+from graphql.backend.base import GraphQLBackend, GraphQLDocument
+from graphql.execution import ExecutionResult, execute
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+
+class DocumentCache:
+    """
+    A bounded, thread-safe LRU cache of GraphQL documents
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.documents = OrderedDict()
+        self.lock = Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get_or_create(self, key: Hashable, create: Callable[[], GraphQLDocument]) -> GraphQLDocument:
+        with self.lock:
+            if key in self.documents:
+                self.hits += 1
+                self.documents.move_to_end(key)
+                return self.documents[key]
+
+            self.misses += 1
+
+        # Parse and validate outside of the lock, two threads missing on the same key at once would both build the document
+        document = create()
+
+        with self.lock:
+            self.documents[key] = document
+            self.documents.move_to_end(key)
+
+            while len(self.documents) > self.maxsize:
+                self.documents.popitem(last=False)
+                self.evictions += 1
+
+        return document
+
+    def cache_info(self) -> CacheInfo:
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self.documents))
+
+    def clear(self) -> None:
+        with self.lock:
+            self.documents.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+class CachedDocumentBackend(GraphQLBackend):
+    """
+    A GraphQL backend which parses and validates each distinct query once, then serves its document from the cache
+
+    Documents failing validation are cached too, their `execute` returns the validation errors.
+    """
+
+    def __init__(self, cache: DocumentCache):
+        self.cache = cache
+
+    def document_from_string(self, schema: GraphQLSchema, request_string: str) -> GraphQLDocument:
+        assert isinstance(request_string, str), 'The query must be a string'
+
+        key = (id(schema), hashlib.sha256(request_string.encode('utf-8')).hexdigest())
+        return self.cache.get_or_create(key, partial(build_document, schema, request_string))
+
+
+def build_document(schema: GraphQLSchema, request_string: str) -> GraphQLDocument:
+    document_ast = parse(request_string)
+    validation_errors = validate(schema, document_ast)
+
+    return GraphQLDocument(
+        schema=schema,
+        document_string=request_string,
+        document_ast=document_ast,
+        execute=partial(_invalid, validation_errors) if validation_errors else partial(execute, schema, document_ast),
+    )
+
+
+def _invalid(validation_errors, **kwargs) -> ExecutionResult:
+    return ExecutionResult(errors=validation_errors, invalid=True)
+
+
+document_cache = DocumentCache(maxsize=settings.GRAPHQL_DOCUMENT_CACHE_SIZE)
@@ -0,0 +1,376 @@
+import contextvars
+import json
+from collections import namedtuple
+from copy import copy
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from graphql import GraphQLArgument, GraphQLBoolean, GraphQLInt, GraphQLSchema, GraphQLString
+from graphql.execution.values import get_argument_values
+from graphql.language.ast import Argument, Document, Field, FragmentDefinition, FragmentSpread, InlineFragment, ListType, NamedType, Name, Node, NonNullType, OperationDefinition, SelectionSet, Variable, VariableDefinition
+from graphql.language.printer import print_ast
+from graphql.type.definition import GraphQLInterfaceType, GraphQLNamedType, GraphQLObjectType, get_named_type
+from graphql.type.directives import DirectiveLocation, GraphQLDirective, GraphQLIncludeDirective, GraphQLSkipDirective
+from graphql_relay import from_global_id
+
+GraphQLDeferDirective = GraphQLDirective(
+    name='defer',
+    description='Directs the server to deliver this fragment after the rest of the operation, with `Accept: multipart/mixed`.',
+    args={
+        'if': GraphQLArgument(type_=GraphQLBoolean, default_value=True, description='Deferred when true.'),
+        'label': GraphQLArgument(type_=GraphQLString, description='Identifies the deferred payloads.'),
+    },
+    locations=[DirectiveLocation.FRAGMENT_SPREAD, DirectiveLocation.INLINE_FRAGMENT],
+)
+
+GraphQLStreamDirective = GraphQLDirective(
+    name='stream',
+    description=(
+        'Directs the server to resolve and deliver the nodes of these connection edges past `initialCount` after the rest of the operation, '
+        'with `Accept: multipart/mixed`. Other lists are delivered with the initial payload.'
+    ),
+    args={
+        'if': GraphQLArgument(type_=GraphQLBoolean, default_value=True, description='Streamed when true.'),
+        'label': GraphQLArgument(type_=GraphQLString, description='Identifies the streamed payloads.'),
+        'initialCount': GraphQLArgument(type_=GraphQLInt, default_value=0, description='How many items to deliver in the initial payload.'),
+    },
+    locations=[DirectiveLocation.FIELD],
+)
+
+DIRECTIVES = [GraphQLIncludeDirective, GraphQLSkipDirective, GraphQLDeferDirective, GraphQLStreamDirective]
+
+INCREMENTAL_DIRECTIVES = {GraphQLDeferDirective.name, GraphQLStreamDirective.name}
+
+BOUNDARY = '-'
+
+MULTIPART_CONTENT_TYPE = f'multipart/mixed; boundary="{BOUNDARY}"; deferSpec=20220824'
+
+# The root field looking up nodes by global ID, see `starter.types.NodesField`
+NODES_FIELD = 'nodes'
+
+# The aliases the planner adds to the initial query and to the deferred queries
+ID_ALIAS = '_incrementalId'
+IDS_VARIABLE = '_incrementalIds'
+NODES_ALIAS = '_incrementalNodes'
+
+# The parts of an operation delivered after its initial payload, `path` leads from the root to the deferred or streamed selection,
+# and `query` resolves the deferred fragment or the nodes of the streamed edges by the IDs of the initial payload
+Deferred = namedtuple('Deferred', ['label', 'path', 'type_name', 'query'])
+Streamed = namedtuple('Streamed', ['label', 'path', 'initial_count', 'node_key', 'query'])
+IncrementalPlan = namedtuple('IncrementalPlan', ['query', 'deferred', 'streamed'])
+
+
+def plan_incremental_delivery(schema: GraphQLSchema, document_ast: Document, variables: Optional[Dict], operation_name: Optional[str]) -> Optional[IncrementalPlan]:
+    """
+    Split a query operation into the query of its initial payload, without its `@defer` fragments nor the nodes of its
+    `@stream` edges, and one query per deferred fragment or streamed edges, which resolves the fragment or the nodes by
+    the IDs of the initial payload. Return None if nothing is deferred or streamed.
+
+    graphql-core 2 resolves an operation as a whole, so the initial query selects the `id` of the objects which a fragment
+    is deferred on, and each deferred fragment is then executed once for all of them, e.g.
+
+    query reporters($_incrementalIds: [ID!]!) { _incrementalNodes: nodes(ids: $_incrementalIds) { ... on ReporterNode { ...Articles } } }
+
+    so that the fields leading to the deferred fragments are not resolved again. Only the fragments deferred on a type
+    implementing Node can be looked up this way, the others are delivered with the initial payload.
+
+    `@stream` on the edges of a connection keeps their cursors and the IDs of their nodes in the initial query. The nodes
+    within `initialCount` are resolved with the initial payload, the others afterwards, e.g. the nested `articles` of
+    `reporters { edges @stream { node { articles { ... } } } }`. The page itself is still fetched by the initial query,
+    and other lists are delivered with the initial payload.
+
+    Only the first level of `@defer` and `@stream` of the operation is honored, the ones nested in a deferred fragment
+    or in a fragment definition are delivered with it, which the incremental delivery RFC allows.
+    """
+    operations = [definition for definition in document_ast.definitions if isinstance(definition, OperationDefinition)]
+    operation = next((definition for definition in operations if operation_name is None or (definition.name and definition.name.value == operation_name)), None)
+
+    if operation is None or operation.operation != 'query' or (operation_name is None and len(operations) > 1):
+        return None
+
+    planner = _Planner(schema, document_ast, operation, variables or {})
+    selection_set = planner.transform(operation.selection_set, schema.get_query_type(), [])
+
+    if not planner.deferred and not planner.streamed:
+        return None
+
+    deferred = [Deferred(label, _get_keys(path), type_name, planner.build_nodes_query(type_name, [fragment])) for label, path, type_name, fragment in planner.deferred]
+    streamed = [
+        Streamed(label, _get_keys(path), initial_count, node_key, planner.build_nodes_query(type_name, selections))
+        for label, path, initial_count, node_key, type_name, selections in planner.streamed
+    ]
+    return IncrementalPlan(planner.build_query(selection_set), deferred, streamed)
+
+
+class _Planner:
+    def __init__(self, schema: GraphQLSchema, document_ast: Document, operation: OperationDefinition, variables: Dict):
+        self.schema = schema
+        self.operation = operation
+        self.variables = variables
+        self.fragments = {definition.name.value: _strip(definition) for definition in document_ast.definitions if isinstance(definition, FragmentDefinition)}
+        self.can_look_up_nodes = NODES_FIELD in schema.get_query_type().fields
+        self.deferred = []
+        self.streamed = []
+
+    def transform(self, selection_set: SelectionSet, parent_type: Optional[GraphQLNamedType], path: List) -> SelectionSet:
+        """
+        Return `selection_set` of `parent_type` without its deferred fragments, recording them and the streamed fields along the way
+        """
+        selections = []
+        deferred = False
+
+        for selection in selection_set.selections:
+            if isinstance(selection, Field):
+                key = (selection.alias or selection.name).value
+                field_type = self.get_field_type(parent_type, selection)
+                stream = self.get_directive_args(selection, GraphQLStreamDirective)
+                node_field = self.get_streamed_node_field(selection, field_type) if stream is not None else None
+
+                selection = _without_directives(selection)
+                if node_field is not None:
+                    node_type = get_named_type(field_type.fields['node'].type)
+                    self.streamed.append((stream.get('label'), path + [(key, selection)], max(stream.get('initialCount') or 0, 0), (node_field.alias or node_field.name).value, node_type.name, _strip(node_field).selection_set.selections))
+                    selection.selection_set = SelectionSet([_select_id(edge_selection) if edge_selection is node_field else _strip(edge_selection) for edge_selection in selection.selection_set.selections])
+
+                elif selection.selection_set:
+                    selection.selection_set = self.transform(selection.selection_set, field_type, path + [(key, selection)])
+
+            else:
+                defer = self.get_directive_args(selection, GraphQLDeferDirective)
+                if defer is not None and self.is_node_type(parent_type):
+                    self.deferred.append((defer.get('label'), path, parent_type.name, _strip(selection)))
+                    deferred = True
+                    continue
+
+                if isinstance(selection, InlineFragment):
+                    selection = _without_directives(selection)
+                    type_condition = self.schema.get_type(selection.type_condition.name.value) if selection.type_condition else parent_type
+                    selection.selection_set = self.transform(selection.selection_set, type_condition, path + [(None, selection)])
+                else:
+                    selection = _without_directives(selection)
+
+            selections.append(selection)
+
+        if deferred:
+            selections.append(Field(name=Name('id'), alias=Name(ID_ALIAS)))  # To look the deferred fragments up by, see `pop_deferred_targets`
+
+        return SelectionSet(selections)
+
+    def get_field_type(self, parent_type: Optional[GraphQLNamedType], selection: Field) -> Optional[GraphQLNamedType]:
+        field = parent_type.fields.get(selection.name.value) if isinstance(parent_type, (GraphQLObjectType, GraphQLInterfaceType)) else None
+        return get_named_type(field.type) if field else None  # e.g. `__typename`, or an invalid document
+
+    def get_streamed_node_field(self, selection: Field, field_type: Optional[GraphQLNamedType]) -> Optional[Field]:
+        """
+        Return the `node` selected by streamed connection edges, whose nodes can be looked up by ID, None for any other list
+        """
+        node = field_type.fields.get('node') if isinstance(field_type, GraphQLObjectType) else None
+        if node is None or not self.is_node_type(get_named_type(node.type)):
+            return None
+
+        node_fields = [edge_selection for edge_selection in selection.selection_set.selections if isinstance(edge_selection, Field) and edge_selection.name.value == 'node']
+        return node_fields[0] if len(node_fields) == 1 and node_fields[0].selection_set else None
+
+    def is_node_type(self, parent_type: Optional[GraphQLNamedType]) -> bool:
+        return self.can_look_up_nodes and isinstance(parent_type, GraphQLObjectType) and any(interface.name == 'Node' for interface in parent_type.interfaces)
+
+    def get_directive_args(self, node: Node, directive: GraphQLDirective) -> Optional[Dict]:
+        for directive_ast in node.directives or []:
+            if directive_ast.name.value == directive.name:
+                args = get_argument_values(directive.args, directive_ast.arguments, self.variables)
+                return args if args.get('if', True) else None
+
+        return None
+
+    def build_nodes_query(self, type_name: str, selections: List[Node]) -> str:
+        """
+        Print the query of a fragment deferred on `type_name`, or of the nodes of streamed edges, which resolves it on the nodes of `$_incrementalIds`
+        """
+        nodes = Field(
+            name=Name(NODES_FIELD),
+            alias=Name(NODES_ALIAS),
+            arguments=[Argument(Name('ids'), Variable(Name(IDS_VARIABLE)))],
+            selection_set=SelectionSet([InlineFragment(NamedType(Name(type_name)), SelectionSet(selections))]),
+        )
+        ids = VariableDefinition(Variable(Name(IDS_VARIABLE)), NonNullType(ListType(NonNullType(NamedType(Name('ID'))))))
+
+        return self.build_query(SelectionSet([nodes]), [ids])
+
+    def build_query(self, selection_set: SelectionSet, variable_definitions: List[VariableDefinition] = ()) -> str:
+        """
+        Print the operation with `selection_set`, the fragments and the variables it uses, any other would fail validation
+        """
+        fragment_names = set()
+        pending = [selection_set]
+
+        while pending:
+            for node in _walk(pending.pop()):
+                if isinstance(node, FragmentSpread) and node.name.value not in fragment_names and node.name.value in self.fragments:
+                    fragment_names.add(node.name.value)
+                    pending.append(self.fragments[node.name.value])
+
+        fragments = [definition for name, definition in self.fragments.items() if name in fragment_names]
+        variable_names = {node.name.value for root in [selection_set, *fragments] for node in _walk(root) if isinstance(node, Variable)}
+
+        operation = copy(self.operation)
+        operation.selection_set = selection_set
+        operation.variable_definitions = [*variable_definitions, *(definition for definition in self.operation.variable_definitions or [] if definition.variable.name.value in variable_names)]
+
+        return print_ast(Document([operation, *fragments]))
+
+
+def _get_keys(path: List) -> List[str]:
+    return [key for key, _ in path if key is not None]  # Inline fragments have no key
+
+
+def _select_id(node_field: Field) -> Field:
+    node_field = _without_directives(node_field)
+    node_field.selection_set = SelectionSet([Field(name=Name('id'), alias=Name(ID_ALIAS))])  # To look the streamed nodes up by, see `get_streamed_ids`
+    return node_field
+
+
+def _without_directives(node: Node) -> Node:
+    node = copy(node)
+    node.directives = [directive for directive in node.directives or [] if directive.name.value not in INCREMENTAL_DIRECTIVES]
+    return node
+
+
+def _strip(node: Node) -> Node:
+    """
+    Return a copy of `node` without any `@defer` or `@stream`, which are then delivered with their parent
+    """
+    if hasattr(node, 'directives'):
+        node = _without_directives(node)
+
+    if getattr(node, 'selection_set', None):
+        node = copy(node)
+        node.selection_set = SelectionSet([_strip(selection) for selection in node.selection_set.selections])
+
+    return node
+
+
+def _walk(node: Any) -> Iterator[Node]:
+    if isinstance(node, list):
+        for item in node:
+            yield from _walk(item)
+
+    elif isinstance(node, Node):
+        yield node
+        for attr in node.__slots__:
+            if attr != 'loc':
+                yield from _walk(getattr(node, attr, None))
+
+
+def split_streamed_edges(data: Dict, stream: Streamed) -> Tuple[List[Dict], List[Tuple[List, List[Dict]]]]:
+    """
+    Return the streamed edges of `data` within their initial count, and the `(path, edges)` past it of each streamed list, removed from `data`
+    """
+    initial_edges, later_edges = [], []
+
+    for path, edges in _find(data, stream.path, [], expand_lists=False):
+        if isinstance(edges, list):
+            initial_edges.extend(edges[:stream.initial_count])
+
+            if len(edges) > stream.initial_count:
+                later_edges.append(([*path, stream.initial_count], edges[stream.initial_count:]))
+                del edges[stream.initial_count:]
+
+    return initial_edges, later_edges
+
+
+def get_streamed_ids(stream: Streamed, edges: Iterable[Dict]) -> List[str]:
+    return [edge[stream.node_key][ID_ALIAS] for edge in edges if isinstance(edge, dict) and isinstance(edge.get(stream.node_key), dict)]
+
+
+def set_streamed_nodes(data: Optional[Dict], stream: Streamed, edges: List[Dict]) -> None:
+    """
+    Replace the IDs of the nodes of `edges` with the nodes resolved by the query of `stream`, in the order of `get_streamed_ids`
+    """
+    nodes = iter((data or {}).get(NODES_ALIAS) or [])
+
+    for edge in edges:
+        if isinstance(edge, dict) and isinstance(edge.get(stream.node_key), dict):
+            edge[stream.node_key] = next(nodes, None)
+
+
+def get_streamed_results(stream: Streamed, later_edges: List[Tuple[List, List[Dict]]]) -> List[Dict]:
+    return [_with_label({'items': edges, 'path': path}, stream.label) for path, edges in later_edges]
+
+
+def pop_deferred_targets(data: Dict, deferred: List[Deferred]) -> List[List[Tuple[List, str]]]:
+    """
+    Return the `(path, ID)` of the objects of `data` which each deferred fragment applies to, then remove the IDs selected for them
+    """
+    targets = [
+        [(path, value[ID_ALIAS]) for path, value in _find(data, part.path, [], expand_lists=True) if isinstance(value, dict) and _is_of_type(value.get(ID_ALIAS), part.type_name)]
+        for part in deferred
+    ]
+
+    for part in deferred:
+        for _, value in _find(data, part.path, [], expand_lists=True):
+            if isinstance(value, dict):
+                value.pop(ID_ALIAS, None)
+
+    return targets
+
+
+def _is_of_type(global_id: Optional[str], type_name: str) -> bool:
+    try:
+        return global_id is not None and from_global_id(global_id)[0] == type_name
+    except (TypeError, ValueError):
+        return False
+
+
+def get_deferred_results(data: Optional[Dict], deferred: Deferred, targets: List[Tuple[List, str]]) -> List[Dict]:
+    """
+    Return an incremental result per object which the deferred fragment applies to, from the nodes of its query, in the order of `targets`
+    """
+    nodes = (data or {}).get(NODES_ALIAS) or []
+    return [_with_label({'data': node, 'path': path}, deferred.label) for (path, _), node in zip(targets, nodes) if isinstance(node, dict)]
+
+
+def _find(value: Any, keys: List[str], path: List, expand_lists: bool) -> Iterator:
+    if isinstance(value, list) and (keys or expand_lists):
+        for index, item in enumerate(value):
+            yield from _find(item, keys, [*path, index], expand_lists)
+
+    elif not keys:
+        yield path, value
+
+    elif isinstance(value, dict) and keys[0] in value:
+        yield from _find(value[keys[0]], keys[1:], [*path, keys[0]], expand_lists)
+
+
+def _with_label(result: Dict, label: Optional[str]) -> Dict:
+    return {**result, 'label': label} if label is not None else result
+
+
+def iter_in_context(iterator: Iterator) -> Iterator:
+    """
+    Advance `iterator` within a context of its own, e.g. a generator of payloads holding `record_operation` open while
+    the response is sent, so that its context variables neither leak into nor depend on the context consuming it
+    """
+    context = contextvars.copy_context()
+
+    try:
+        while True:
+            try:
+                yield context.run(next, iterator)
+            except StopIteration:
+                return
+    finally:
+        if hasattr(iterator, 'close'):
+            context.run(iterator.close)
+
+
+def iter_multipart(payloads: Iterator[Dict]) -> Iterator[bytes]:
+    """
+    Write each payload as a part of a `multipart/mixed` response, as expected by the incremental delivery clients, e.g. Apollo Client
+    """
+    for payload in payloads:
+        yield f'\r\n--{BOUNDARY}\r\nContent-Type: application/json; charset=utf-8\r\n\r\n{json.dumps(payload, separators=(",", ":"))}'.encode()
+
+    yield f'\r\n--{BOUNDARY}--\r\n'.encode()
+
+
+def accepts_incremental_delivery(accept: str) -> bool:
+    return 'multipart/mixed' in accept
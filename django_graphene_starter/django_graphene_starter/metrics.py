@@ -0,0 +1,220 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Upper bounds of the latency buckets, in seconds, the last bucket is +Inf
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Operation names are chosen by clients, the ones past this many are recorded as `other`
+MAX_OPERATIONS = 500
+
+
+class Histogram:
+    """
+    A histogram of fixed buckets, each observation costs a binary search and an increment
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile by linear interpolation within its bucket, like `histogram_quantile` of Prometheus
+        """
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        cumulative = 0
+
+        for index, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]  # Above the last bucket, the best known bound
+
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+
+            cumulative += count
+
+        return self.buckets[-1]
+
+    def cumulative_counts(self) -> Iterator[Tuple[str, int]]:
+        cumulative = 0
+        for bound, count in zip([*map(str, self.buckets), '+Inf'], self.counts):
+            cumulative += count
+            yield bound, cumulative
+
+
+class OperationStats:
+    __slots__ = ('name', 'sql_count', 'sql_time')
+
+    def __init__(self, name: Optional[str]):
+        self.name = name
+        self.sql_count = 0
+        self.sql_time = 0.0
+
+
+class Metrics:
+    """
+    Thread-safe, process-wide metrics of the GraphQL resolvers and operations, exported in the Prometheus text format
+
+    - resolvers: calls per `(parent type, field)`, and latency of a sample of them, see `MetricsMiddleware`
+    - operations: calls, latency, SQL queries and SQL time per operation name, see `record_operation`
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self.lock:
+            self.resolver_calls = defaultdict(int)
+            self.resolver_latencies = defaultdict(Histogram)
+            self.operation_calls = defaultdict(int)
+            self.operation_latencies = defaultdict(Histogram)
+            self.operation_sql_queries = defaultdict(int)
+            self.operation_sql_time = defaultdict(float)
+
+    def count_resolver(self, key: Tuple[str, str]) -> None:
+        with self.lock:
+            self.resolver_calls[key] += 1
+
+    def observe_resolver(self, key: Tuple[str, str], duration: float) -> None:
+        with self.lock:
+            self.resolver_latencies[key].observe(duration)
+
+    def observe_operation(self, stats: OperationStats, duration: float) -> None:
+        with self.lock:
+            name = stats.name or 'anonymous'
+            if name not in self.operation_calls and len(self.operation_calls) >= MAX_OPERATIONS:
+                name = 'other'
+
+            self.operation_calls[name] += 1
+            self.operation_latencies[name].observe(duration)
+            self.operation_sql_queries[name] += stats.sql_count
+            self.operation_sql_time[name] += stats.sql_time
+
+    def render(self, gauges: Dict[str, float] = None) -> str:
+        lines = []
+
+        with self.lock:
+            resolver_labels = {key: f'type="{escape(key[0])}",field="{escape(key[1])}"' for key in self.resolver_calls}
+            operation_labels = {name: f'operation="{escape(name)}"' for name in self.operation_calls}
+
+            add_metric(lines, 'graphql_resolver_calls_total', 'counter', 'Calls of each resolver.', [(resolver_labels[key], calls) for key, calls in self.resolver_calls.items()])
+            add_histogram(lines, 'graphql_resolver_duration_seconds', 'Latency of a sample of the calls of each resolver.', resolver_labels, self.resolver_latencies)
+            add_quantiles(lines, 'graphql_resolver_duration_quantile_seconds', 'Estimated quantiles of the latency of each resolver.', resolver_labels, self.resolver_latencies)
+
+            add_metric(lines, 'graphql_operations_total', 'counter', 'Executions of each operation.', [(operation_labels[name], calls) for name, calls in self.operation_calls.items()])
+            add_histogram(lines, 'graphql_operation_duration_seconds', 'Latency of each operation.', operation_labels, self.operation_latencies)
+            add_quantiles(lines, 'graphql_operation_duration_quantile_seconds', 'Estimated quantiles of the latency of each operation.', operation_labels, self.operation_latencies)
+            add_metric(lines, 'graphql_operation_sql_queries_total', 'counter', 'SQL queries sent by each operation.', [(operation_labels[name], count) for name, count in self.operation_sql_queries.items()])
+            add_metric(lines, 'graphql_operation_sql_duration_seconds_total', 'counter', 'Time spent in SQL queries by each operation.', [(operation_labels[name], total) for name, total in self.operation_sql_time.items()])
+
+        for name, value in (gauges or {}).items():
+            add_metric(lines, name, 'gauge', None, [('', value)])
+
+        return '\n'.join(lines) + '\n'
+
+
+def add_metric(lines: List[str], name: str, kind: str, help: Optional[str], samples: List[Tuple[str, float]]) -> None:
+    if help:
+        lines.append(f'# HELP {name} {help}')
+    lines.append(f'# TYPE {name} {kind}')
+    lines.extend(f'{name}{{{labels}}} {value}' if labels else f'{name} {value}' for labels, value in samples)
+
+
+def add_histogram(lines: List[str], name: str, help: str, labels: Dict, histograms: Dict[Hashable, Histogram]) -> None:
+    lines.append(f'# HELP {name} {help}')
+    lines.append(f'# TYPE {name} histogram')
+
+    for key, histogram in histograms.items():
+        lines.extend(f'{name}_bucket{{{labels[key]},le="{bound}"}} {count}' for bound, count in histogram.cumulative_counts())
+        lines.append(f'{name}_sum{{{labels[key]}}} {histogram.sum}')
+        lines.append(f'{name}_count{{{labels[key]}}} {histogram.count}')
+
+
+def add_quantiles(lines: List[str], name: str, help: str, labels: Dict, histograms: Dict[Hashable, Histogram]) -> None:
+    samples = [(f'{labels[key]},quantile="{q}"', histogram.quantile(q)) for key, histogram in histograms.items() for q in QUANTILES]
+    add_metric(lines, name, 'gauge', help, samples)
+
+
+def escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+_current_operation = ContextVar('current_operation', default=None)
+
+
+@contextmanager
+def record_operation(name: Optional[str] = None) -> Iterator[OperationStats]:
+    """
+    Record the latency and the SQL queries of the GraphQL operation executed within, see `set_operation_name`
+
+    The statistics follow the context, e.g. into `sync_to_async`, so that the queries sent from the ORM thread are counted too.
+    """
+    for connection in connections.all():
+        install_sql_recorder(connection)  # Connections created before this module was imported
+
+    stats = OperationStats(name)
+    token = _current_operation.set(stats)
+    started_at = time.perf_counter()
+
+    try:
+        yield stats
+    finally:
+        _current_operation.reset(token)
+        metrics.observe_operation(stats, time.perf_counter() - started_at)
+
+
+def set_operation_name(name: Optional[str]) -> None:
+    """
+    Name the operation being recorded once it is parsed, unless it was named beforehand, e.g. `batch`
+    """
+    stats = _current_operation.get()
+    if stats is not None and stats.name is None:
+        stats.name = name
+
+
+def record_sql(execute, sql, params, many, context):
+    """
+    A database execute wrapper counting the queries of the operation being recorded
+    """
+    stats = _current_operation.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_count += 1
+        stats.sql_time += time.perf_counter() - started_at
+
+
+def install_sql_recorder(connection, **kwargs) -> None:
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_sql)  # First, as `connection.execute_wrapper()` pops the last one on exit
+
+
+connection_created.connect(install_sql_recorder)
+
+metrics = Metrics()
@@ -1,7 +1,29 @@
+import asyncio
+import random
+import time
+from functools import lru_cache, partial
+from typing import Callable, Dict, FrozenSet, Optional, Tuple, Type
+
 import starter.loaders as loaders
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Model
 from graphene import ResolveInfo
+from graphene.relay import GlobalID
+from graphene.types.resolver import attr_resolver, dict_or_attr_resolver, dict_resolver
+from graphene_django import DjangoObjectType
+from graphene_django.debug import DjangoDebugMiddleware
+from graphql import GraphQLEnumType, GraphQLObjectType, GraphQLScalarType, GraphQLSchema, get_named_type
+from graphql.execution.middleware import MiddlewareManager, get_middleware_resolvers, middleware_chain
+from graphql_jwt.middleware import JSONWebTokenMiddleware
+from promise import Promise
+from promise.dataloader import DataLoader
 from sentry_sdk import capture_exception
-from starter.types import ArticleNode, ReporterNode
+from starter.fields import QuerySetEdges
+
+from django_graphene_starter.metrics import metrics
+from django_graphene_starter.n_plus_one import is_detecting, resolving_field
 
 
 class SentryMiddleware(object):
@@ -28,17 +50,265 @@ class SentryMiddleware(object):
         return next(root, info, **args).catch(self.on_error)
 
 
+class MetricsMiddleware:
+    """
+    Count the calls of every resolver and time a `GRAPHQL_METRICS_SAMPLE_RATE` sample of them, see `django_graphene_starter.metrics`
+
+    NOTE: It must be placed last, so that it times the other middlewares too
+    """
+
+    def resolve(self, next, root, info: ResolveInfo, **args) -> Promise:
+        key = (info.parent_type.name, info.field_name)
+        metrics.count_resolver(key)
+
+        if random.random() >= settings.GRAPHQL_METRICS_SAMPLE_RATE:
+            return next(root, info, **args)
+
+        started_at = time.perf_counter()
+        promise = next(root, info, **args)
+
+        def observe(_) -> None:
+            metrics.observe_resolver(key, time.perf_counter() - started_at)
+
+        if promise.is_pending:
+            promise.then(observe, observe)  # e.g. DataLoader fields, which resolve once their batch is dispatched
+        else:
+            observe(None)
+
+        return promise
+
+
+class NPlusOneMiddleware:
+    """
+    Attribute the SQL queries of each resolver to its `(type, field)` while N+1 queries are detected, see `django_graphene_starter.n_plus_one`
+
+    NOTE: It must be placed first, so that a field sent to the ORM thread by `SyncToAsyncMiddleware` is attributed there too
+    """
+
+    def resolve(self, next, root, info: ResolveInfo, **args) -> Promise:
+        if not is_detecting():
+            return next(root, info, **args)
+
+        with resolving_field(info.operation.name.value if info.operation.name else None, (info.parent_type.name, info.field_name)):
+            return next(root, info, **args)
+
+
 class Loaders:
+    """
+    The DataLoaders of a request, each one instantiated on first use from the classes of `starter.loaders`, e.g.
+
+    info.context.loaders.get(Reporter, 'articles').load(reporter.id)
+    """
+
     def __init__(self):
-        self.reporter_by_article_loader = loaders.generate_loader(ReporterNode, "id")()
-        self.articles_by_reporter_loader = loaders.generate_loader_by_foreign_key(ArticleNode, 'reporter_id')()
+        self.instances = {}
 
-        self.articles_by_publication_loader = loaders.generate_loader_by_many_to_many_key(ArticleNode, 'publications')()  # FIXME: This is not working as expected
+    def create_loader(self, Loader: Type[DataLoader]) -> DataLoader:
+        return Loader()
+
+    def get(self, model: Type[Model], attr: str) -> DataLoader:
+        """
+        Return the loader of `attr` of `model` instances by primary key, see `starter.loaders.get_loader_class`
+        """
+        if (model, attr) not in self.instances:
+            self.instances[(model, attr)] = self.create_loader(loaders.get_loader_class(model, attr))
+
+        return self.instances[(model, attr)]
+
+    def get_count_loader(self, Type: DjangoObjectType, attr: str) -> DataLoader:
+        """
+        Return the loader counting `Type` rows grouped by `attr`, e.g. (PublicationNode, 'articles') for `article.publications.totalCount`
+        """
+        if (Type, attr) not in self.instances:
+            self.instances[(Type, attr)] = self.create_loader(loaders.get_count_loader_class(Type, attr))
+
+        return self.instances[(Type, attr)]
+
+
+class AsyncLoaders(Loaders):
+    """
+    The same loaders as `Loaders`, batching on the running event loop instead, see `AsyncGraphQLView`
+    """
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        super().__init__()
+
+    def create_loader(self, Loader: Type[DataLoader]) -> loaders.AsyncDataLoader:
+        return loaders.AsyncDataLoader(self.loop, loaders.generate_async_batch_load_fn(Loader))
 
 
 class LoaderMiddleware:
+    """
+    Attach `Loaders` to the context of operations executed outside of the views, e.g. `schema.execute`
+
+    The views attach them when the request starts, see `RateLimitedGraphQLView.dispatch`
+    """
+
     def resolve(self, next, root, info: ResolveInfo, **args):
         if not hasattr(info.context, 'loaders'):
             info.context.loaders = Loaders()
 
         return next(root, info, **args)
+
+
+class SyncToAsyncMiddleware:
+    """
+    Resolve fields on the event loop, sending the resolvers which hit the database to the ORM thread (through `sync_to_async`)
+
+    Where each field resolves is decided before its resolver runs, so that none runs twice, see `is_resolved_without_query`:
+    DataLoader fields, counted or prefetched connections and loaded attributes stay on the event loop, root fields and any
+    other resolver go to the ORM thread. The lazy `QuerySetEdges` of large pages would query while their list is completed,
+    they are fetched on the ORM thread too.
+    """
+
+    def resolve(self, next, root, info: ResolveInfo, **args) -> Promise:
+        if not is_resolved_without_query(root, info, args):
+            return Promise.resolve(asyncio.ensure_future(sync_to_async(next)(root, info, **args)))
+
+        promise = next(root, info, **args)
+        if promise.is_fulfilled and isinstance(promise.get(), QuerySetEdges):
+            return Promise.resolve(asyncio.ensure_future(sync_to_async(list)(promise.get())))
+
+        return promise
+
+
+def is_resolved_without_query(root, info: ResolveInfo, args: Dict) -> bool:
+    """
+    Whether a field resolves without sending a SQL query:
+
+    - root fields never do, e.g. connections and node lookups
+    - resolvers marked with `starter.fields.resolves_without_query` do when their predicate holds,
+      and so do the connections of such resolvers, e.g. a DjangoConnectionField paginating the list of a DataLoader
+    - default resolvers do unless they read a relation or a deferred field which is not loaded yet, see `is_loaded_attribute`
+    - any other resolver is assumed to send queries
+    """
+    if len(info.path) == 1:
+        return False
+
+    predicate = get_query_free_predicate(info.parent_type.fields[info.field_name].resolver)
+    return predicate is not None and predicate(root, info, **args)
+
+
+def get_query_free_predicate(resolver: Callable) -> Optional[Callable[..., bool]]:
+    func, bound_args, bound_kwargs = (resolver.func, resolver.args, resolver.keywords) if isinstance(resolver, partial) else (resolver, (), {})
+
+    predicate = is_loaded_attribute if func in DEFAULT_RESOLVERS else getattr(func, 'resolves_without_query', None)
+    if predicate is None and getattr(func, '__name__', None) == 'connection_resolver' and bound_args:
+        return getattr(bound_args[0], 'resolves_without_query', None)  # The resolver of the connection, called with `(root, info, **args)`
+
+    return partial(predicate, *bound_args, **bound_kwargs) if predicate is not None else None
+
+
+def is_loaded_attribute(attname: str, default_value, root, info: ResolveInfo, **args) -> bool:
+    """
+    Whether reading `attname` of `root` sends no query, i.e. it is neither a relation to one object which is not cached yet,
+    e.g. `article.reporter` without `select_related`, nor a field deferred by `only`
+    """
+    if not isinstance(root, Model):
+        return True
+
+    try:
+        field = root._meta.get_field(attname)
+    except FieldDoesNotExist:
+        return True  # e.g. a property
+
+    if field.many_to_one or field.one_to_one:
+        return field.is_cached(root)
+
+    return not field.concrete or field.attname in root.__dict__
+
+
+# Middlewares which set up the context of an operation, running them on its root fields is enough
+OPERATION_MIDDLEWARES = (DjangoDebugMiddleware, JSONWebTokenMiddleware, LoaderMiddleware)
+
+DEFAULT_RESOLVERS = (attr_resolver, dict_resolver, dict_or_attr_resolver)
+
+
+class FieldMiddlewareManager(MiddlewareManager):
+    """
+    Only run the middlewares where they are needed, instead of on every single field:
+
+    - root fields run every middleware
+    - the other fields skip `OPERATION_MIDDLEWARES`, whose work is done once the root fields ran,
+      e.g. `context.user` was authenticated and `context.loaders` created
+    - scalar fields read from an attribute of their parent which `only` cannot defer (e.g. `id`) run no middleware at all,
+      they neither hit the database nor raise, so a middleware would only add a call and a Promise per field.
+      The deferrable fields of models (e.g. `headline`) still run them, should they be loaded on the ORM thread
+      by `SyncToAsyncMiddleware` and be attributed by `NPlusOneMiddleware`
+
+    NOTE: JSONWebTokenMiddleware authenticates nested fields by their root field, unless `JWT_ALLOW_ARGUMENT` is set
+    """
+
+    __slots__ = ('trivial_resolvers', 'root_resolvers', 'field_middlewares')
+
+    def __init__(self, schema: GraphQLSchema, *middlewares, **kwargs):
+        super().__init__(*middlewares, **kwargs)
+        self.trivial_resolvers, self.root_resolvers = get_resolver_kinds(schema)
+
+        allow_argument = getattr(settings, 'GRAPHQL_JWT', {}).get('JWT_ALLOW_ARGUMENT', False)
+        operation_middlewares = tuple(Middleware for Middleware in OPERATION_MIDDLEWARES if not (allow_argument and Middleware is JSONWebTokenMiddleware))
+        self.field_middlewares = list(get_middleware_resolvers([middleware for middleware in middlewares if not isinstance(middleware, operation_middlewares)]))
+
+    def get_field_resolver(self, field_resolver: Callable) -> Callable:
+        if field_resolver in self.trivial_resolvers:
+            return field_resolver
+
+        if field_resolver in self.root_resolvers:
+            return super().get_field_resolver(field_resolver)
+
+        if field_resolver not in self._cached_resolvers:
+            self._cached_resolvers[field_resolver] = middleware_chain(field_resolver, self.field_middlewares, wrap_in_promise=self.wrap_in_promise)
+
+        return self._cached_resolvers[field_resolver]
+
+
+@lru_cache(maxsize=None)
+def get_resolver_kinds(schema: GraphQLSchema) -> Tuple[FrozenSet[Callable], FrozenSet[Callable]]:
+    """
+    Return the resolvers of the trivial fields and of the root fields of `schema`, see `FieldMiddlewareManager`
+    """
+    root_types = [graphql_type for graphql_type in (schema.get_query_type(), schema.get_mutation_type(), schema.get_subscription_type()) if graphql_type]
+    root_resolvers = {field.resolver for graphql_type in root_types for field in graphql_type.fields.values()}
+
+    trivial_resolvers = {
+        field.resolver
+        for graphql_type in schema.get_type_map().values()
+        if isinstance(graphql_type, GraphQLObjectType) and graphql_type not in root_types
+        for field in graphql_type.fields.values()
+        if is_trivial_field(graphql_type, field)
+    }
+
+    return frozenset(trivial_resolvers), frozenset(root_resolvers - {None})
+
+
+def is_trivial_field(graphql_type: GraphQLObjectType, field) -> bool:
+    if not isinstance(get_named_type(field.type), (GraphQLScalarType, GraphQLEnumType)):
+        return False
+
+    resolver = field.resolver
+    if isinstance(resolver, partial) and resolver.func is GlobalID.id_resolver:
+        resolver = resolver.args[0]
+
+    return is_attribute_resolver(resolver) and not is_deferrable_attribute(graphql_type, resolver)
+
+
+def is_deferrable_attribute(graphql_type: GraphQLObjectType, resolver: Callable) -> bool:
+    """
+    Whether the attribute read by a default resolver is a field which `only` may defer, i.e. a concrete field of the model
+    of a DjangoObjectType other than its primary key
+    """
+    model = getattr(getattr(getattr(graphql_type, 'graphene_type', None), '_meta', None), 'model', None)
+    if model is None or resolver is DjangoObjectType.resolve_id:
+        return False
+
+    try:
+        field = model._meta.get_field(resolver.args[0])
+    except FieldDoesNotExist:
+        return False  # e.g. a property
+
+    return field.concrete and not field.primary_key
+
+
+def is_attribute_resolver(resolver: Callable) -> bool:
+    return resolver is DjangoObjectType.resolve_id or (isinstance(resolver, partial) and resolver.func in DEFAULT_RESOLVERS)
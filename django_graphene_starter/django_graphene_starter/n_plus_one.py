@@ -0,0 +1,129 @@
+import logging
+import random
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# e.g. `IN (%s, %s, %s)`, whose length depends on the batch
+_PLACEHOLDER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+
+# A query issued more than `GRAPHQL_N_PLUS_ONE_THRESHOLD` times, with the `(type, field)` which issued it
+RepeatedQuery = Tuple[Optional[str], Tuple[str, str], str, int]
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+class QueryDetector:
+    """
+    Count the SQL queries of the operations being executed per `(operation name, (type, field), fingerprint)`
+
+    Queries are attributed to the resolver running when they are sent, see `NPlusOneMiddleware`. The queries sent
+    outside of a resolver, e.g. by a DataLoader dispatching its batch, are not counted: they run once per batch.
+    """
+
+    __slots__ = ('threshold', 'counts')
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.counts = Counter()
+
+    def record(self, field: Tuple[Optional[str], Tuple[str, str]], sql: str) -> None:
+        if not sql.startswith('EXPLAIN'):  # Sent by django-silk for the query before
+            self.counts[(*field, get_fingerprint(sql))] += 1
+
+    def get_repeated_queries(self) -> List[RepeatedQuery]:
+        return [(operation_name, path, fingerprint, count) for (operation_name, path, fingerprint), count in self.counts.items() if count > self.threshold]
+
+
+def get_fingerprint(sql: str) -> str:
+    """
+    Return the shape of a query, e.g. `SELECT ... WHERE "id" IN (...)`, the parameters being sent apart from the SQL
+    """
+    return _PLACEHOLDER_LIST.sub('(...)', sql)
+
+
+_current_detector = ContextVar('current_detector', default=None)
+_current_field = ContextVar('current_field', default=None)
+
+
+@contextmanager
+def detect_n_plus_one() -> Iterator[Optional[QueryDetector]]:
+    """
+    Detect the queries repeated by the same resolver within the GraphQL operations executed within, i.e. N+1 queries
+
+    With `GRAPHQL_N_PLUS_ONE_RAISE`, e.g. in tests, every operation is checked and `NPlusOneError` is raised once it completes.
+    Otherwise, a `GRAPHQL_N_PLUS_ONE_SAMPLE_RATE` sample of the operations is checked and a warning is logged.
+    """
+    if _current_detector.get() is not None or not (settings.GRAPHQL_N_PLUS_ONE_RAISE or random.random() < settings.GRAPHQL_N_PLUS_ONE_SAMPLE_RATE):
+        yield None
+        return
+
+    for connection in connections.all():
+        install_query_detector(connection)  # Connections created before this module was imported
+
+    detector = QueryDetector(settings.GRAPHQL_N_PLUS_ONE_THRESHOLD)
+    token = _current_detector.set(detector)
+
+    try:
+        yield detector
+    finally:
+        _current_detector.reset(token)
+
+    repeated_queries = detector.get_repeated_queries()
+    if not repeated_queries:
+        return
+
+    message = '\n'.join(f'{operation_name or "anonymous"}: {type_name}.{field_name} sent {count} times `{fingerprint}`' for operation_name, (type_name, field_name), fingerprint, count in repeated_queries)
+
+    if settings.GRAPHQL_N_PLUS_ONE_RAISE:
+        raise NPlusOneError(f'N+1 queries detected, batch them with `select_related`, `prefetch_related` or a DataLoader:\n{message}')
+
+    for operation_name, path, fingerprint, count in repeated_queries:
+        logger.warning(f'N+1 queries in {operation_name or "anonymous"} from {".".join(path)}: {count} x {fingerprint}', extra=dict(operation_name=operation_name, path='.'.join(path), count=count))
+
+
+def is_detecting() -> bool:
+    return _current_detector.get() is not None
+
+
+@contextmanager
+def resolving_field(operation_name: Optional[str], path: Tuple[str, str]) -> Iterator[None]:
+    """
+    Attribute the queries sent within to the resolver of `path`, e.g. `('ArticleNode', 'reporter')`
+    """
+    token = _current_field.set((operation_name, path))
+    try:
+        yield
+    finally:
+        _current_field.reset(token)
+
+
+def detect_sql(execute, sql, params, many, context):
+    """
+    A database execute wrapper counting the queries of the resolvers being detected
+    """
+    detector = _current_detector.get()
+    if detector is not None:
+        field = _current_field.get()
+        if field is not None:
+            detector.record(field, sql)
+
+    return execute(sql, params, many, context)
+
+
+def install_query_detector(connection, **kwargs) -> None:
+    if detect_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, detect_sql)  # First, as `connection.execute_wrapper()` pops the last one on exit
+
+
+connection_created.connect(install_query_detector)
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import logging
+from functools import partial
+from typing import Dict, Optional, Union
+
+from django.core.exceptions import ImproperlyConfigured
+from django.http.request import HttpRequest
+from graphql import GraphQLError, GraphQLSchema, parse, validate
+from graphql.backend.base import GraphQLBackend, GraphQLDocument
+from graphql.execution import execute
+
+logger = logging.getLogger(__name__)
+
+
+class PersistedQueryNotFound(GraphQLError):
+    """
+    Apollo clients retry with the full query text upon this error
+    """
+
+    def __init__(self):
+        super().__init__('PersistedQueryNotFound', extensions={'code': 'PERSISTED_QUERY_NOT_FOUND'})
+
+
+class PersistedQueryNotAllowed(GraphQLError):
+    def __init__(self):
+        super().__init__('Only persisted queries are allowed.', extensions={'code': 'PERSISTED_QUERY_NOT_ALLOWED'})
+
+
+class PersistedQueryRegistry:
+    """
+    A registry of queries which are parsed and validated once when the registry is loaded
+
+    The registry file is a JSON object mapping the SHA-256 hash of each query to its text, e.g.
+
+    ```json
+    {
+        "57e3cfcb6e0176e052f58d36762d900de1e4af4a3d5a773a336fc3610a80e228": "query articles { articles { totalCount } }"
+    }
+    ```
+    """
+
+    def __init__(self, schema: GraphQLSchema, queries: Dict[str, str] = None, only: bool = False):
+        self.schema = schema
+        self.only = only
+        self.queries_by_hash = {}
+        self.documents_by_query = {}
+
+        for sha256_hash, query in (queries or {}).items():
+            if get_query_hash(query) != sha256_hash:
+                raise ImproperlyConfigured(f'Persisted query {sha256_hash} does not match its SHA-256 hash.')
+
+            document_ast = parse(query)
+            validation_errors = validate(schema, document_ast)
+            if validation_errors:
+                raise ImproperlyConfigured(f'Persisted query {sha256_hash} is invalid: {validation_errors[0].message}')
+
+            self.queries_by_hash[sha256_hash] = query
+            self.documents_by_query[query] = GraphQLDocument(
+                schema=schema,
+                document_string=query,
+                document_ast=document_ast,
+                execute=partial(execute, schema, document_ast),  # Already validated above
+            )
+
+    @classmethod
+    def from_file(cls, schema: GraphQLSchema, path: Optional[str], only: bool = False) -> 'PersistedQueryRegistry':
+        if not path:
+            return cls(schema, only=only)
+
+        with open(path) as f:
+            queries = json.load(f)
+
+        logger.info(f'Loaded {len(queries)} persisted queries from {path}.')
+        return cls(schema, queries, only=only)
+
+    def get_document(self, query: str) -> Optional[GraphQLDocument]:
+        return self.documents_by_query.get(query)
+
+    def resolve_query(self, query: Optional[str], sha256_hash: Optional[str]) -> str:
+        """
+        Return the query text to execute given the query text and/or the persisted query hash of a request
+        """
+        if sha256_hash:
+            if sha256_hash in self.queries_by_hash:
+                return self.queries_by_hash[sha256_hash]
+
+            if not query:
+                raise PersistedQueryNotFound()
+
+            if get_query_hash(query) != sha256_hash:
+                raise GraphQLError('The provided sha256Hash does not match the query.')
+
+        if self.only and query not in self.documents_by_query:
+            raise PersistedQueryNotAllowed()
+
+        return query
+
+
+class PersistedQueryBackend(GraphQLBackend):
+    """
+    A GraphQL backend which serves the pre-parsed and pre-validated documents of persisted queries, falling back to another backend
+    """
+
+    def __init__(self, backend: GraphQLBackend, registry: PersistedQueryRegistry):
+        self.backend = backend
+        self.registry = registry
+
+    def document_from_string(self, schema: GraphQLSchema, request_string: str) -> GraphQLDocument:
+        document = self.registry.get_document(request_string) if schema is self.registry.schema else None
+        return document or self.backend.document_from_string(schema, request_string)
+
+
+def get_query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+def get_persisted_query_hash(request: HttpRequest, data: Union[Dict, None]) -> Optional[str]:
+    """
+    Get the persisted query hash from the `extensions` of a request, e.g.
+
+    {"extensions": {"persistedQuery": {"version": 1, "sha256Hash": "57e3cfcb6e0176e052f58d36762d900de1e4af4a3d5a773a336fc3610a80e228"}}}
+    """
+    extensions = request.GET.get('extensions') or (data or {}).get('extensions')
+
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            return None
+
+    if not isinstance(extensions, dict) or not isinstance(extensions.get('persistedQuery'), dict):
+        return None
+
+    return extensions['persistedQuery'].get('sha256Hash')
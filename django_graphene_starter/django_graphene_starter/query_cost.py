@@ -0,0 +1,192 @@
+from collections import namedtuple
+from typing import Dict, Optional, Set
+
+from django.conf import settings
+from graphene.relay import Connection
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError, GraphQLID, GraphQLInt
+from graphql.backend.base import GraphQLDocument
+from graphql.execution.base import ExecutionResult
+from graphql.language.ast import Field, FragmentDefinition, FragmentSpread, InlineFragment, OperationDefinition, SelectionSet
+from graphql.type.definition import GraphQLInterfaceType, GraphQLList, GraphQLNonNull, GraphQLObjectType, get_named_type, is_leaf_type
+from graphql.utils.value_from_ast import value_from_ast
+
+# `writes`: how many items the mutations of the operation write, at least 1 per mutation, see `django_graphene_starter.rate_limit`
+QueryCost = namedtuple('QueryCost', ['cost', 'depth', 'writes'], defaults=[0])
+
+
+def get_query_cost(document: GraphQLDocument, variables: Optional[Dict], operation_name: Optional[str]) -> QueryCost:
+    """
+    Return the cost of an operation, i.e. how many objects it may resolve at most, and the depth of its selection set
+
+    Connections multiply the cost of their nodes by their `first` or `last` argument, capped by `RELAY_CONNECTION_MAX_LIMIT`
+    which is also the page size when neither is given, e.g.
+
+    reporters(first: 10) { edges { node { articles(first: 5) { edges { node { reporter { id } } } } } } }
+
+    costs 10 reporters + 10 * 5 articles + 10 * 5 reporters = 110. Connections selecting no `edges`, e.g. only `totalCount`, count as 1,
+    lists of objects looked up by `ids`, e.g. `nodes`, count as many IDs, the payload lists of a mutation, e.g. the `reporters` and `errors`
+    of `createReporters`, count as many items as its longest input list, other lists of objects count as a full page and introspection fields are free.
+    """
+    operation = _get_operation(document.document_ast, operation_name)
+    root_type = _get_root_type(document.schema, operation.operation) if operation else None
+    if root_type is None:
+        return QueryCost(0, 0)  # An invalid document, which fails validation anyway
+
+    analyzer = _CostAnalyzer(document, operation, variables)
+    query_cost = analyzer.analyze(operation.selection_set, root_type, 1, 0)
+    return query_cost._replace(writes=analyzer.writes)
+
+
+def check_query_cost(query_cost: QueryCost) -> None:
+    """
+    Raise a GraphQLError if an operation exceeds `GRAPHQL_QUERY_MAX_COST` or `GRAPHQL_QUERY_MAX_DEPTH`, a limit of 0 is disabled
+    """
+    if settings.GRAPHQL_QUERY_MAX_DEPTH and query_cost.depth > settings.GRAPHQL_QUERY_MAX_DEPTH:
+        raise GraphQLError(f'The query has a depth of {query_cost.depth}, which exceeds the maximum depth of {settings.GRAPHQL_QUERY_MAX_DEPTH}.')
+
+    if settings.GRAPHQL_QUERY_MAX_COST and query_cost.cost > settings.GRAPHQL_QUERY_MAX_COST:
+        raise GraphQLError(
+            f'The query has a cost of {query_cost.cost}, which exceeds the maximum cost of {settings.GRAPHQL_QUERY_MAX_COST}. '
+            'Pass smaller `first` or `last` arguments to its connections.',
+        )
+
+
+def add_query_cost(query_cost: QueryCost, execution_result: ExecutionResult) -> ExecutionResult:
+    """
+    Report the cost of an operation in the `extensions` of its response
+    """
+    execution_result.extensions['cost'] = {
+        'requestedQueryCost': query_cost.cost,
+        'maximumQueryCost': settings.GRAPHQL_QUERY_MAX_COST,
+        'depth': query_cost.depth,
+    }
+    return execution_result
+
+
+def _get_operation(document_ast, operation_name: Optional[str]) -> Optional[OperationDefinition]:
+    operations = [definition for definition in document_ast.definitions if isinstance(definition, OperationDefinition)]
+
+    if operation_name is None:
+        return operations[0] if len(operations) == 1 else None
+
+    return next((operation for operation in operations if operation.name and operation.name.value == operation_name), None)
+
+
+def _get_root_type(schema, operation: str) -> Optional[GraphQLObjectType]:
+    if operation == 'mutation':
+        return schema.get_mutation_type()
+    if operation == 'subscription':
+        return schema.get_subscription_type()
+    return schema.get_query_type()
+
+
+class _CostAnalyzer:
+    def __init__(self, document: GraphQLDocument, operation: OperationDefinition, variables: Optional[Dict]):
+        self.schema = document.schema
+        self.fragments = {definition.name.value: definition for definition in document.document_ast.definitions if isinstance(definition, FragmentDefinition)}
+        self.variables = self.get_variables(operation, variables or {})
+        self.max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+        self.relay_types = set()
+        self.input_size = None  # The length of the longest input list of the mutation being analyzed
+        self.writes = 0
+
+    def get_variables(self, operation: OperationDefinition, variables: Dict) -> Dict:
+        defaults = {
+            definition.variable.name.value: value_from_ast(definition.default_value, GraphQLInt)
+            for definition in operation.variable_definitions or [] if definition.default_value is not None
+        }
+        return {**defaults, **variables}
+
+    def analyze(self, selection_set: Optional[SelectionSet], parent_type, multiplier: int, depth: int, fragments: Set[str] = frozenset()) -> QueryCost:
+        """
+        Return the cost of a selection set resolved once per each of `multiplier` parent objects, and its deepest field
+        """
+        cost, max_depth = 0, depth
+
+        for selection in selection_set.selections if selection_set else []:
+            if isinstance(selection, Field):
+                query_cost = self.analyze_field(selection, parent_type, multiplier, depth)
+
+            elif isinstance(selection, InlineFragment):
+                type_condition = self.schema.get_type(selection.type_condition.name.value) if selection.type_condition else parent_type
+                query_cost = self.analyze(selection.selection_set, type_condition, multiplier, depth, fragments)
+
+            elif isinstance(selection, FragmentSpread) and selection.name.value in self.fragments and selection.name.value not in fragments:
+                fragment = self.fragments[selection.name.value]
+                query_cost = self.analyze(fragment.selection_set, self.schema.get_type(fragment.type_condition.name.value), multiplier, depth, fragments | {selection.name.value})
+
+            else:
+                continue
+
+            cost += query_cost.cost
+            max_depth = max(max_depth, query_cost.depth)
+
+        return QueryCost(cost, max_depth)
+
+    def analyze_field(self, selection: Field, parent_type, multiplier: int, depth: int) -> QueryCost:
+        field = parent_type.fields.get(selection.name.value) if isinstance(parent_type, (GraphQLObjectType, GraphQLInterfaceType)) else None
+        if field is None or selection.name.value.startswith('__'):
+            return QueryCost(0, depth)  # Introspection fields, or an invalid document
+
+        field_type = get_named_type(field.type)
+        if is_leaf_type(field_type):
+            return QueryCost(0, depth + 1)
+
+        if parent_type.name in self.relay_types:
+            # `edges`, `node` and `pageInfo` of a connection, its nodes are already counted
+            return self.analyze(selection.selection_set, field_type, multiplier, depth + 1)
+
+        graphene_type = getattr(field_type, 'graphene_type', None)
+        if isinstance(graphene_type, type) and issubclass(graphene_type, Connection):
+            self.relay_types.update((graphene_type._meta.name, graphene_type.Edge._meta.name))
+            size = self.get_page_size(selection) if self.selects(selection.selection_set, 'edges') else 1  # e.g. only `totalCount`
+        elif isinstance(field.type.of_type if isinstance(field.type, GraphQLNonNull) else field.type, GraphQLList):
+            size = self.get_list_size(selection)
+        else:
+            size = 1
+
+        if parent_type is self.schema.get_mutation_type():
+            self.input_size = self.get_input_size(selection, field)
+            self.writes += max(self.input_size or 0, 1)
+
+        query_cost = self.analyze(selection.selection_set, field_type, multiplier * size, depth + 1)
+        return QueryCost(multiplier * size + query_cost.cost, query_cost.depth)
+
+    def selects(self, selection_set: Optional[SelectionSet], name: str) -> bool:
+        for selection in selection_set.selections if selection_set else []:
+            if isinstance(selection, Field) and selection.name.value == name:
+                return True
+            if isinstance(selection, InlineFragment) and self.selects(selection.selection_set, name):
+                return True
+            if isinstance(selection, FragmentSpread) and selection.name.value in self.fragments and self.selects(self.fragments[selection.name.value].selection_set, name):
+                return True
+
+        return False
+
+    def get_list_size(self, selection: Field) -> int:
+        ids = next((value_from_ast(argument.value, GraphQLList(GraphQLID), self.variables) for argument in selection.arguments or [] if argument.name.value == 'ids'), None)
+        if isinstance(ids, list):
+            return len(ids)
+
+        return self.input_size if self.input_size is not None else self.max_limit
+
+    def get_input_size(self, selection: Field, field) -> Optional[int]:
+        """
+        Return the length of the longest list given to a mutation, e.g. `input.reporters` of `createReporters`, None if there is none
+        """
+        sizes = []
+
+        for argument in selection.arguments or []:
+            definition = field.args.get(argument.name.value)
+            value = value_from_ast(argument.value, definition.type, self.variables) if definition else None
+            values = value.values() if isinstance(value, dict) else [value]  # The fields of an input object, e.g. `input`
+            sizes.extend(len(value) for value in values if isinstance(value, list))
+
+        return max(sizes) if sizes else None
+
+    def get_page_size(self, selection: Field) -> int:
+        arguments = [value_from_ast(argument.value, GraphQLInt, self.variables) for argument in selection.arguments or [] if argument.name.value in ('first', 'last')]
+        sizes = [max(argument, 0) for argument in arguments if isinstance(argument, int)]
+
+        return min(sizes + [self.max_limit])
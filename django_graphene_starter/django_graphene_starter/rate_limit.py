@@ -0,0 +1,123 @@
+import math
+import time
+from collections import namedtuple
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http.request import HttpRequest
+from django.http.response import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
+from ratelimit.core import user_or_ip
+from ratelimit.exceptions import Ratelimited
+
+from django_graphene_starter.query_cost import QueryCost
+
+RateLimit = namedtuple('RateLimit', ['limit', 'remaining', 'reset', 'retry_after'])
+
+
+class RatelimitMiddleware(MiddlewareMixin):
+    """
+    Mirrors django-ratelimit's middleware, answering `Ratelimited` with `RATELIMIT_VIEW`, except that it serves ASGI requests
+    on the event loop too instead of running every request on the single thread of synchronous middlewares, see `GRAPHQL_ASYNC`
+    """
+
+    def process_exception(self, request: HttpRequest, exception: Exception) -> Optional[HttpResponse]:
+        if not isinstance(exception, Ratelimited):
+            return None
+
+        return import_string(settings.RATELIMIT_VIEW)(request, exception)
+
+
+class TokenBucket:
+    """
+    A token bucket of `capacity` tokens refilled at `capacity / period` tokens per second, kept in the shared Django cache
+
+    Implemented as the generic cell rate algorithm: the cache holds the time at which the bucket is full again, in microseconds,
+    which each operation moves forward by its cost with an atomic `incr`, so that the limit holds across processes without
+    locks, e.g. gunicorn workers sharing Redis
+    """
+
+    def __init__(self, capacity: int, period: int):
+        self.capacity = capacity
+        self.period = period
+        self.interval = max(period * 1000000 // capacity, 1)  # Microseconds to refill a token
+
+    def consume(self, key: str, tokens: int) -> Tuple[bool, RateLimit]:
+        now = int(time.time() * 1000000)
+        increment = tokens * self.interval
+        burst = self.capacity * self.interval
+
+        cache.add(key, now, timeout=self.period)
+        try:
+            full_at = cache.incr(key, increment)
+        except ValueError:  # Expired since `add`
+            full_at = now + increment
+            cache.set(key, full_at, timeout=self.period)
+
+        if full_at - increment < now:
+            # The bucket was full, count from now. A concurrent `incr` may be overwritten, which only lets that operation through for free
+            full_at = now + increment
+            cache.set(key, full_at, timeout=self.period)
+        else:
+            cache.touch(key, timeout=self.period)
+
+        allowed = full_at - now <= burst
+        if not allowed:
+            cache.decr(key, increment)  # Rejected operations cost nothing
+            full_at -= increment
+
+        return allowed, RateLimit(
+            limit=self.capacity,
+            remaining=(burst - (full_at - now)) // self.interval,
+            reset=math.ceil((full_at - now) / 1000000),
+            retry_after=0 if allowed else math.ceil((full_at + increment - burst - now) / 1000000),
+        )
+
+
+def charge_operation(request: HttpRequest, query_cost: QueryCost, operation_type: str) -> None:
+    """
+    Charge an operation to the token bucket of the user or IP address of the request, raise Ratelimited if it runs out
+
+    Each operation costs its query cost, at least 1. Mutations cost `GRAPHQL_RATELIMIT_MUTATION_COST` more, plus 1 per item they write,
+    e.g. 100 for `createReporters` of 100 reporters, so that bulk mutations are charged by the size of their input rather than their payload.
+    The bucket holds `GRAPHQL_RATELIMIT_BUDGET` tokens and refills over `GRAPHQL_RATELIMIT_PERIOD` seconds.
+    """
+    charge_operations(request, [(query_cost, operation_type)])
+
+
+def charge_operations(request: HttpRequest, operations: List[Tuple[QueryCost, str]]) -> None:
+    """
+    Charge several `(query cost, operation type)` at once, e.g. a batch before any of its operations runs, so that they are either all allowed or all rejected
+    """
+    if not getattr(settings, 'RATELIMIT_ENABLE', True):
+        return
+
+    tokens = sum(
+        max(query_cost.cost, 1) + (settings.GRAPHQL_RATELIMIT_MUTATION_COST + query_cost.writes if operation_type == 'mutation' else 0)
+        for query_cost, operation_type in operations
+    )
+    bucket = TokenBucket(settings.GRAPHQL_RATELIMIT_BUDGET, settings.GRAPHQL_RATELIMIT_PERIOD)
+
+    allowed, request.rate_limit = bucket.consume(f'ratelimit:graphql:{user_or_ip(request)}', tokens)
+    if not allowed:
+        raise Ratelimited()
+
+
+def add_rate_limit_headers(request: HttpRequest, response: HttpResponse) -> HttpResponse:
+    """
+    Report the state of the token bucket after the last operation of the request, see `charge_operation`
+    """
+    rate_limit = getattr(request, 'rate_limit', None)
+    if rate_limit is None:
+        return response
+
+    response['RateLimit-Limit'] = rate_limit.limit
+    response['RateLimit-Remaining'] = rate_limit.remaining
+    response['RateLimit-Reset'] = rate_limit.reset
+
+    if rate_limit.retry_after:
+        response['Retry-After'] = rate_limit.retry_after
+
+    return response
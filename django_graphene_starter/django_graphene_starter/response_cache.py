@@ -0,0 +1,140 @@
+import hashlib
+import json
+from collections import namedtuple
+from typing import Dict, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Model
+from django.http.request import HttpRequest
+from graphene.relay import Connection
+from graphene_django import DjangoObjectType
+from graphql import GraphQLSchema
+from graphql.backend.base import GraphQLDocument
+from graphql.execution.base import ExecutionResult
+from graphql.language.ast import Field, FragmentDefinition, FragmentSpread, InlineFragment, OperationDefinition, SelectionSet
+from graphql.language.printer import print_ast
+from graphql.type.definition import GraphQLInterfaceType, GraphQLObjectType, GraphQLUnionType, get_named_type
+from graphql_jwt.utils import get_http_authorization
+from starter.cache import get_model_version, is_cache_shared
+
+DocumentInfo = namedtuple('DocumentInfo', ['hash', 'models', 'debug'])
+
+_document_infos = WeakKeyDictionary()
+
+
+def get_response_cache_key(request: HttpRequest, document: GraphQLDocument, variables: Optional[Dict], operation_name: Optional[str]) -> Optional[str]:
+    """
+    Return the key under which the response of a query operation is cached, None if it must not be cached,
+    i.e. mutations, `_debug` queries, authenticated requests, or any request without a shared cache, see `starter.cache.is_cache_shared`
+
+    The key covers the normalized document, the operation name, the variables and the version tags
+    of every model read by the selection set, so that writes invalidate it in O(1), see `starter.signals`
+    """
+    if not settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT or not is_cache_shared() or not is_anonymous(request) or document.get_operation_type(operation_name) != 'query':
+        return None
+
+    info = get_document_info(document)
+    if info.debug:
+        return None
+
+    versions = [f'{label}:{get_model_version(model)}' for label, model in sorted(info.models.items())]
+    signature = json.dumps([info.hash, operation_name, variables, versions], sort_keys=True)
+
+    return f'response:{hashlib.sha256(signature.encode()).hexdigest()}'
+
+
+def get_cached_response(key: str) -> Optional[ExecutionResult]:
+    data = cache.get(key)
+    return ExecutionResult(data=json.loads(data)) if data is not None else None
+
+
+def cache_response(key: str, execution_result: ExecutionResult) -> ExecutionResult:
+    if not execution_result.errors and not execution_result.invalid:
+        cache.set(key, json.dumps(execution_result.data), timeout=settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT)
+
+    return execution_result
+
+
+def is_anonymous(request: HttpRequest) -> bool:
+    """
+    Whether a request carries neither a JWT nor a session user, its response can then be shared with every anonymous user
+    """
+    user = getattr(request, 'user', None)
+    return not get_http_authorization(request) and not (user is not None and user.is_authenticated)
+
+
+def get_document_info(document: GraphQLDocument) -> DocumentInfo:
+    """
+    Return the normalized hash of a document, the models read by its selection sets and whether it selects `_debug`
+
+    The result is memoized for as long as the document lives, e.g. in the document cache.
+    """
+    if document not in _document_infos:
+        normalized = print_ast(document.document_ast)  # Strips comments and formatting
+        models, debug = _collect_models(document.schema, document.document_ast)
+        _document_infos[document] = DocumentInfo(hashlib.sha256(normalized.encode()).hexdigest(), models, debug)
+
+    return _document_infos[document]
+
+
+def _collect_models(schema: GraphQLSchema, document_ast) -> Tuple[Dict[str, Model], bool]:
+    collector = _ModelCollector(schema, document_ast)
+
+    for definition in document_ast.definitions:
+        if isinstance(definition, OperationDefinition) and definition.operation == 'query':
+            collector.collect(definition.selection_set, schema.get_query_type())
+
+    return collector.models, collector.debug
+
+
+class _ModelCollector:
+    def __init__(self, schema: GraphQLSchema, document_ast):
+        self.schema = schema
+        self.fragments = {definition.name.value: definition for definition in document_ast.definitions if isinstance(definition, FragmentDefinition)}
+        self.visited_fragments = set()
+        self.models = {}
+        self.debug = False
+
+    def collect(self, selection_set: Optional[SelectionSet], parent_type) -> None:
+        for selection in selection_set.selections if selection_set else []:
+            if isinstance(selection, Field):
+                self.collect_field(selection, parent_type)
+
+            elif isinstance(selection, InlineFragment):
+                self.collect(selection.selection_set, self.schema.get_type(selection.type_condition.name.value) if selection.type_condition else parent_type)
+
+            elif isinstance(selection, FragmentSpread) and selection.name.value in self.fragments and selection.name.value not in self.visited_fragments:
+                self.visited_fragments.add(selection.name.value)
+                fragment = self.fragments[selection.name.value]
+                self.collect(fragment.selection_set, self.schema.get_type(fragment.type_condition.name.value))
+
+    def collect_field(self, selection: Field, parent_type) -> None:
+        field = parent_type.fields.get(selection.name.value) if isinstance(parent_type, (GraphQLObjectType, GraphQLInterfaceType)) else None
+        if field is None:
+            return  # Introspection fields, or an invalid document which is not cached anyway
+
+        field_type = get_named_type(field.type)
+        self.debug = self.debug or field_type.name == 'DjangoDebug'
+
+        possible_types = self.schema.get_possible_types(field_type) if isinstance(field_type, (GraphQLInterfaceType, GraphQLUnionType)) else [field_type]
+        for possible_type in possible_types:
+            model = _get_model(getattr(possible_type, 'graphene_type', None))
+            if model is not None:
+                self.models[model._meta.label_lower] = model
+
+        self.collect(selection.selection_set, field_type)
+
+
+def _get_model(graphene_type) -> Optional[Model]:
+    """
+    Return the model of a DjangoObjectType, or of the nodes of a connection, e.g. `articles { totalCount }` reads Article
+    """
+    if isinstance(graphene_type, type) and issubclass(graphene_type, Connection):
+        graphene_type = graphene_type._meta.node
+
+    if isinstance(graphene_type, type) and issubclass(graphene_type, DjangoObjectType):
+        return graphene_type._meta.model
+
+    return None
@@ -7,6 +7,8 @@ from graphql_jwt import JSONWebTokenMutation, Verify
 from starter.models import Reporter
 from starter.types import ReporterNode
 
+from django_graphene_starter.incremental import DIRECTIVES
+
 logger = logging.getLogger(__name__)
 
 
@@ -35,4 +37,4 @@ class Mutation(
     verify_token = Verify.Field(description='Verify a JWT token.')
 
 
-schema = Schema(query=Query, mutation=Mutation)
+schema = Schema(query=Query, mutation=Mutation, directives=DIRECTIVES)
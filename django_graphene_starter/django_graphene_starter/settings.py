@@ -48,7 +48,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'silk.middleware.SilkyMiddleware',
-    'ratelimit.middleware.RatelimitMiddleware',
+    'django_graphene_starter.rate_limit.RatelimitMiddleware',
 ]
 
 ROOT_URLCONF = 'django_graphene_starter.urls'
@@ -88,6 +88,18 @@ else:
     }
 
 
+# Cache, shared by every worker for the rate limit, the response cache and the node cache, see `starter.cache.is_cache_shared`
+# https://github.com/jazzband/django-redis
+if 'REDIS_URL' in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient'},
+        },
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
@@ -188,13 +200,69 @@ GRAPHENE = {
     'SCHEMA': 'django_graphene_starter.schema.schema',
     'SCHEMA_OUTPUT': 'schema.graphql',
     'MIDDLEWARE': [
+        'django_graphene_starter.middlewares.NPlusOneMiddleware',
         'graphene_django.debug.DjangoDebugMiddleware',
         'graphql_jwt.middleware.JSONWebTokenMiddleware',
-        'django_graphene_starter.middlewares.LoaderMiddleware',
         'django_graphene_starter.middlewares.SentryMiddleware',
+        'django_graphene_starter.middlewares.MetricsMiddleware',
     ],
 }
 
+# Text search configuration of PostgreSQL full-text search, see `starter.search`
+SEARCH_CONFIG = os.environ.get('SEARCH_CONFIG', 'english')
+
+# Total count of connections, see `starter.counts`
+TOTAL_COUNT_CACHE_TIMEOUT = int(os.environ.get('TOTAL_COUNT_CACHE_TIMEOUT', 60))
+TOTAL_COUNT_ESTIMATE_THRESHOLD = int(os.environ.get('TOTAL_COUNT_ESTIMATE_THRESHOLD', 1000000))
+
+# Cache of the nodes looked up by global ID, see `starter.cache.NodeCache`
+NODE_CACHE_SIZE = int(os.environ.get('NODE_CACHE_SIZE', 1000))
+NODE_CACHE_TIMEOUT = int(os.environ.get('NODE_CACHE_TIMEOUT', 300))
+NODE_CACHE_LOCAL_TIMEOUT = int(os.environ.get('NODE_CACHE_LOCAL_TIMEOUT', 5))
+
+# Number of items written per query and per transaction by the bulk mutations, see `starter.bulk`
+BULK_MUTATION_BATCH_SIZE = int(os.environ.get('BULK_MUTATION_BATCH_SIZE', 500))
+
+# Cache of parsed and validated GraphQL documents, see `django_graphene_starter.document_cache`
+GRAPHQL_DOCUMENT_CACHE_SIZE = int(os.environ.get('GRAPHQL_DOCUMENT_CACHE_SIZE', 1000))
+
+# Cache of the responses to query operations, see `django_graphene_starter.response_cache`
+GRAPHQL_RESPONSE_CACHE_TIMEOUT = int(os.environ.get('GRAPHQL_RESPONSE_CACHE_TIMEOUT', 60))
+
+# Maximum number of operations in a batched GraphQL request, see `RateLimitedGraphQLView`
+GRAPHQL_BATCH_MAX_SIZE = int(os.environ.get('GRAPHQL_BATCH_MAX_SIZE', 20))
+
+# Limits of the cost and the depth of GraphQL operations, checked before execution (0 to disable), see `django_graphene_starter.query_cost`
+GRAPHQL_QUERY_MAX_COST = int(os.environ.get('GRAPHQL_QUERY_MAX_COST', 50000))
+GRAPHQL_QUERY_MAX_DEPTH = int(os.environ.get('GRAPHQL_QUERY_MAX_DEPTH', 15))
+
+# Share of the resolver calls which are timed, see `django_graphene_starter.middlewares.MetricsMiddleware`
+GRAPHQL_METRICS_SAMPLE_RATE = float(os.environ.get('GRAPHQL_METRICS_SAMPLE_RATE', 0.1))
+
+# Bearer token of the scrapers of `/metrics`, which is otherwise only served to staff users, see `django_graphene_starter.views.metrics_view`
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Queries sent more than this many times by the same resolver within an operation are N+1 queries, which raise
+# in tests, see `django_graphene_starter.settings_test`, and are logged for a sample of the operations otherwise, see `django_graphene_starter.n_plus_one`
+GRAPHQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('GRAPHQL_N_PLUS_ONE_THRESHOLD', 10))
+GRAPHQL_N_PLUS_ONE_RAISE = os.environ.get('GRAPHQL_N_PLUS_ONE_RAISE', '0') == '1'
+GRAPHQL_N_PLUS_ONE_SAMPLE_RATE = float(os.environ.get('GRAPHQL_N_PLUS_ONE_SAMPLE_RATE', 0.01))
+
+# Execute queries on the event loop when served by ASGI, see `django_graphene_starter.views.AsyncGraphQLView`
+GRAPHQL_ASYNC = os.environ.get('GRAPHQL_ASYNC', '0') == '1'
+
+if GRAPHQL_ASYNC:
+    # django-silk's middleware is synchronous only, Django would run every request on a single thread to serve it
+    MIDDLEWARE.remove('silk.middleware.SilkyMiddleware')
+
+# Pages of at least this many edges are fetched in chunks while they are resolved (0 to disable), see `starter.fields.QuerySetEdges`.
+# Less memory for more queries: the nested prefetches and DataLoader batches run once per chunk, e.g. 30 queries instead of 6 for 250 edges in chunks of 40.
+GRAPHQL_CONNECTION_ITERATOR_THRESHOLD = int(os.environ.get('GRAPHQL_CONNECTION_ITERATOR_THRESHOLD', 0))
+GRAPHQL_CONNECTION_ITERATOR_CHUNK_SIZE = int(os.environ.get('GRAPHQL_CONNECTION_ITERATOR_CHUNK_SIZE', 100))
+
+# Send responses in chunks, encoded by orjson when it is installed, see `django_graphene_starter.streaming`
+GRAPHQL_STREAMING_RESPONSE = os.environ.get('GRAPHQL_STREAMING_RESPONSE', '0') == '1'
+
 
 # Django GraphQL JWT
 # https://django-graphql-jwt.domake.io/en/latest/
@@ -209,6 +277,17 @@ AUTHENTICATION_BACKENDS = [
 RATELIMIT_VIEW = 'django_graphene_starter.views.ratelimited_error'
 RATELIMIT_RATE = os.environ.get('RATELIMIT_RATE', '5/s')
 
+# Token bucket of query cost per user or IP address for GraphQL operations, see `django_graphene_starter.rate_limit`.
+# Mutations cost GRAPHQL_RATELIMIT_MUTATION_COST more, plus 1 per written item, e.g. 401 for 100 publications with their `id` and `errors`, about 250 a minute.
+GRAPHQL_RATELIMIT_BUDGET = int(os.environ.get('GRAPHQL_RATELIMIT_BUDGET', 100000))
+GRAPHQL_RATELIMIT_PERIOD = int(os.environ.get('GRAPHQL_RATELIMIT_PERIOD', 60))
+GRAPHQL_RATELIMIT_MUTATION_COST = int(os.environ.get('GRAPHQL_RATELIMIT_MUTATION_COST', 100))
+
+
+# Persisted Queries, see `django_graphene_starter.persisted_queries`
+PERSISTED_QUERIES_PATH = os.environ.get('PERSISTED_QUERIES_PATH')
+PERSISTED_QUERIES_ONLY = os.environ.get('PERSISTED_QUERIES_ONLY', '0') == '1'
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/1.9/howto/static-files/
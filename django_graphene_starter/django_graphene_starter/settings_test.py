@@ -0,0 +1,8 @@
+from .settings import *  # noqa: F401,F403
+
+# N+1 queries fail the tests, see `django_graphene_starter.n_plus_one`
+GRAPHQL_N_PLUS_ONE_RAISE = True
+
+# django-silk keeps the request of the test client in a thread local once it is served, and then runs an extra `EXPLAIN`
+# for every query of the thread, including the ones of the tests executing the schema directly
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware != 'silk.middleware.SilkyMiddleware']  # noqa: F405
@@ -0,0 +1,67 @@
+import json
+from typing import Any, Iterator
+
+try:
+    import orjson
+except ImportError:  # Optional, the standard `json` module is used without it
+    orjson = None
+
+# Size of the chunks written to the client, in bytes with orjson and in characters without
+CHUNK_SIZE = 64 * 1024
+
+_encoder = json.JSONEncoder(separators=(',', ':'))
+
+
+def iter_json(value: Any, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Serialize `value` to JSON in chunks of about `chunk_size`
+
+    With orjson installed, `value` is encoded in one call to its Rust encoder, several times faster than `json.dumps`,
+    straight to the bytes which are sent, without a string in between. Non-ASCII characters are then written as UTF-8
+    rather than escaped, which is the same JSON.
+
+    Otherwise the output is the same as `json.dumps(value, separators=(',', ':'))`, and no faster: objects are walked in
+    Python while each item of an array, e.g. an edge of a connection, is encoded in one go by the C encoder of `json`.
+    Only a chunk and an item are held as strings at once, instead of the whole response and its bytes.
+
+    Either way `value`, the result of the whole operation, is built in memory before the first chunk.
+    """
+    if orjson is not None:
+        content = orjson.dumps(value)
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+
+        return
+
+    buffer = []
+    size = 0
+
+    for part in _iter_parts(value):
+        buffer.append(part)
+        size += len(part)
+
+        if size >= chunk_size:
+            yield ''.join(buffer).encode()
+            buffer = []
+            size = 0
+
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def _iter_parts(value: Any) -> Iterator[str]:
+    if isinstance(value, dict):
+        yield '{'
+        for index, (key, item) in enumerate(value.items()):
+            yield f'{"," if index else ""}{_encoder.encode(key)}:'
+            yield from _iter_parts(item)
+        yield '}'
+
+    elif isinstance(value, (list, tuple)):
+        yield '['
+        for index, item in enumerate(value):
+            yield f'{"," if index else ""}{_encoder.encode(item)}'
+        yield ']'
+
+    else:
+        yield _encoder.encode(value)
@@ -0,0 +1,188 @@
+import asyncio
+import json
+from typing import Any, List
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from mixer.backend.django import mixer
+from starter.loaders import AsyncDataLoader
+from starter.models import Article, Publication, Reporter
+from starter.optimizer import optimize_queryset
+
+from ..views import AsyncGraphQLView, RateLimitedGraphQLView
+
+ARTICLES_QUERY = '''
+query articles {
+  articles(orderBy: "headline") {
+    totalCount
+    edges {
+      node {
+        id
+        headline
+        dataloaderReporter {
+          email
+        }
+        publications {
+          totalCount
+        }
+      }
+    }
+  }
+}
+'''
+
+REPORTERS_QUERY = '''
+query reporters {
+  reporters(first: 10) {
+    edges {
+      node {
+        email
+        articles(orderBy: "headline", first: 10) {
+          edges {
+            node {
+              headline
+            }
+          }
+        }
+        dataloaderArticles {
+          totalCount
+        }
+      }
+    }
+  }
+}
+'''
+
+CREATE_REPORTER_MUTATION = '''
+mutation createReporter($input: CreateReporterInput!) {
+  createReporter(input: $input) {
+    reporter {
+      email
+    }
+  }
+}
+'''
+
+
+class KeysLoader(AsyncDataLoader):
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        super().__init__(loop)
+        self.batches = []
+
+    async def batch_load_fn(self, keys: List[Any]) -> List[Any]:
+        self.batches.append(keys)
+        return [key * 2 for key in keys]
+
+
+class AsyncDataLoaderTests(SimpleTestCase):
+    def test_loads_of_the_same_iteration_are_batched(self) -> None:
+        async def load():
+            loader = KeysLoader(asyncio.get_running_loop())
+            values = await asyncio.gather(loader.load(1), loader.load(2), loader.load(1), loader.load_many([3, 4]))
+            return loader.batches, values
+
+        batches, values = asyncio.run(load())
+
+        self.assertEqual(batches, [[1, 2, 3, 4]])
+        self.assertEqual(values, [2, 4, 2, [6, 8]])
+
+    def test_batch_load_fn_is_passed_or_defined(self) -> None:
+        async def batch_load_fn(keys: List[Any]) -> List[Any]:
+            return [str(key) for key in keys]
+
+        async def load(batch_load_fn):
+            return await AsyncDataLoader(asyncio.get_running_loop(), batch_load_fn).load_many([1, 2])
+
+        self.assertEqual(asyncio.run(load(batch_load_fn)), ['1', '2'])
+
+        with self.assertRaises(TypeError):
+            asyncio.run(load(None))
+
+
+@override_settings(RATELIMIT_ENABLE=False)
+class AsyncGraphQLViewTests(TestCase):
+    def setUp(self) -> None:
+        self.factory = RequestFactory()
+
+        publications = mixer.cycle(3).blend(Publication)
+        for reporter in mixer.cycle(2).blend(Reporter):
+            for _ in range(3):
+                mixer.blend(Article, reporter=reporter, publications=publications[:2])
+
+    def post(self, view, query: str, variables: dict = None) -> dict:
+        request = self.factory.post('/graphql', json.dumps({'query': query, 'variables': variables}), content_type='application/json')
+        request.user = AnonymousUser()
+        response = view(request)
+
+        if asyncio.iscoroutine(response):
+            response = async_to_sync(lambda: response)()
+
+        return json.loads(response.content)
+
+    def test_async_view_matches_sync_view(self) -> None:
+        for query in (ARTICLES_QUERY, REPORTERS_QUERY):
+            with self.subTest(query=query):
+                content = self.post(AsyncGraphQLView.as_view(), query)
+
+                self.assertNotIn('errors', content)
+                self.assertEqual(content, self.post(RateLimitedGraphQLView.as_view(), query))
+
+    def test_async_view_fetches_chunked_pages_on_the_orm_thread(self) -> None:
+        with override_settings(GRAPHQL_CONNECTION_ITERATOR_THRESHOLD=1, GRAPHQL_CONNECTION_ITERATOR_CHUNK_SIZE=2):
+            content = self.post(AsyncGraphQLView.as_view(), REPORTERS_QUERY)
+
+        self.assertNotIn('errors', content)
+        self.assertEqual(content, self.post(RateLimitedGraphQLView.as_view(), REPORTERS_QUERY))
+
+    def test_async_view_loads_deferred_fields_on_the_orm_thread(self) -> None:
+        def defer_headline(queryset, info, only=()):
+            return optimize_queryset(queryset, info, only=only).defer('headline')
+
+        with patch('starter.fields.optimize_queryset', side_effect=defer_headline):
+            content = self.post(AsyncGraphQLView.as_view(), ARTICLES_QUERY)
+
+        self.assertNotIn('errors', content)
+        self.assertEqual(content, self.post(RateLimitedGraphQLView.as_view(), ARTICLES_QUERY))
+
+    def test_async_view_batches_dataloaders_on_the_event_loop(self) -> None:
+        with CaptureQueriesContext(connection) as context:
+            self.post(AsyncGraphQLView.as_view(), ARTICLES_QUERY)
+
+        # The count and page of articles, the articles joined to their reporters of `dataloaderReporter`, the counts of publications
+        self.assertEqual(len(context.captured_queries), 4)
+
+    def test_async_view_charges_and_caches_on_the_orm_thread(self) -> None:
+        calls = []
+
+        def record_loop(*args) -> None:
+            try:
+                calls.append(asyncio.get_running_loop())
+            except RuntimeError:
+                calls.append(None)
+
+        with patch('django_graphene_starter.views.charge_operation', side_effect=record_loop), patch('django_graphene_starter.views.get_response_cache_key', side_effect=record_loop):
+            content = self.post(AsyncGraphQLView.as_view(), ARTICLES_QUERY)
+
+        self.assertNotIn('errors', content)
+        # Neither the rate limit nor the response cache block the event loop
+        self.assertEqual(calls, [None, None])
+
+    def test_async_view_resolves_each_field_once(self) -> None:
+        # `articles` is ordered, hence counted and queried for every reporter on the ORM thread
+        with patch.object(QuerySet, 'count', autospec=True, side_effect=QuerySet.count) as count_mock:
+            content = self.post(AsyncGraphQLView.as_view(), REPORTERS_QUERY)
+
+        self.assertNotIn('errors', content)
+        # The reporters, then the articles of each reporter
+        self.assertEqual(count_mock.call_count, 3)
+
+    def test_async_view_executes_mutations(self) -> None:
+        content = self.post(AsyncGraphQLView.as_view(), CREATE_REPORTER_MUTATION, {'input': {'firstName': 'Async', 'lastName': 'Reporter', 'email': 'async@example.com', 'username': 'async', 'password': 'AUg5hAXtQ5ADqZsp'}})
+
+        self.assertEqual(content['data']['createReporter']['reporter']['email'], 'async@example.com')
@@ -0,0 +1,137 @@
+import json
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from mixer.backend.django import mixer
+from starter.models import Article, Reporter
+
+ARTICLES_WITH_REPORTER_QUERY = '''
+query articles($headline: String) {
+  articles(headline: $headline) {
+    edges {
+      node {
+        headline
+        dataloaderReporter {
+          email
+        }
+      }
+    }
+  }
+}
+'''
+
+REPORTERS_QUERY = 'query reporters { reporters { totalCount } }'
+
+CREATE_REPORTER_MUTATION = '''
+mutation createReporter($input: CreateReporterInput!) {
+  createReporter(input: $input) {
+    reporter {
+      email
+    }
+  }
+}
+'''
+
+
+class BatchTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
+        reporters = mixer.cycle(2).blend(Reporter)
+        self.articles = [mixer.blend(Article, reporter=reporters[i % 2]) for i in range(4)]
+
+    def post(self, body):
+        return self.client.post('/graphql', json.dumps(body), content_type='application/json')
+
+    @override_settings(RATELIMIT_ENABLE=False)
+    def test_batch_returns_one_result_per_operation(self) -> None:
+        response = self.post([
+            {'id': 'reporters', 'query': REPORTERS_QUERY},
+            {'id': 'invalid', 'query': '{ unknownField }'},
+        ])
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([entry['id'] for entry in content], ['reporters', 'invalid'])
+        self.assertEqual(content[0]['status'], 200)
+        self.assertEqual(content[0]['data']['reporters']['totalCount'], Reporter.objects.count())
+        self.assertEqual(content[1]['status'], 400)
+        self.assertIn('errors', content[1])
+
+    @override_settings(RATELIMIT_ENABLE=False)
+    def test_batch_shares_dataloaders_across_operations(self) -> None:
+        with CaptureQueriesContext(connection) as context:
+            response = self.post([
+                {'id': str(article.id), 'query': ARTICLES_WITH_REPORTER_QUERY, 'variables': {'headline': article.headline}}
+                for article in self.articles
+            ])
+
+        content = json.loads(response.content)
+        self.assertEqual(response.status_code, 200)
+
+        for article, entry in zip(self.articles, content):
+            self.assertEqual(entry['data']['articles']['edges'][0]['node']['dataloaderReporter']['email'], article.reporter.email)
+
+        reporter_queries = [query for query in context.captured_queries if query['sql'].startswith('SELECT') and f'JOIN "{Reporter._meta.db_table}"' in query['sql']]
+        self.assertEqual(len(reporter_queries), 1)
+
+    @override_settings(RATELIMIT_ENABLE=False)
+    def test_batch_executes_mutations_in_order(self) -> None:
+        response = self.post([
+            {'query': REPORTERS_QUERY},
+            {'query': CREATE_REPORTER_MUTATION, 'variables': {'input': {'firstName': 'Batch', 'lastName': 'Reporter', 'email': 'batch@example.com', 'username': 'batch', 'password': 'AUg5hAXtQ5ADqZsp'}}},
+            {'query': REPORTERS_QUERY},
+        ])
+        content = json.loads(response.content)
+
+        self.assertEqual(content[1]['data']['createReporter']['reporter']['email'], 'batch@example.com')
+        self.assertEqual(content[2]['data']['reporters']['totalCount'], content[0]['data']['reporters']['totalCount'] + 1)
+
+    @override_settings(RATELIMIT_ENABLE=False)
+    def test_failing_mutations_are_rolled_back_alone(self) -> None:
+        reporter = Reporter.objects.first()
+        password = reporter.password
+
+        with patch.dict(connection.settings_dict, ATOMIC_REQUESTS=True):
+            content = json.loads(self.post([
+                {'query': CREATE_REPORTER_MUTATION, 'variables': {'input': {'firstName': 'Batch', 'lastName': 'Reporter', 'email': 'batch@example.com', 'username': 'batch', 'password': 'AUg5hAXtQ5ADqZsp'}}},
+                # Sets the password of the existing reporter, then fails
+                {'query': CREATE_REPORTER_MUTATION, 'variables': {'input': {'firstName': 'Batch', 'lastName': 'Reporter', 'email': reporter.email, 'username': reporter.username, 'password': 'AUg5hAXtQ5ADqZsp'}}},
+            ]).content)
+
+        self.assertNotIn('errors', content[0])
+        self.assertIn('errors', content[1])
+        self.assertTrue(Reporter.objects.filter(username='batch').exists())
+        self.assertEqual(Reporter.objects.get(pk=reporter.pk).password, password)
+
+    @override_settings(RATELIMIT_ENABLE=False, GRAPHQL_BATCH_MAX_SIZE=2)
+    def test_batch_size_is_limited(self) -> None:
+        response = self.post([{'query': REPORTERS_QUERY}] * 3)
+
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(RATELIMIT_ENABLE=False)
+    def test_batch_entries_must_be_objects(self) -> None:
+        response = self.post([REPORTERS_QUERY])
+
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(GRAPHQL_RATELIMIT_BUDGET=10)
+    def test_rate_limit_counts_operations(self) -> None:
+        response = self.post([{'query': REPORTERS_QUERY}] * 12)
+
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(GRAPHQL_RATELIMIT_BUDGET=150)
+    def test_batch_out_of_budget_executes_nothing(self) -> None:
+        count = Reporter.objects.count()
+        response = self.post([
+            {'query': CREATE_REPORTER_MUTATION, 'variables': {'input': {'firstName': 'Batch', 'lastName': 'Reporter', 'email': f'batch{index}@example.com', 'username': f'batch{index}', 'password': 'AUg5hAXtQ5ADqZsp'}}}
+            for index in range(2)
+        ])
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(Reporter.objects.count(), count)
@@ -0,0 +1,71 @@
+import json
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.test.client import RequestFactory
+from graphql import parse
+
+from ..document_cache import CachedDocumentBackend, DocumentCache, document_cache
+from ..schema import schema
+from ..views import RateLimitedGraphQLView
+
+
+class DocumentCacheTests(TestCase):
+    def test_documents_are_parsed_once(self) -> None:
+        backend = CachedDocumentBackend(DocumentCache(maxsize=10))
+
+        with patch('django_graphene_starter.document_cache.parse', wraps=parse) as parse_mock:
+            document = backend.document_from_string(schema, '{ __typename }')
+            self.assertIs(backend.document_from_string(schema, '{ __typename }'), document)
+
+        parse_mock.assert_called_once()
+        self.assertEqual(backend.cache.cache_info()[:3], (1, 1, 0))
+
+    def test_least_recently_used_documents_are_evicted(self) -> None:
+        backend = CachedDocumentBackend(DocumentCache(maxsize=2))
+
+        backend.document_from_string(schema, 'query a { __typename }')
+        backend.document_from_string(schema, 'query b { __typename }')
+        backend.document_from_string(schema, 'query a { __typename }')
+        backend.document_from_string(schema, 'query c { __typename }')  # Evicts `b`
+        backend.document_from_string(schema, 'query a { __typename }')
+
+        self.assertEqual(backend.cache.cache_info(), (2, 3, 1, 2, 2))
+
+    def test_invalid_documents_are_cached_with_their_errors(self) -> None:
+        backend = CachedDocumentBackend(DocumentCache(maxsize=10))
+
+        result = backend.document_from_string(schema, '{ unknownField }').execute()
+        self.assertTrue(result.invalid)
+        self.assertEqual(result.errors[0].message, 'Cannot query field "unknownField" on type "Query".')
+
+        with patch('django_graphene_starter.document_cache.validate') as validate:
+            self.assertTrue(backend.document_from_string(schema, '{ unknownField }').execute().invalid)
+
+        validate.assert_not_called()
+
+
+@override_settings(RATELIMIT_ENABLE=False)
+class DocumentCacheViewTests(TestCase):
+    def setUp(self) -> None:
+        self.factory = RequestFactory()
+        document_cache.clear()
+
+    def post(self, body: dict) -> tuple:
+        request = self.factory.post('/graphql', json.dumps(body), content_type='application/json')
+        response = RateLimitedGraphQLView.as_view()(request)
+        return response.status_code, json.loads(response.content)
+
+    def test_view_looks_up_each_document_once_per_request(self) -> None:
+        for _ in range(3):
+            status_code, content = self.post({'query': 'query publications { publications { totalCount } }'})
+            self.assertEqual(status_code, 200)
+            self.assertEqual(content['data']['publications']['totalCount'], 0)
+
+        self.assertEqual(document_cache.cache_info()[:3], (2, 1, 0))
+
+    def test_view_returns_syntax_errors(self) -> None:
+        status_code, content = self.post({'query': '{ publications '})
+
+        self.assertEqual(status_code, 400)
+        self.assertIn('Syntax Error', content['errors'][0]['message'])
@@ -0,0 +1,250 @@
+import json
+from typing import List
+
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from graphql import parse
+from mixer.backend.django import mixer
+from starter.models import Article, Reporter
+
+from ..incremental import plan_incremental_delivery
+from ..n_plus_one import NPlusOneError
+from ..schema import schema
+
+DEFERRED_QUERY = '''
+query reporters($first: Int, $articles: Int) {
+  reporters(first: $first, orderBy: "email") {
+    edges {
+      node {
+        email
+        ... on ReporterNode @defer(label: "articles") {
+          articles(first: $articles, orderBy: "headline") {
+            edges {
+              node {
+                headline
+              }
+            }
+          }
+        }
+        ...DataloaderArticles @defer
+      }
+    }
+  }
+}
+
+fragment DataloaderArticles on ReporterNode {
+  dataloaderArticles {
+    totalCount
+  }
+}
+'''
+
+# The publications are ordered, hence not prefetched but queried for every article
+N_PLUS_ONE_QUERY = '''
+query articles {
+  articles(first: 10) {
+    edges {
+      node {
+        headline
+        ... on ArticleNode @defer {
+          publications(orderBy: "title", first: 10) {
+            totalCount
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
+STREAMED_QUERY = '''
+query articles {
+  articles(first: 10, orderBy: "headline") {
+    edges @stream(initialCount: 1) {
+      node {
+        headline
+      }
+    }
+  }
+}
+'''
+
+# The nested articles of the reporters past the initial count are only queried after the initial payload
+NESTED_STREAMED_QUERY = '''
+query reporters {
+  reporters(first: 2, orderBy: "email") {
+    edges @stream(initialCount: 1, label: "reporters") {
+      cursor
+      node {
+        email
+        articles(first: 1, orderBy: "headline") {
+          edges {
+            node {
+              headline
+            }
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
+
+class PlanIncrementalDeliveryTests(SimpleTestCase):
+    def test_deferred_fragments_are_split_into_queries(self) -> None:
+        plan = plan_incremental_delivery(schema, parse(DEFERRED_QUERY), {}, 'reporters')
+
+        self.assertNotIn('articles', plan.query)
+        self.assertNotIn('$articles', plan.query)
+        self.assertNotIn('fragment DataloaderArticles', plan.query)
+        self.assertIn('_incrementalId: id', plan.query)
+        self.assertEqual([(deferred.label, deferred.path, deferred.type_name) for deferred in plan.deferred], [('articles', ['reporters', 'edges', 'node'], 'ReporterNode'), (None, ['reporters', 'edges', 'node'], 'ReporterNode')])
+
+        articles_query, dataloader_query = (deferred.query for deferred in plan.deferred)
+        self.assertIn('query reporters($_incrementalIds: [ID!]!, $articles: Int)', articles_query)
+        self.assertIn('_incrementalNodes: nodes(ids: $_incrementalIds)', articles_query)
+        self.assertNotIn('reporters(first', articles_query)
+        self.assertNotIn('@defer', articles_query)
+        self.assertIn('fragment DataloaderArticles', dataloader_query)
+        self.assertNotIn('$articles', dataloader_query)
+
+    def test_the_nodes_of_streamed_edges_are_split_into_a_query(self) -> None:
+        plan = plan_incremental_delivery(schema, parse(NESTED_STREAMED_QUERY), {}, 'reporters')
+
+        self.assertIn('cursor', plan.query)
+        self.assertIn('_incrementalId: id', plan.query)
+        self.assertNotIn('articles', plan.query)
+        self.assertEqual([(streamed.label, streamed.path, streamed.initial_count, streamed.node_key) for streamed in plan.streamed], [('reporters', ['reporters', 'edges'], 1, 'node')])
+
+        streamed_query = plan.streamed[0].query
+        self.assertIn('_incrementalNodes: nodes(ids: $_incrementalIds)', streamed_query)
+        self.assertIn('... on ReporterNode', streamed_query)
+        self.assertIn('articles(first: 1, orderBy: "headline")', streamed_query)
+        self.assertNotIn('reporters(first', streamed_query)
+
+    def test_nothing_to_defer(self) -> None:
+        self.assertIsNone(plan_incremental_delivery(schema, parse('{ reporters { totalCount } }'), {}, None))
+        self.assertIsNone(plan_incremental_delivery(schema, parse('query($defer: Boolean) { reporters { ... on ReporterNodeConnection @defer(if: $defer) { totalCount } } }'), {'defer': False}, None))
+
+    def test_fragments_deferred_on_other_types_are_inlined(self) -> None:
+        # A connection cannot be looked up by ID
+        self.assertIsNone(plan_incremental_delivery(schema, parse('{ reporters { ... on ReporterNodeConnection @defer { totalCount } } }'), {}, None))
+
+    def test_lists_of_other_types_are_not_streamed(self) -> None:
+        # The nodes of `nodes` are not the nodes of connection edges
+        self.assertIsNone(plan_incremental_delivery(schema, parse('{ nodes(ids: []) @stream { id } }'), {}, None))
+
+
+@override_settings(RATELIMIT_ENABLE=False, GRAPHQL_RESPONSE_CACHE_TIMEOUT=0)
+class IncrementalDeliveryTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
+        self.reporters = sorted(mixer.cycle(2).blend(Reporter), key=lambda reporter: reporter.email)
+        for reporter in self.reporters:
+            mixer.cycle(2).blend(Article, reporter=reporter)
+
+    def post(self, query: str, variables: dict = None, **headers):
+        return self.client.post('/graphql', json.dumps({'query': query, 'variables': variables}), content_type='application/json', **headers)
+
+    def get_payloads(self, response) -> List[dict]:
+        self.assertTrue(response['Content-Type'].startswith('multipart/mixed; boundary="-"'))
+
+        content = b''.join(response.streaming_content).decode()
+        self.assertTrue(content.endswith('\r\n-----\r\n'))
+
+        return [json.loads(part.split('\r\n\r\n', 1)[1]) for part in content[:-len('\r\n-----\r\n')].split('\r\n---\r\n')[1:]]
+
+    def test_deferred_fragments_are_delivered_after_the_initial_payload(self) -> None:
+        response = self.post(DEFERRED_QUERY, {'first': 2, 'articles': 1}, HTTP_ACCEPT='multipart/mixed; deferSpec=20220824, application/json')
+        initial, articles, dataloader_articles = self.get_payloads(response)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(initial['hasNext'])
+        self.assertEqual([edge['node'] for edge in initial['data']['reporters']['edges']], [{'email': reporter.email} for reporter in self.reporters])
+
+        self.assertTrue(articles['hasNext'])
+        self.assertEqual([(result['label'], result['path']) for result in articles['incremental']], [('articles', ['reporters', 'edges', 0, 'node']), ('articles', ['reporters', 'edges', 1, 'node'])])
+        self.assertEqual(len(articles['incremental'][0]['data']['articles']['edges']), 1)
+
+        self.assertFalse(dataloader_articles['hasNext'])
+        self.assertEqual([result['data'] for result in dataloader_articles['incremental']], [{'dataloaderArticles': {'totalCount': 2}}] * 2)
+
+    def test_streamed_lists_are_split_after_their_initial_count(self) -> None:
+        initial, streamed = self.get_payloads(self.post(STREAMED_QUERY, HTTP_ACCEPT='multipart/mixed'))
+        headlines = sorted(Article.objects.values_list('headline', flat=True))
+
+        self.assertEqual([edge['node']['headline'] for edge in initial['data']['articles']['edges']], headlines[:1])
+        self.assertEqual(streamed['incremental'][0]['path'], ['articles', 'edges', 1])
+        self.assertEqual([edge['node']['headline'] for edge in streamed['incremental'][0]['items']], headlines[1:])
+        self.assertFalse(streamed['hasNext'])
+
+    def test_streamed_nodes_are_resolved_after_the_initial_payload(self) -> None:
+        with CaptureQueriesContext(connection) as context:
+            response = self.post(NESTED_STREAMED_QUERY, HTTP_ACCEPT='multipart/mixed')
+            initial_queries = len(context.captured_queries)
+            initial, streamed = self.get_payloads(response)
+
+        articles_queries = [index for index, query in enumerate(context.captured_queries) if 'FROM "starter_article"' in query['sql']]
+        self.assertTrue(any(index < initial_queries for index in articles_queries))
+        self.assertTrue(any(index >= initial_queries for index in articles_queries))
+
+        def get_edge(reporter):
+            headline = min(reporter.articles.values_list('headline', flat=True))
+            return {'node': {'email': reporter.email, 'articles': {'edges': [{'node': {'headline': headline}}]}}}
+
+        self.assertTrue(initial['hasNext'])
+        self.assertEqual([{'node': edge['node']} for edge in initial['data']['reporters']['edges']], [get_edge(self.reporters[0])])
+        self.assertNotIn('_incrementalId', json.dumps(initial))
+
+        self.assertFalse(streamed['hasNext'])
+        self.assertEqual([(result['label'], result['path']) for result in streamed['incremental']], [('reporters', ['reporters', 'edges', 1])])
+        self.assertEqual([{'node': edge['node']} for edge in streamed['incremental'][0]['items']], [get_edge(self.reporters[1])])
+        self.assertTrue(streamed['incremental'][0]['items'][0]['cursor'])
+
+    def test_directives_are_ignored_without_multipart_accept(self) -> None:
+        content = json.loads(self.post(DEFERRED_QUERY, {'first': 2, 'articles': 1}).content)
+
+        self.assertNotIn('errors', content)
+        self.assertEqual(content['data']['reporters']['edges'][0]['node']['dataloaderArticles']['totalCount'], 2)
+
+    def test_deferred_fragments_do_not_resolve_their_parents_again(self) -> None:
+        with CaptureQueriesContext(connection) as context:
+            self.get_payloads(self.post(DEFERRED_QUERY, {'first': 2, 'articles': 1}, HTTP_ACCEPT='multipart/mixed'))
+
+        queries = [query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(len([query for query in queries if query.startswith('SELECT COUNT(*) AS "__count" FROM "auth_user"')]), 1)
+        self.assertEqual(len([query for query in queries if query.endswith('LIMIT 2')]), 1)
+
+    def test_deferred_fragments_are_only_resolved_on_their_type(self) -> None:
+        query = '{ reporters(first: 2) { edges { node { email ... on ReporterNode @defer { firstName } } } } }'
+        initial, deferred = self.get_payloads(self.post(query, HTTP_ACCEPT='multipart/mixed'))
+
+        self.assertNotIn('_incrementalId', json.dumps(initial))
+        self.assertEqual(len(deferred['incremental']), 2)
+        self.assertEqual({result['data']['firstName'] for result in deferred['incremental']}, {reporter.first_name for reporter in self.reporters})
+
+    @override_settings(RATELIMIT_ENABLE=True)
+    def test_the_operation_is_charged_once(self) -> None:
+        with patch('django_graphene_starter.views.charge_operation') as charge_operation_mock, patch('django_graphene_starter.views.charge_operations') as charge_operations_mock:
+            initial, *_ = self.get_payloads(self.post(DEFERRED_QUERY, {'first': 2, 'articles': 1}, HTTP_ACCEPT='multipart/mixed'))
+
+        # The cost of the whole operation, deferred fragments included
+        charge_operation_mock.assert_called_once()
+        self.assertEqual(charge_operation_mock.call_args[0][1].cost, initial['extensions']['cost']['requestedQueryCost'])
+        self.assertGreater(initial['extensions']['cost']['requestedQueryCost'], 2)
+        charge_operations_mock.assert_not_called()
+
+    @override_settings(GRAPHQL_N_PLUS_ONE_RAISE=True, GRAPHQL_N_PLUS_ONE_THRESHOLD=2)
+    def test_deferred_fragments_are_checked_for_n_plus_one_queries(self) -> None:
+        response = self.post(N_PLUS_ONE_QUERY, HTTP_ACCEPT='multipart/mixed')
+
+        with self.assertRaises(NPlusOneError) as context:
+            self.get_payloads(response)
+
+        self.assertIn('articles: ArticleNode.publications sent 4 times', str(context.exception))
@@ -0,0 +1,103 @@
+import json
+import re
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from mixer.backend.django import mixer
+from starter.models import Article, Reporter
+
+from ..metrics import Histogram, metrics
+
+ARTICLES_QUERY = '''
+query articles {
+  articles(first: 10) {
+    edges {
+      node {
+        id
+        headline
+        dataloaderReporter {
+          email
+        }
+      }
+    }
+  }
+}
+'''
+
+
+class HistogramTests(SimpleTestCase):
+    def test_quantiles_are_interpolated_within_buckets(self) -> None:
+        histogram = Histogram(buckets=(1, 2, 4))
+        for value in (0.5, 1.5, 1.5, 3, 10):
+            histogram.observe(value)
+
+        self.assertEqual(list(histogram.cumulative_counts()), [('1', 1), ('2', 3), ('4', 4), ('+Inf', 5)])
+        self.assertEqual(histogram.quantile(0.5), 1.75)
+        self.assertEqual(histogram.quantile(0.99), 4)
+        self.assertEqual(Histogram().quantile(0.5), 0)
+
+
+@override_settings(RATELIMIT_ENABLE=False, GRAPHQL_RESPONSE_CACHE_TIMEOUT=0, GRAPHQL_METRICS_SAMPLE_RATE=1, METRICS_TOKEN='token')
+class MetricsTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        metrics.clear()
+
+        for reporter in mixer.cycle(2).blend(Reporter):
+            mixer.cycle(2).blend(Article, reporter=reporter)
+
+    def get_metrics(self) -> str:
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer token')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def get_sample(self, content: str, name: str) -> float:
+        return float(re.search(rf'^{re.escape(name)} (\S+)$', content, re.MULTILINE).group(1))
+
+    def test_resolvers_are_counted_and_timed(self) -> None:
+        self.client.post('/graphql', json.dumps({'query': ARTICLES_QUERY}), content_type='application/json')
+        content = self.get_metrics()
+
+        self.assertEqual(self.get_sample(content, 'graphql_resolver_calls_total{type="ArticleNode",field="dataloaderReporter"}'), 4)
+        self.assertEqual(self.get_sample(content, 'graphql_resolver_duration_seconds_count{type="ArticleNode",field="dataloaderReporter"}'), 4)
+        self.assertNotIn('field="id"', content)  # Trivial fields bypass the middlewares
+        self.assertEqual(self.get_sample(content, 'graphql_resolver_duration_seconds_bucket{type="Query",field="articles",le="+Inf"}'), 1)
+        self.assertIn('graphql_resolver_duration_quantile_seconds{type="Query",field="articles",quantile="0.99"}', content)
+
+    @override_settings(GRAPHQL_METRICS_SAMPLE_RATE=0)
+    def test_resolvers_are_counted_but_not_timed_out_of_the_sample(self) -> None:
+        self.client.post('/graphql', json.dumps({'query': ARTICLES_QUERY}), content_type='application/json')
+        content = self.get_metrics()
+
+        self.assertEqual(self.get_sample(content, 'graphql_resolver_calls_total{type="ArticleNode",field="dataloaderReporter"}'), 4)
+        self.assertNotIn('graphql_resolver_duration_seconds_count', content)
+
+    def test_sql_queries_are_counted_per_operation(self) -> None:
+        for _ in range(2):
+            self.client.post('/graphql', json.dumps({'query': ARTICLES_QUERY, 'operationName': 'articles'}), content_type='application/json')
+
+        self.client.post('/graphql', json.dumps([{'query': ARTICLES_QUERY}] * 2), content_type='application/json')
+        content = self.get_metrics()
+
+        self.assertEqual(self.get_sample(content, 'graphql_operations_total{operation="articles"}'), 2)
+        self.assertEqual(self.get_sample(content, 'graphql_operations_total{operation="batch"}'), 1)
+        self.assertEqual(self.get_sample(content, 'graphql_operation_duration_seconds_count{operation="articles"}'), 2)
+        # Per operation: COUNT, SELECT articles and SELECT reporters of the DataLoader
+        self.assertGreaterEqual(self.get_sample(content, 'graphql_operation_sql_queries_total{operation="articles"}'), 6)
+        self.assertGreater(self.get_sample(content, 'graphql_operation_sql_duration_seconds_total{operation="articles"}'), 0)
+
+    def test_document_cache_is_exported(self) -> None:
+        self.assertIn('graphql_document_cache_maxsize 1000', self.get_metrics())
+
+    def test_metrics_require_the_token_or_a_staff_user(self) -> None:
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+        with self.settings(METRICS_TOKEN=None):
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
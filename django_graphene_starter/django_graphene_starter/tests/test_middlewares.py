@@ -0,0 +1,90 @@
+from collections import Counter
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from mixer.backend.django import mixer
+from starter.models import Article, Reporter
+
+from ..middlewares import FieldMiddlewareManager, LoaderMiddleware
+from ..schema import schema
+
+ARTICLES_QUERY = '''
+query articles {
+  articles(first: 10) {
+    edges {
+      node {
+        id
+        headline
+        dataloaderReporter {
+          email
+        }
+      }
+    }
+  }
+}
+'''
+
+
+class CountingMiddleware:
+    def __init__(self):
+        self.calls = Counter()
+
+    def resolve(self, next, root, info, **args):
+        self.calls[(info.parent_type.name, info.field_name)] += 1
+        return next(root, info, **args)
+
+
+class CountingLoaderMiddleware(LoaderMiddleware):
+    def __init__(self):
+        self.calls = Counter()
+
+    def resolve(self, next, root, info, **args):
+        self.calls[(info.parent_type.name, info.field_name)] += 1
+        return super().resolve(next, root, info, **args)
+
+
+class FieldMiddlewareManagerTests(TestCase):
+    def setUp(self) -> None:
+        for reporter in mixer.cycle(2).blend(Reporter):
+            mixer.cycle(2).blend(Article, reporter=reporter)
+
+    def execute(self, query: str, *middlewares):
+        result = schema.execute(query, context_value=SimpleNamespace(), middleware=FieldMiddlewareManager(schema, *middlewares))
+        self.assertIsNone(result.errors)
+        return result
+
+    def test_trivial_fields_bypass_the_middlewares(self) -> None:
+        middleware = CountingMiddleware()
+        result = self.execute(ARTICLES_QUERY, LoaderMiddleware(), middleware)
+
+        self.assertEqual(len(result.data['articles']['edges']), 4)
+        self.assertEqual(middleware.calls[('Query', 'articles')], 1)
+        self.assertEqual(middleware.calls[('ArticleNode', 'dataloaderReporter')], 4)
+        self.assertNotIn(('ArticleNode', 'id'), middleware.calls)
+
+    def test_deferrable_fields_run_the_middlewares(self) -> None:
+        middleware = CountingMiddleware()
+        self.execute(ARTICLES_QUERY, LoaderMiddleware(), middleware)
+
+        # `only` may defer them, the middlewares have to see the query loading them
+        self.assertEqual(middleware.calls[('ArticleNode', 'headline')], 4)
+        self.assertEqual(middleware.calls[('ReporterNode', 'email')], 4)
+
+    def test_operation_middlewares_only_run_on_root_fields(self) -> None:
+        middleware = CountingLoaderMiddleware()
+        result = self.execute(ARTICLES_QUERY, middleware)
+
+        self.assertEqual(len({edge['node']['dataloaderReporter']['email'] for edge in result.data['articles']['edges']}), 2)
+        self.assertEqual(list(middleware.calls), [('Query', 'articles')])
+
+    @override_settings(RATELIMIT_ENABLE=False)
+    def test_debug_field_is_resolved(self) -> None:
+        cache.clear()
+        response = self.client.post('/graphql', {'query': 'query { articles(first: 1) { edges { node { headline } } } _debug { sql { rawSql } } }'}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        content = response.json()
+
+        self.assertNotIn('errors', content)
+        self.assertIsInstance(content['data']['_debug']['sql'], list)
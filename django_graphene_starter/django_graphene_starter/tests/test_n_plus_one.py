@@ -0,0 +1,106 @@
+import json
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from mixer.backend.django import mixer
+from starter.models import Article, Publication, Reporter
+
+from ..n_plus_one import NPlusOneError, get_fingerprint, logger
+
+# The publications are ordered, hence not prefetched but queried for every article
+N_PLUS_ONE_QUERY = '''
+query articles {
+  articles(first: 20) {
+    edges {
+      node {
+        headline
+        publications(orderBy: "title", first: 10) {
+          edges {
+            node {
+              title
+            }
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
+PREFETCHED_QUERY = '''
+query articles {
+  articles(first: 20) {
+    edges {
+      node {
+        headline
+        reporter {
+          email
+        }
+        publications(first: 10) {
+          edges {
+            node {
+              title
+            }
+          }
+        }
+        dataloaderReporter {
+          email
+        }
+      }
+    }
+  }
+}
+'''
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_placeholder_lists_are_collapsed(self) -> None:
+        self.assertEqual(get_fingerprint('SELECT "id" FROM "t" WHERE "id" IN (%s, %s, %s) AND "a" = %s'), 'SELECT "id" FROM "t" WHERE "id" IN (...) AND "a" = %s')
+        self.assertEqual(get_fingerprint('SELECT "id" FROM "t" WHERE "id" IN (%s)'), get_fingerprint('SELECT "id" FROM "t" WHERE "id" IN (%s,%s)'))
+
+
+@override_settings(RATELIMIT_ENABLE=False, GRAPHQL_RESPONSE_CACHE_TIMEOUT=0, GRAPHQL_N_PLUS_ONE_RAISE=True, GRAPHQL_N_PLUS_ONE_THRESHOLD=5)
+class NPlusOneTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
+        publications = mixer.cycle(3).blend(Publication)
+        for reporter in mixer.cycle(2).blend(Reporter):
+            mixer.cycle(5).blend(Article, reporter=reporter, publications=publications[:2])
+
+    def post(self, query: str):
+        return self.client.post('/graphql', json.dumps({'query': query}), content_type='application/json')
+
+    def test_repeated_queries_of_a_resolver_raise(self) -> None:
+        with self.assertRaises(NPlusOneError) as context:
+            self.post(N_PLUS_ONE_QUERY)
+
+        self.assertIn('articles: ArticleNode.publications sent 10 times', str(context.exception))
+
+    def test_batched_queries_do_not_raise(self) -> None:
+        content = json.loads(self.post(PREFETCHED_QUERY).content)
+
+        self.assertNotIn('errors', content)
+        self.assertEqual(len(content['data']['articles']['edges']), 10)
+
+    def test_batched_operations_are_detected(self) -> None:
+        with self.assertRaises(NPlusOneError):
+            self.client.post('/graphql', json.dumps([{'query': PREFETCHED_QUERY}, {'query': N_PLUS_ONE_QUERY}]), content_type='application/json')
+
+    @override_settings(GRAPHQL_N_PLUS_ONE_RAISE=False, GRAPHQL_N_PLUS_ONE_SAMPLE_RATE=1)
+    def test_repeated_queries_are_logged_out_of_tests(self) -> None:
+        with self.assertLogs('django_graphene_starter.n_plus_one', level='WARNING') as logs:
+            response = self.post(N_PLUS_ONE_QUERY)
+
+        self.assertEqual(response.status_code, 200)
+        # The COUNT and the SELECT of the publications of each article
+        self.assertEqual(len(logs.records), 2)
+        self.assertTrue(all('N+1 queries in articles from ArticleNode.publications: 10 x SELECT' in output for output in logs.output))
+
+    @override_settings(GRAPHQL_N_PLUS_ONE_RAISE=False, GRAPHQL_N_PLUS_ONE_SAMPLE_RATE=0)
+    def test_operations_out_of_the_sample_are_not_detected(self) -> None:
+        with patch.object(logger, 'warning') as warning_mock:
+            self.assertEqual(self.post(N_PLUS_ONE_QUERY).status_code, 200)
+
+        warning_mock.assert_not_called()
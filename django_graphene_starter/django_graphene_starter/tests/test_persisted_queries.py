@@ -0,0 +1,76 @@
+import json
+from unittest.mock import patch
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.test.client import RequestFactory
+from mixer.backend.django import mixer
+from starter.models import Publication
+
+from ..persisted_queries import PersistedQueryRegistry, get_query_hash
+from ..schema import schema
+from ..views import RateLimitedGraphQLView
+
+PUBLICATIONS_QUERY = 'query publications { publications { totalCount } }'
+
+
+@override_settings(RATELIMIT_ENABLE=False)
+class PersistedQueriesTests(TestCase):
+    def setUp(self) -> None:
+        mixer.cycle(3).blend(Publication)
+
+        self.factory = RequestFactory()
+        self.hash = get_query_hash(PUBLICATIONS_QUERY)
+        self.registry = PersistedQueryRegistry(schema, {self.hash: PUBLICATIONS_QUERY})
+
+    def post(self, body: dict, registry: PersistedQueryRegistry = None) -> dict:
+        request = self.factory.post('/graphql', json.dumps(body), content_type='application/json')
+        response = RateLimitedGraphQLView.as_view(persisted_queries=registry or self.registry)(request)
+        return json.loads(response.content)
+
+    def test_persisted_query_skips_parsing_and_validation(self) -> None:
+        with patch('django_graphene_starter.document_cache.parse') as parse, patch('django_graphene_starter.document_cache.validate') as validate:
+            content = self.post({'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': self.hash}}})
+
+        parse.assert_not_called()
+        validate.assert_not_called()
+        self.assertEqual(content['data']['publications']['totalCount'], 3)
+
+    def test_persisted_query_get_request(self) -> None:
+        extensions = json.dumps({'persistedQuery': {'version': 1, 'sha256Hash': self.hash}})
+        request = self.factory.get('/graphql', {'extensions': extensions}, HTTP_ACCEPT='application/json')
+        response = RateLimitedGraphQLView.as_view(persisted_queries=self.registry)(request)
+
+        self.assertEqual(json.loads(response.content)['data']['publications']['totalCount'], 3)
+
+    def test_unknown_persisted_query_is_not_found(self) -> None:
+        content = self.post({'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': get_query_hash('{ __typename }')}}})
+
+        self.assertEqual(content['errors'][0]['message'], 'PersistedQueryNotFound')
+        self.assertEqual(content['errors'][0]['extensions']['code'], 'PERSISTED_QUERY_NOT_FOUND')
+
+    def test_unknown_persisted_query_with_query_text_is_executed(self) -> None:
+        query = 'query publications { publications { edges { node { id } } } }'
+        content = self.post({'query': query, 'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': get_query_hash(query)}}})
+
+        self.assertEqual(len(content['data']['publications']['edges']), 3)
+
+    def test_persisted_query_hash_must_match_query_text(self) -> None:
+        content = self.post({'query': '{ __typename }', 'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': get_query_hash('{ hello }')}}})
+
+        self.assertEqual(content['errors'][0]['message'], 'The provided sha256Hash does not match the query.')
+
+    def test_only_persisted_queries_are_allowed(self) -> None:
+        registry = PersistedQueryRegistry(schema, {self.hash: PUBLICATIONS_QUERY}, only=True)
+
+        content = self.post({'query': '{ __typename }'}, registry=registry)
+        self.assertEqual(content['errors'][0]['extensions']['code'], 'PERSISTED_QUERY_NOT_ALLOWED')
+
+        content = self.post({'query': PUBLICATIONS_QUERY}, registry=registry)
+        self.assertEqual(content['data']['publications']['totalCount'], 3)
+
+    def test_invalid_persisted_query_is_rejected_at_load(self) -> None:
+        query = '{ unknownField }'
+
+        with self.assertRaises(ImproperlyConfigured):
+            PersistedQueryRegistry(schema, {get_query_hash(query): query})
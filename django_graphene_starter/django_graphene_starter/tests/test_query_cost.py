@@ -0,0 +1,125 @@
+import json
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from mixer.backend.django import mixer
+from starter.models import Article, Reporter
+
+from ..document_cache import build_document
+from ..query_cost import QueryCost, get_query_cost
+from ..schema import schema
+
+NESTED_QUERY = '''
+query reporters($first: Int = 10) {
+  reporters(first: $first) {
+    totalCount
+    edges {
+      node {
+        email
+        articles(first: 5) {
+          edges {
+            node {
+              ...ArticleReporter
+            }
+          }
+        }
+      }
+    }
+  }
+}
+
+fragment ArticleReporter on ArticleNode {
+  reporter {
+    email
+  }
+}
+'''
+
+
+UPDATE_REPORTERS_MUTATION = '''
+mutation updateReporters($input: UpdateReportersInput!) {
+  updateReporters(input: $input) {
+    reporters {
+      id
+    }
+    errors {
+      index
+    }
+  }
+}
+'''
+
+
+@override_settings(RATELIMIT_ENABLE=False, GRAPHQL_QUERY_MAX_COST=1000, GRAPHQL_QUERY_MAX_DEPTH=8)
+class QueryCostTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        mixer.blend(Article, reporter=mixer.blend(Reporter))
+
+    def get_cost(self, query: str, variables: dict = None) -> QueryCost:
+        return get_query_cost(build_document(schema, query), variables, None)
+
+    def post(self, body):
+        return self.client.post('/graphql', json.dumps(body), content_type='application/json')
+
+    def test_connections_multiply_the_cost_of_their_nodes(self) -> None:
+        # 10 reporters + 10 * 5 articles + 10 * 5 reporters of the articles
+        self.assertEqual(self.get_cost(NESTED_QUERY), QueryCost(110, 8))
+        self.assertEqual(self.get_cost(NESTED_QUERY, {'first': 2}).cost, 22)
+
+    def test_page_size_is_capped_by_the_max_limit(self) -> None:
+        self.assertEqual(self.get_cost('{ reporters { edges { node { email } } } }').cost, 5000)
+        self.assertEqual(self.get_cost('{ reporters(first: 100000) { edges { node { email } } } }').cost, 5000)
+        self.assertEqual(self.get_cost('{ reporters(first: 100, last: 3) { edges { node { email } } } }').cost, 3)
+
+    def test_counts_and_introspection_are_cheap(self) -> None:
+        self.assertEqual(self.get_cost('{ reporters { totalCount } }').cost, 1)
+        self.assertEqual(self.get_cost('{ __schema { types { name fields { name } } } }').cost, 0)
+
+    def test_mutation_payload_lists_cost_as_many_items_as_the_input(self) -> None:
+        self.assertEqual(self.get_cost('mutation { updateReporters(input: {reporters: []}) { errors { index } } }').cost, 1)
+        # 1 mutation + 100 reporters + 100 errors at most
+        self.assertEqual(self.get_cost(UPDATE_REPORTERS_MUTATION, {'input': {'reporters': [{'id': str(index)} for index in range(100)]}}).cost, 201)
+        self.assertEqual(self.get_cost('mutation { deleteArticles(input: {ids: ["1", "2"]}) { errors { index } } }').cost, 3)
+
+    def test_expensive_queries_are_rejected_before_execution(self) -> None:
+        with CaptureQueriesContext(connection) as context:
+            response = self.post({'query': NESTED_QUERY, 'variables': {'first': 100}})
+
+        self.assertEqual(response.status_code, 400)
+        content = json.loads(response.content)
+
+        self.assertIn('exceeds the maximum cost of 1000', content['errors'][0]['message'])
+        self.assertEqual(content['extensions']['cost'], {'requestedQueryCost': 1100, 'maximumQueryCost': 1000, 'depth': 8})
+        self.assertEqual(context.captured_queries, [])
+
+    def test_deep_queries_are_rejected(self) -> None:
+        query = '{ articles(first: 1) { edges { node { reporter { articles(first: 1) { edges { node { reporter { email } } } } } } } } }'
+        response = self.post({'query': query})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('exceeds the maximum depth of 8', json.loads(response.content)['errors'][0]['message'])
+
+    def test_cost_is_reported_in_extensions(self) -> None:
+        content = json.loads(self.post({'query': NESTED_QUERY}).content)
+
+        self.assertEqual(len(content['data']['reporters']['edges']), 1)
+        self.assertEqual(content['extensions']['cost'], {'requestedQueryCost': 110, 'maximumQueryCost': 1000, 'depth': 8})
+
+        # Served from the response cache
+        self.assertEqual(json.loads(self.post({'query': NESTED_QUERY}).content)['extensions']['cost']['requestedQueryCost'], 110)
+
+    def test_each_operation_of_a_batch_is_costed(self) -> None:
+        content = json.loads(self.post([{'id': '1', 'query': NESTED_QUERY}, {'id': '2', 'query': NESTED_QUERY, 'variables': {'first': 1000}}]).content)
+
+        self.assertEqual([response['status'] for response in content], [200, 400])
+        self.assertEqual([response['extensions']['cost']['requestedQueryCost'] for response in content], [110, 11000])
+
+    @override_settings(GRAPHQL_QUERY_MAX_COST=0, GRAPHQL_QUERY_MAX_DEPTH=0)
+    def test_limits_can_be_disabled(self) -> None:
+        response = self.post({'query': NESTED_QUERY, 'variables': {'first': 100}})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['extensions']['cost']['maximumQueryCost'], 0)
@@ -0,0 +1,121 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.http.response import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from ratelimit.exceptions import Ratelimited
+from mixer.backend.django import mixer
+from starter.models import Reporter
+
+from ..rate_limit import RatelimitMiddleware, TokenBucket
+
+REPORTERS_QUERY = 'query reporters { reporters(first: 10) { edges { node { email } } } }'
+
+CREATE_PUBLICATION_MUTATION = 'mutation { createPublication(input: {title: "Title"}) { publication { title } } }'
+
+CREATE_PUBLICATIONS_MUTATION = '''
+mutation createPublications($input: CreatePublicationsInput!) {
+  createPublications(input: $input) {
+    publications {
+      id
+    }
+    errors {
+      index
+    }
+  }
+}
+'''
+
+
+@override_settings(GRAPHQL_RATELIMIT_BUDGET=100, GRAPHQL_RATELIMIT_PERIOD=10, GRAPHQL_RATELIMIT_MUTATION_COST=50, GRAPHQL_RESPONSE_CACHE_TIMEOUT=0)
+class RateLimitTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        mixer.cycle(2).blend(Reporter)
+
+    def post(self, body):
+        return self.client.post('/graphql', json.dumps(body), content_type='application/json')
+
+    def test_bucket_refills_over_time(self) -> None:
+        bucket = TokenBucket(capacity=100, period=10)
+
+        with patch('django_graphene_starter.rate_limit.time.time', return_value=1000):
+            self.assertEqual(bucket.consume('key', 60)[1].remaining, 40)
+            allowed, rate_limit = bucket.consume('key', 60)
+
+        self.assertFalse(allowed)
+        self.assertEqual((rate_limit.remaining, rate_limit.retry_after), (40, 2))
+
+        with patch('django_graphene_starter.rate_limit.time.time', return_value=1002):
+            allowed, rate_limit = bucket.consume('key', 60)
+
+        self.assertTrue(allowed)
+        self.assertEqual((rate_limit.remaining, rate_limit.reset), (0, 10))
+
+        with patch('django_graphene_starter.rate_limit.time.time', return_value=2000):
+            self.assertEqual(bucket.consume('key', 1)[1].remaining, 99)  # Idle time does not grow the bucket past its capacity
+
+    @patch('django_graphene_starter.rate_limit.time.time', return_value=1000)
+    def test_operations_are_charged_their_cost(self, _) -> None:
+        response = self.post({'query': REPORTERS_QUERY})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response['RateLimit-Limit'], response['RateLimit-Remaining']), ('100', '90'))
+
+        response = self.post({'query': CREATE_PUBLICATION_MUTATION})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['RateLimit-Remaining'], '37')  # 50 for the mutation + 1 written item + 1 for its payload + 1 for the publication
+
+    # SQLite inserts the rows one by one, see `starter.bulk.bulk_create`
+    @override_settings(GRAPHQL_RATELIMIT_BUDGET=100000, GRAPHQL_RATELIMIT_PERIOD=60, GRAPHQL_RATELIMIT_MUTATION_COST=100, GRAPHQL_N_PLUS_ONE_RAISE=False)
+    def test_bulk_mutations_are_charged_their_input_size(self) -> None:
+        variables = {'input': {'publications': [{'title': f'Title {index}'} for index in range(100)]}}
+
+        with patch('django_graphene_starter.rate_limit.time.time', return_value=1000):
+            for _ in range(50):
+                response = self.post({'query': CREATE_PUBLICATIONS_MUTATION, 'variables': variables})
+                self.assertEqual(response.status_code, 200)
+
+        # 100 for the mutation + 100 written items + 1 for its payload + 100 publications + 100 errors at most
+        self.assertEqual(response['RateLimit-Remaining'], str(100000 - 50 * 401))  # About 250 such batches a minute
+
+    def test_operations_are_rejected_once_the_budget_is_spent(self) -> None:
+        with patch('django_graphene_starter.rate_limit.time.time', return_value=1000):
+            for _ in range(10):
+                self.post({'query': REPORTERS_QUERY})
+
+            response = self.post({'query': REPORTERS_QUERY})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['RateLimit-Remaining'], '0')
+        self.assertEqual(response['Retry-After'], '1')
+
+        with patch('django_graphene_starter.rate_limit.time.time', return_value=1001):
+            self.assertEqual(self.post({'query': REPORTERS_QUERY}).status_code, 200)
+
+    @override_settings(RATELIMIT_ENABLE=False)
+    def test_rate_limit_can_be_disabled(self) -> None:
+        for _ in range(11):
+            response = self.post({'query': REPORTERS_QUERY})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('RateLimit-Remaining'))
+
+
+class RatelimitMiddlewareTests(SimpleTestCase):
+    def test_asgi_requests_stay_on_the_event_loop(self) -> None:
+        async def get_response(request) -> HttpResponse:
+            return HttpResponse()
+
+        middleware = RatelimitMiddleware(get_response)
+
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        self.assertEqual(asyncio.run(middleware(RequestFactory().get('/'))).status_code, 200)
+
+    def test_ratelimited_requests_are_answered_with_429(self) -> None:
+        response = RatelimitMiddleware(lambda request: HttpResponse()).process_exception(RequestFactory().get('/'), Ratelimited())
+
+        self.assertEqual(response.status_code, 429)
@@ -0,0 +1,116 @@
+import json
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from mixer.backend.django import mixer
+from starter.models import Article, Reporter
+
+from ..document_cache import build_document
+from ..response_cache import get_document_info, get_response_cache_key
+from ..schema import schema
+
+REPORTERS_QUERY = 'query reporters { reporters { totalCount } }'
+
+ARTICLES_QUERY = '''
+query articles($headline: String) {
+  articles(headline: $headline) {
+    edges {
+      node {
+        headline
+        ...ArticleReporter
+      }
+    }
+  }
+}
+
+fragment ArticleReporter on ArticleNode {
+  dataloaderReporter {
+    email
+  }
+}
+'''
+
+
+# The LocMemCache of the tests serves a single process, just like a cache shared between workers
+@override_settings(RATELIMIT_ENABLE=False)
+@patch('django_graphene_starter.response_cache.is_cache_shared', return_value=True)
+class ResponseCacheTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = RequestFactory()
+
+        self.reporter = mixer.blend(Reporter)
+        self.article = mixer.blend(Article, reporter=self.reporter)
+
+    def post(self, query: str, variables: dict = None) -> dict:
+        response = self.client.post('/graphql', json.dumps({'query': query, 'variables': variables}), content_type='application/json')
+        return json.loads(response.content)
+
+    def get_key(self, query: str, variables: dict = None, **headers) -> str:
+        request = self.factory.post('/graphql', **headers)
+        return get_response_cache_key(request, build_document(schema, query), variables, None)
+
+    def test_cached_responses_run_no_queries(self, is_cache_shared_mock) -> None:
+        content = self.post(REPORTERS_QUERY)
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.post(REPORTERS_QUERY), content)
+
+        self.assertEqual(context.captured_queries, [])
+
+    def test_writes_invalidate_cached_responses(self, is_cache_shared_mock) -> None:
+        content = self.post(REPORTERS_QUERY)
+        mixer.blend(Reporter)
+
+        self.assertEqual(self.post(REPORTERS_QUERY)['data']['reporters']['totalCount'], content['data']['reporters']['totalCount'] + 1)
+
+    def test_models_of_fragments_are_collected(self, is_cache_shared_mock) -> None:
+        info = get_document_info(build_document(schema, ARTICLES_QUERY))
+
+        self.assertEqual(sorted(info.models), ['starter.article', 'starter.reporter'])
+
+    def test_formatting_does_not_change_the_key(self, is_cache_shared_mock) -> None:
+        self.assertEqual(self.get_key(REPORTERS_QUERY), self.get_key('# Comment\nquery reporters {\n  reporters {\n    totalCount\n  }\n}\n'))
+
+    def test_variables_change_the_key(self, is_cache_shared_mock) -> None:
+        key = self.get_key(ARTICLES_QUERY, {'headline': 'a'})
+
+        self.assertNotEqual(key, self.get_key(ARTICLES_QUERY, {'headline': 'b'}))
+
+    def test_authenticated_requests_are_not_cached(self, is_cache_shared_mock) -> None:
+        self.assertIsNone(self.get_key(REPORTERS_QUERY, HTTP_AUTHORIZATION='JWT token'))
+
+        self.client.force_login(mixer.blend(User))
+        query = 'query reporters { reporters { edges { node { email } } } }'
+        self.post(query)
+        Reporter.objects.update(email='updated@example.com')  # Sends no signal, hence invalidates nothing
+
+        self.assertEqual({edge['node']['email'] for edge in self.post(query)['data']['reporters']['edges']}, {'updated@example.com'})
+
+    def test_user_writes_invalidate_cached_reporters(self, is_cache_shared_mock) -> None:
+        query = 'query reporters { reporters { edges { node { email } } } }'
+        self.post(query)
+
+        user = User.objects.get(pk=self.reporter.pk)
+        user.email = 'updated@example.com'
+        user.save()
+
+        self.assertEqual(self.post(query)['data']['reporters']['edges'][0]['node']['email'], 'updated@example.com')
+
+    def test_mutations_and_debug_queries_are_not_cached(self, is_cache_shared_mock) -> None:
+        self.assertIsNone(self.get_key('mutation { deleteReporter(input: {id: "UmVwb3J0ZXJOb2RlOjE="}) { reporter { email } } }'))
+        self.assertIsNone(self.get_key('query { reporters { totalCount } _debug { sql { rawSql } } }'))
+
+    @override_settings(GRAPHQL_RESPONSE_CACHE_TIMEOUT=0)
+    def test_cache_can_be_disabled(self, is_cache_shared_mock) -> None:
+        self.assertIsNone(self.get_key(REPORTERS_QUERY))
+
+    def test_cache_is_disabled_without_a_shared_cache(self, is_cache_shared_mock) -> None:
+        is_cache_shared_mock.return_value = False
+
+        self.assertIsNone(self.get_key(REPORTERS_QUERY))
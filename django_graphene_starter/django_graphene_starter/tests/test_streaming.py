@@ -0,0 +1,94 @@
+import json
+from collections import OrderedDict
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.client import RequestFactory
+from mixer.backend.django import mixer
+from starter.models import Article, Reporter
+
+from ..streaming import iter_json, orjson
+from ..views import RateLimitedGraphQLView
+
+ARTICLES_QUERY = '''
+query articles($first: Int) {
+  articles(first: $first, orderBy: "headline") {
+    totalCount
+    edges {
+      node {
+        id
+        headline
+        reporter {
+          email
+        }
+      }
+    }
+  }
+}
+'''
+
+
+VALUE = OrderedDict(data={'articles': {'edges': [{'node': {'headline': f'Héadline "{index}"'}} for index in range(100)], 'pageInfo': {'hasNextPage': False}}}, errors=None, count=1.5)
+
+
+@patch('django_graphene_starter.streaming.orjson', None)
+class IterJsonTests(SimpleTestCase):
+    def test_output_matches_json_dumps(self) -> None:
+        chunks = list(iter_json(VALUE, chunk_size=256))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks).decode(), json.dumps(VALUE, separators=(',', ':')))
+
+    def test_scalars_and_empty_containers(self) -> None:
+        for value in (None, 'text', 1, [], {}, {'a': []}, [[1, 2], {'b': None}]):
+            with self.subTest(value=value):
+                self.assertEqual(b''.join(iter_json(value)).decode(), json.dumps(value, separators=(',', ':')))
+
+
+@skipIf(orjson is None, 'orjson is not installed')
+class IterJsonOrjsonTests(SimpleTestCase):
+    def test_output_is_the_same_json(self) -> None:
+        chunks = list(iter_json(VALUE, chunk_size=256))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) == 256 for chunk in chunks[:-1]))
+        self.assertEqual(json.loads(b''.join(chunks)), json.loads(json.dumps(VALUE)))
+
+
+@override_settings(RATELIMIT_ENABLE=False, GRAPHQL_RESPONSE_CACHE_TIMEOUT=0)
+class StreamingResponseTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = RequestFactory()
+
+        for reporter in mixer.cycle(2).blend(Reporter):
+            mixer.cycle(3).blend(Article, reporter=reporter)
+
+    def post(self, body, path: str = '/graphql', **initkwargs):
+        request = self.factory.post(path, json.dumps(body), content_type='application/json')
+        request.user = AnonymousUser()
+        return RateLimitedGraphQLView.as_view(**initkwargs)(request)
+
+    def test_streamed_response_matches_buffered_response(self) -> None:
+        body = {'query': ARTICLES_QUERY, 'variables': {'first': 5}}
+        response = self.post(body, stream_response=True)
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), json.loads(self.post(body).content))
+
+    def test_errors_are_streamed_with_their_status(self) -> None:
+        response = self.post({'query': '{ articles { unknownField } }'}, stream_response=True)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('errors', json.loads(b''.join(response.streaming_content)))
+
+    def test_pretty_responses_are_not_streamed(self) -> None:
+        response = self.post({'query': ARTICLES_QUERY, 'variables': {'first': 1}}, path='/graphql?pretty=1', stream_response=True)
+
+        self.assertFalse(response.streaming)
+        self.assertIn(b'\n', response.content)
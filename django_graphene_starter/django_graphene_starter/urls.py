@@ -1,14 +1,26 @@
+from django.conf import settings
 from django.conf.urls import include, url
 from django.contrib import admin
 from django.urls import path
 from django.views.decorators.csrf import csrf_exempt
 
-from django_graphene_starter.views import HelloView, RateLimitedGraphQLView
+from django_graphene_starter.persisted_queries import PersistedQueryRegistry
+from django_graphene_starter.schema import schema
+from django_graphene_starter.views import AsyncGraphQLView, HelloView, RateLimitedGraphQLView, metrics_view
+
+persisted_queries = PersistedQueryRegistry.from_file(schema, settings.PERSISTED_QUERIES_PATH, only=settings.PERSISTED_QUERIES_ONLY)
+
+if settings.GRAPHQL_ASYNC:
+    graphql_view = AsyncGraphQLView.as_view(graphiql=True, persisted_queries=persisted_queries, stream_response=settings.GRAPHQL_STREAMING_RESPONSE)
+    graphql_view.csrf_exempt = True  # Wrapping the view with `csrf_exempt` would make it synchronous
+else:
+    graphql_view = csrf_exempt(RateLimitedGraphQLView.as_view(graphiql=True, persisted_queries=persisted_queries, stream_response=settings.GRAPHQL_STREAMING_RESPONSE))
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('graphql', csrf_exempt(RateLimitedGraphQLView.as_view(graphiql=True))),
+    path('graphql', graphql_view),
     path('hello', HelloView.as_view()),
+    path('metrics', metrics_view),
     url(r'^silk/', include('silk.urls', namespace='silk')),
 ]
 
@@ -1,17 +1,40 @@
+import asyncio
 import logging
-from typing import Union
+from functools import partial, update_wrapper
+from itertools import chain
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.db import connection, transaction
 from django.http.request import HttpRequest
-from django.http.response import HttpResponse, JsonResponse
+from django.http.response import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
 from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.generic import View
-from graphene_django.views import GraphQLView
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.utils.utils import set_rollback
+from graphene_django.views import GraphQLView, HttpError
+from graphql import GraphQLError
+from graphql.backend.base import GraphQLDocument
 from graphql.execution.base import ExecutionResult
+from promise import Promise
 from ratelimit.decorators import ratelimit
 from sentry_sdk.api import start_transaction
 
+from django_graphene_starter.document_cache import CachedDocumentBackend, document_cache
+from django_graphene_starter.incremental import IDS_VARIABLE, MULTIPART_CONTENT_TYPE, IncrementalPlan, accepts_incremental_delivery, get_deferred_results, get_streamed_ids, get_streamed_results, iter_in_context, iter_multipart, plan_incremental_delivery, pop_deferred_targets, set_streamed_nodes, split_streamed_edges
+from django_graphene_starter.metrics import metrics, record_operation, set_operation_name
+from django_graphene_starter.middlewares import AsyncLoaders, FieldMiddlewareManager, Loaders, SentryMiddleware, SyncToAsyncMiddleware
+from django_graphene_starter.n_plus_one import detect_n_plus_one
+from django_graphene_starter.persisted_queries import PersistedQueryBackend, PersistedQueryRegistry, get_persisted_query_hash
+from django_graphene_starter.query_cost import QueryCost, add_query_cost, check_query_cost, get_query_cost
+from django_graphene_starter.rate_limit import add_rate_limit_headers, charge_operation, charge_operations
+from django_graphene_starter.response_cache import cache_response, get_cached_response, get_response_cache_key
+from django_graphene_starter.streaming import iter_json
 from django_graphene_starter.utils import get_client_ip
 
 logger = logging.getLogger(__name__)
@@ -29,20 +52,489 @@ class HelloView(View):
         return JsonResponse({'message': 'Hello, 世界!'})
 
 
-@method_decorator(ratelimit(key='user_or_ip', rate=settings.RATELIMIT_RATE, method=ratelimit.ALL, block=True), name='execute_graphql_request')
 class RateLimitedGraphQLView(GraphQLView):
     """
-    A basic rate limited GraphQLView
+    A GraphQLView rate limited by query cost which supports persisted queries, batching and response caching
+
+    A JSON array of operations is executed as a batch, e.g.
+
+    [{"id": "1", "query": "query reporters { ... }"}, {"id": "2", "query": "query articles { ... }"}]
+
+    Parsed and validated documents are cached process-wide, see `django_graphene_starter.document_cache`
+
+    With `stream_response`, single operations are answered with a chunked response, encoded by orjson when it is installed,
+    see `django_graphene_starter.streaming`
     """
+    persisted_queries = None
+    stream_response = False
+    charged = False  # Whether the operations of the request were charged to the rate limit beforehand
+
+    def __init__(self, persisted_queries: PersistedQueryRegistry = None, backend=None, stream_response: bool = None, **kwargs):
+        super().__init__(backend=backend or CachedDocumentBackend(document_cache), **kwargs)
+        self.persisted_queries = persisted_queries or self.persisted_queries
+        self.stream_response = self.stream_response if stream_response is None else stream_response
+
+        if self.persisted_queries is not None:
+            self.backend = PersistedQueryBackend(self.backend, self.persisted_queries)
+
+    @method_decorator(ensure_csrf_cookie)
+    def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        self.batch = self.is_batch_request(request)
+        self.charged = False
+        request.loaders = Loaders()
+
+        if not self.batch:
+            if accepts_incremental_delivery(request.META.get('HTTP_ACCEPT', '')):
+                return add_rate_limit_headers(request, self.get_incremental_response(request, *args, **kwargs))
+
+            with record_operation(), detect_n_plus_one():
+                return add_rate_limit_headers(request, self.get_single_response(request, *args, **kwargs))
+
+        try:
+            with record_operation('batch'), detect_n_plus_one():
+                result, status_code = self.get_batch_response(request, self.parse_body(request))
+            return add_rate_limit_headers(request, HttpResponse(status=status_code, content=result, content_type='application/json'))
+        except HttpError as e:
+            return self.get_error_response(request, e)
+
+    def get_error_response(self, request: HttpRequest, error: HttpError) -> HttpResponse:
+        response = error.response
+        response['Content-Type'] = 'application/json'
+        response.content = self.json_encode(request, {'errors': [self.format_error(error)]})
+        return response
+
+    def get_single_response(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        return self.get_streaming_response(request, *args, **kwargs) if self.stream_response else super().dispatch(request, *args, **kwargs)
+
+    def get_incremental_response(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        """
+        Deliver a query operation with `@defer` or `@stream` as a `multipart/mixed` response: its initial payload first,
+        then the nodes of each streamed edges and each deferred fragment resolved by the IDs of the initial payload while the response is sent,
+        see `django_graphene_starter.incremental`
+
+        The operation is checked and charged to the rate limit as a whole, and its parts are recorded and checked for N+1 queries as one operation.
+        Operations which defer nothing are answered as usual, and so are other operations, which may ignore the directives.
+        """
+        plan = None
+
+        try:
+            if request.method.lower() in ('get', 'post'):
+                data = self.parse_body(request)
+                query, variables, operation_name, _ = self.get_graphql_params(request, data)
+                query = self.resolve_persisted_query(request, data, query)
+
+                if query:
+                    document = self.get_backend(request).document_from_string(self.schema, query)
+                    plan = plan_incremental_delivery(document.schema, document.document_ast, variables, operation_name)
+
+                    query_cost = get_query_cost(document, variables, operation_name)
+                    check_query_cost(query_cost)
+        except (HttpError, GraphQLError):
+            plan = None  # Answered with their error by the usual path
+
+        if plan is None:
+            with record_operation(), detect_n_plus_one():
+                return self.get_single_response(request, *args, **kwargs)
+
+        charge_operation(request, query_cost, 'query')
+        self.charged = True
+
+        payloads = iter_in_context(self.iter_incremental_payloads(request, plan, query_cost, variables, operation_name))
+        initial = next(payloads)
+
+        return StreamingHttpResponse(iter_multipart(chain([initial], payloads)), status=200 if 'data' in initial else 400, content_type=MULTIPART_CONTENT_TYPE)
+
+    def iter_incremental_payloads(self, request: HttpRequest, plan: IncrementalPlan, query_cost: QueryCost, variables, operation_name) -> Iterator[Dict]:
+        with record_operation(operation_name), detect_n_plus_one():
+            initial = self.format_execution_result(add_query_cost(query_cost, self.execute_query(request, plan.query, variables, operation_name)))
+            streamed = [(part, *split_streamed_edges(initial['data'], part)) for part in plan.streamed] if initial.get('data') else []
+
+            for part, initial_edges, _ in streamed:
+                execution_result = self.execute_nodes_query(request, part.query, variables, get_streamed_ids(part, initial_edges), operation_name)
+                set_streamed_nodes(execution_result.data, part, initial_edges)
+                if execution_result.errors:
+                    initial.setdefault('errors', []).extend(self.format_error(e) for e in execution_result.errors)
+
+            targets = pop_deferred_targets(initial['data'], plan.deferred) if initial.get('data') else []
+            streamed = [(part, later_edges) for part, _, later_edges in streamed if later_edges]
+            deferred = [(part, part_targets) for part, part_targets in zip(plan.deferred, targets) if part_targets]
+
+            yield {**initial, 'hasNext': bool(streamed or deferred)}
+
+            for index, (part, later_edges) in enumerate(streamed):
+                execution_result = self.execute_nodes_query(request, part.query, variables, get_streamed_ids(part, chain.from_iterable(edges for _, edges in later_edges)), operation_name)
+                for _, edges in later_edges:
+                    set_streamed_nodes(execution_result.data, part, edges)
+
+                yield self.get_incremental_payload(execution_result, get_streamed_results(part, later_edges), has_next=bool(deferred) or index < len(streamed) - 1)
+
+            for index, (part, part_targets) in enumerate(deferred):
+                execution_result = self.execute_nodes_query(request, part.query, variables, [id for _, id in part_targets], operation_name)
+                yield self.get_incremental_payload(execution_result, get_deferred_results(execution_result.data, part, part_targets), has_next=index < len(deferred) - 1)
+
+    def execute_nodes_query(self, request: HttpRequest, query: str, variables, ids: List[str], operation_name) -> ExecutionResult:
+        if not ids:
+            return ExecutionResult(data={})
+
+        return self.execute_query(request, query, {**(variables or {}), IDS_VARIABLE: ids}, operation_name)
+
+    def get_incremental_payload(self, execution_result: ExecutionResult, incremental: List[Dict], has_next: bool) -> Dict:
+        payload = {'incremental': incremental, 'hasNext': has_next}
+        if execution_result.errors:
+            payload['errors'] = [self.format_error(e) for e in execution_result.errors]
+
+        return payload
+
+    def get_streaming_response(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        """
+        Mirrors the single operation path of `GraphQLView.dispatch`, except that the result is sent in chunks, see `iter_json`
+        """
+        try:
+            if request.method.lower() not in ('get', 'post'):
+                raise HttpError(HttpResponseNotAllowed(['GET', 'POST'], 'GraphQL only supports GET and POST requests.'))
+
+            data = self.parse_body(request)
+            if self.graphiql and self.can_display_graphiql(request, data):
+                return super().dispatch(request, *args, **kwargs)
+
+            execution_result = self.get_execution_result(request, data)
+        except HttpError as e:
+            return self.get_error_response(request, e)
+
+        return self.get_json_response(request, self.format_execution_result(execution_result), 400 if execution_result.invalid else 200)
+
+    def get_json_response(self, request: HttpRequest, response: Dict, status: int) -> HttpResponse:
+        if self.stream_response and not (self.pretty or request.GET.get('pretty')):
+            return StreamingHttpResponse(iter_json(response), status=status, content_type='application/json')
+
+        return HttpResponse(status=status, content=self.json_encode(request, response), content_type='application/json')
+
+    def get_response(self, request: HttpRequest, data, show_graphiql: bool = False) -> Tuple[Optional[str], int]:
+        """
+        Mirrors `GraphQLView.get_response`, except that the `extensions` of the result are returned too
+        """
+        execution_result = self.get_execution_result(request, data, show_graphiql)
+        if not execution_result:
+            return None, 200
+
+        return self.json_encode(request, self.format_execution_result(execution_result), pretty=show_graphiql), 400 if execution_result.invalid else 200
+
+    def get_execution_result(self, request: HttpRequest, data, show_graphiql: bool = False) -> Optional[ExecutionResult]:
+        query, variables, operation_name, _ = self.get_graphql_params(request, data)
+        execution_result = self.execute_graphql_request(request, data, query, variables, operation_name, show_graphiql)
+
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+
+        if execution_result and execution_result.errors:
+            set_rollback()
+
+        return execution_result
+
+    def format_execution_result(self, execution_result: ExecutionResult) -> Dict:
+        response = {}
+
+        if execution_result.errors:
+            response['errors'] = [self.format_error(e) for e in execution_result.errors]
+        if not execution_result.invalid:
+            response['data'] = execution_result.data
+        if execution_result.extensions:
+            response['extensions'] = execution_result.extensions
+
+        return response
+
+    def is_batch_request(self, request: HttpRequest) -> bool:
+        return request.method.lower() == 'post' and self.get_content_type(request) == 'application/json' and request.body.lstrip()[:1] == b'['
+
+    def get_batch_response(self, request: HttpRequest, data: List) -> Tuple[str, int]:
+        """
+        Execute every operation of a batch within the same promise tick, so that the DataLoaders of the shared `Loaders`
+        instance (attached to the request by `dispatch`) dispatch the keys of all operations together
+
+        The cost of every operation is charged to the rate limit before any of them runs, see `charge_batch`.
+        Each mutation runs within its own savepoint, rolled back if it fails, see `execute_document`, so that a failing
+        operation leaves the writes of the others in place.
+        """
+        if len(data) > settings.GRAPHQL_BATCH_MAX_SIZE:
+            raise HttpError(HttpResponseBadRequest(f'A batch cannot contain more than {settings.GRAPHQL_BATCH_MAX_SIZE} operations.'))
+
+        if not all(isinstance(entry, dict) for entry in data):
+            raise HttpError(HttpResponseBadRequest('Each operation of a batch must be a JSON object.'))
+
+        params = [self.get_graphql_params(request, entry) for entry in data]
+        self.charge_batch(request, data, params)
+
+        def execute_operation(entry, query, variables, operation_name) -> Union[ExecutionResult, Promise]:
+            setattr(request, MUTATION_ERRORS_FLAG, False)  # Set by the mutations of this operation only
+            return self.execute_graphql_request(request, entry, query, variables, operation_name, False, return_promise=True)
+
+        def execute_batch(_) -> Promise:
+            return Promise.all([execute_operation(entry, query, variables, operation_name) for entry, (query, variables, operation_name, _) in zip(data, params)])
+
+        with start_transaction(op='batch', name=','.join(str(operation_name) for _, _, operation_name, _ in params)):
+            execution_results = Promise.resolve(None).then(execute_batch).get()
+
+        responses = []
+        for execution_result, (_, _, _, id) in zip(execution_results, params):
+            responses.append({'id': id, 'status': 400 if execution_result.invalid else 200, **self.format_execution_result(execution_result)})
+
+        return self.json_encode(request, responses), max(response['status'] for response in responses)
+
+    def charge_batch(self, request: HttpRequest, data: List, params: List[Tuple]) -> None:
+        """
+        Charge the operations of a batch to the rate limit at once, so that a batch running out of budget is rejected before
+        any of its operations, e.g. a mutation, is executed
+
+        Operations which cannot be executed, e.g. invalid or above the cost limit, are charged nothing, as they would be on their own.
+        """
+        operations = []
+
+        for entry, (query, variables, operation_name, _) in zip(data, params):
+            try:
+                document = self.get_backend(request).document_from_string(self.schema, self.resolve_persisted_query(request, entry, query))
+                query_cost = get_query_cost(document, variables, operation_name)
+                check_query_cost(query_cost)
+            except Exception:
+                continue
+
+            operations.append((query_cost, document.get_operation_type(operation_name)))
+
+        charge_operations(request, operations)
+        self.charged = True
 
-    def execute_graphql_request(self, request: HttpRequest, data, query, variables, operation_name, show_graphiql) -> Union[ExecutionResult, None]:
+    def execute_graphql_request(self, request: HttpRequest, data, query, variables, operation_name, show_graphiql, return_promise: bool = False) -> Union[ExecutionResult, Promise, None]:
         """
-        This will run once per GraphQL request
+        This will run once per GraphQL operation
+
+        Mirrors `GraphQLView.execute_graphql_request`, except that the document is looked up once
+        and shared between the operation type lookup and the execution
         """
-        operation_type = self.get_backend(request).document_from_string(self.schema, query).get_operation_type(operation_name)
+        set_operation_name(operation_name)
+
+        try:
+            query = self.resolve_persisted_query(request, data, query)
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e])
+
+        return self.execute_query(request, query, variables, operation_name, show_graphiql, return_promise=return_promise)
+
+    def execute_query(self, request: HttpRequest, query: Optional[str], variables, operation_name, show_graphiql: bool = False, return_promise: bool = False) -> Union[ExecutionResult, Promise, None]:
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest('Must provide query string.'))
+
+        try:
+            document = self.get_backend(request).document_from_string(self.schema, query)
+        except Exception as e:
+            return ExecutionResult(errors=[e], invalid=True)
+
+        operation_type = document.get_operation_type(operation_name)
+
+        if request.method.lower() == 'get' and operation_type and operation_type != 'query':
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseNotAllowed(['POST'], f'Can only perform a {operation_type} operation from a POST request.'))
+
+        if return_promise:
+            # The Sentry transaction spans the whole batch instead
+            return self.execute_costed_document(request, document, operation_type, variables, operation_name, return_promise=True)
 
         with start_transaction(op=operation_type, name=operation_name):
-            return super().execute_graphql_request(request, data, query, variables, operation_name, show_graphiql)
+            return self.execute_costed_document(request, document, operation_type, variables, operation_name)
+
+    def resolve_persisted_query(self, request: HttpRequest, data, query: Union[str, None]) -> Union[str, None]:
+        if self.persisted_queries is None:
+            return query
+
+        return self.persisted_queries.resolve_query(query, get_persisted_query_hash(request, data))
+
+    def execute_costed_document(self, request: HttpRequest, document: GraphQLDocument, operation_type: str, variables, operation_name, return_promise: bool = False) -> Union[ExecutionResult, Promise]:
+        """
+        Reject operations above the cost or depth limits before any SQL runs and report their cost in `extensions`,
+        see `django_graphene_starter.query_cost`, then charge their cost to the rate limit, see `django_graphene_starter.rate_limit`
+        """
+        query_cost = get_query_cost(document, variables, operation_name)
+
+        try:
+            check_query_cost(query_cost)
+        except GraphQLError as e:
+            return add_query_cost(query_cost, ExecutionResult(errors=[e], invalid=True))
+
+        if not self.charged:  # Batches and incremental operations are charged as a whole beforehand, see `charge_batch`
+            charge_operation(request, query_cost, operation_type)
+
+        result = self.execute_cached_document(request, document, operation_type, variables, operation_name, return_promise=return_promise)
+        return Promise.resolve(result).then(partial(add_query_cost, query_cost)) if return_promise else add_query_cost(query_cost, result)
+
+    def execute_cached_document(self, request: HttpRequest, document: GraphQLDocument, operation_type: str, variables, operation_name, return_promise: bool = False) -> Union[ExecutionResult, Promise]:
+        """
+        Serve query operations from the response cache, see `django_graphene_starter.response_cache`
+        """
+        key = get_response_cache_key(request, document, variables, operation_name)
+        if key is None:
+            return self.execute_document(request, document, operation_type, variables, operation_name, return_promise=return_promise)
+
+        cached_response = get_cached_response(key)
+        if cached_response is not None:
+            return cached_response
+
+        result = self.execute_document(request, document, operation_type, variables, operation_name, return_promise=return_promise)
+        return Promise.resolve(result).then(partial(cache_response, key)) if return_promise else cache_response(key, result)
+
+    def execute_document(self, request: HttpRequest, document: GraphQLDocument, operation_type: str, variables, operation_name, return_promise: bool = False) -> Union[ExecutionResult, Promise]:
+        """
+        Mutations are always executed synchronously, so that they run in order and within their own transaction.
+        Within a batch, each mutation runs within its own savepoint, rolled back if it fails.
+
+        Middlewares only run on the fields which need them, see `FieldMiddlewareManager`
+        """
+        options = {
+            'root_value': self.get_root_value(request),
+            'variable_values': variables,
+            'operation_name': operation_name,
+            'context_value': self.get_context(request),
+            'middleware': FieldMiddlewareManager(self.schema, *(self.get_middleware(request) or [])),
+        }
+        if self.executor:
+            options['executor'] = self.executor  # Not a valid argument in all backends
+
+        try:
+            if operation_type == 'mutation' and (self.batch or graphene_settings.ATOMIC_MUTATIONS is True or connection.settings_dict.get('ATOMIC_MUTATIONS', False) is True):
+                with transaction.atomic():
+                    result = document.execute(**options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True or (self.batch and result.errors):
+                        transaction.set_rollback(True)
+                return result
+
+            return document.execute(return_promise=return_promise and operation_type != 'mutation', **options)
+        except Exception as e:
+            return ExecutionResult(errors=[e], invalid=True)
+
+
+class AsyncGraphQLView(RateLimitedGraphQLView):
+    """
+    A RateLimitedGraphQLView which executes queries on the event loop of the ASGI application, see `GRAPHQL_ASYNC`
+
+    Fields are resolved on the event loop and DataLoaders batch on it (see `AsyncLoaders`), only the resolvers
+    hitting the database wait for the ORM thread (see `SyncToAsyncMiddleware`), so that a single worker keeps
+    many slow requests in flight.
+
+    The rate limit and the response cache read and write the Django cache, e.g. Redis, on the ORM thread too (see `execute_costed_document_async`).
+    Mutations, batches, incremental delivery and GraphiQL take the synchronous path of RateLimitedGraphQLView on the ORM thread.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        async def async_view(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            return await view(request, *args, **kwargs)
+
+        return update_wrapper(async_view, view)
+
+    async def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        # The rate limiter and `JSONWebTokenMiddleware` read the user on the event loop, load it on the ORM thread beforehand
+        await sync_to_async(lambda: request.user.is_anonymous)()
+
+        try:
+            params = self.get_async_params(request)
+
+            if params is None:
+                return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+            data, query, variables, operation_name = params
+            request.loaders = AsyncLoaders()
+
+            with start_transaction(op='query', name=operation_name), record_operation(operation_name), detect_n_plus_one():
+                execution_result = await Promise.resolve(self.execute_graphql_request(request, data, query, variables, operation_name, False, return_promise=True))
+        except HttpError as e:
+            return self.get_error_response(request, e)
+
+        response = self.format_execution_result(execution_result)
+        return add_rate_limit_headers(request, self.get_json_response(request, response, 400 if execution_result.invalid else 200))
+
+    def get_async_params(self, request: HttpRequest) -> Optional[Tuple]:
+        """
+        Return the GraphQL params of a request if it is a single query operation, None if it has to take the synchronous path
+        """
+        if request.method.lower() not in ('get', 'post') or self.is_batch_request(request) or accepts_incremental_delivery(request.META.get('HTTP_ACCEPT', '')):
+            return None
+
+        data = self.parse_body(request)
+        if self.graphiql and self.can_display_graphiql(request, data):
+            return None
+
+        query, variables, operation_name, _ = self.get_graphql_params(request, data)
+        if self.get_operation_type(request, data, query, operation_name) != 'query':
+            return None
+
+        return data, query, variables, operation_name
+
+    def get_operation_type(self, request: HttpRequest, data, query: Optional[str], operation_name: Optional[str]) -> Optional[str]:
+        try:
+            query = self.resolve_persisted_query(request, data, query)
+            return self.get_backend(request).document_from_string(self.schema, query).get_operation_type(operation_name)
+        except Exception:
+            return None  # Invalid requests are answered by the synchronous path
+
+    def execute_costed_document(self, request: HttpRequest, document: GraphQLDocument, operation_type: str, variables, operation_name, return_promise: bool = False) -> Union[ExecutionResult, Promise]:
+        if not isinstance(request.loaders, AsyncLoaders):
+            return super().execute_costed_document(request, document, operation_type, variables, operation_name, return_promise=return_promise)
+
+        return Promise.resolve(asyncio.ensure_future(self.execute_costed_document_async(request, document, operation_type, variables, operation_name)))
+
+    async def execute_costed_document_async(self, request: HttpRequest, document: GraphQLDocument, operation_type: str, variables, operation_name) -> ExecutionResult:
+        """
+        `execute_costed_document` and `execute_cached_document` on the event loop, the blocking cache calls wait for the ORM thread
+        """
+        query_cost = get_query_cost(document, variables, operation_name)
+
+        try:
+            check_query_cost(query_cost)
+        except GraphQLError as e:
+            return add_query_cost(query_cost, ExecutionResult(errors=[e], invalid=True))
+
+        await sync_to_async(charge_operation)(request, query_cost, operation_type)
+
+        key = await sync_to_async(get_response_cache_key)(request, document, variables, operation_name)
+        result = await sync_to_async(get_cached_response)(key) if key is not None else None
+
+        if result is None:
+            result = await Promise.resolve(self.execute_document(request, document, operation_type, variables, operation_name, return_promise=True))
+            if key is not None:
+                result = await sync_to_async(cache_response)(key, result)
+
+        return add_query_cost(query_cost, result)
+
+    def get_middleware(self, request: HttpRequest) -> List:
+        middleware = list(super().get_middleware(request) or [])
+        if not isinstance(request.loaders, AsyncLoaders):
+            return middleware  # The synchronous path, already on the ORM thread
+
+        index = next((index for index, instance in enumerate(middleware) if isinstance(instance, SentryMiddleware)), len(middleware))
+
+        return middleware[:index] + [SyncToAsyncMiddleware()] + middleware[index:]
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+    Export the metrics of the GraphQL resolvers, operations and document cache for Prometheus to scrape
+
+    Scrapers authenticate with `Authorization: Bearer <METRICS_TOKEN>`, staff users with their session.
+    """
+    if not (request.user.is_staff or is_metrics_token(request.META.get('HTTP_AUTHORIZATION', ''))):
+        return HttpResponseForbidden()
+
+    cache_info = document_cache.cache_info()
+    gauges = {f'graphql_document_cache_{name}': value for name, value in cache_info._asdict().items()}
+
+    return HttpResponse(metrics.render(gauges), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def is_metrics_token(authorization: str) -> bool:
+    scheme, _, token = authorization.partition(' ')
+    return bool(settings.METRICS_TOKEN) and scheme.lower() == 'bearer' and constant_time_compare(token, settings.METRICS_TOKEN)
 
 
 def ratelimited_error(request: HttpRequest, exception: Exception) -> JsonResponse:
@@ -52,8 +544,12 @@ def ratelimited_error(request: HttpRequest, exception: Exception) -> JsonRespons
     del exception  # Unused.
 
     ip_address = get_client_ip(request)
-    logger.warning(f'Client with IP Address {ip_address} is making requests exceeding the rate limit of {settings.RATELIMIT_RATE}!', extra=dict(ip_address=ip_address, ratelimit_rate=settings.RATELIMIT_RATE))
-    return JsonResponse({'error': 'You are making too many requests! Slow down and enjoy the moment you’re in.'}, status=429)
+    rate_limit = getattr(request, 'rate_limit', None)  # Set by the cost based rate limit of GraphQL operations, see `charge_operation`
+    ratelimit_rate = f'{rate_limit.limit}/{settings.GRAPHQL_RATELIMIT_PERIOD}s of query cost' if rate_limit else settings.RATELIMIT_RATE
+
+    logger.warning(f'Client with IP Address {ip_address} is making requests exceeding the rate limit of {ratelimit_rate}!', extra=dict(ip_address=ip_address, ratelimit_rate=ratelimit_rate))
+    response = JsonResponse({'error': 'You are making too many requests! Slow down and enjoy the moment you’re in.'}, status=429)
+    return add_rate_limit_headers(request, response)
 
 
 def custom_page_not_found_view(request: HttpRequest, *args, **kwargs) -> HttpResponse:
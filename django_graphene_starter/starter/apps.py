@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class StarterConfig(AppConfig):
     name = 'starter'
+
+    def ready(self):
+        from . import signals  # noqa: F401
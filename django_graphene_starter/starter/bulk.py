@@ -0,0 +1,265 @@
+import logging
+from collections import defaultdict, namedtuple
+from functools import reduce
+from operator import or_
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connections, router, transaction
+from django.db.models import Model, Q
+from graphql_relay import from_global_id
+
+from .cache import bump_model_version, node_cache
+from .types import ItemError
+
+logger = logging.getLogger(__name__)
+
+BulkResult = namedtuple('BulkResult', ['instances', 'errors'])
+
+# The message of the items which the database rejected, its error is logged rather than returned as it may expose SQL
+WRITE_FAILED_MESSAGE = 'Could not be saved.'
+
+
+def load_instances(node_type, global_ids: Sequence[str]) -> Tuple[List[Optional[Model]], List[ItemError]]:
+    """
+    Load the instances of a list of global IDs with a single `in_bulk` query
+
+    Returns the instances in the order of the IDs, None where an ID is invalid or not found, and the error of each such ID
+    """
+    model = node_type._meta.model
+    pks = [decode_global_id(node_type, global_id) for global_id in global_ids]
+    errors = [ItemError(index=index, field='id', messages=[f'Invalid {node_type._meta.name} ID.']) for index, pk in enumerate(pks) if pk is None]
+
+    instances_by_pk = model.objects.in_bulk([pk for pk in pks if pk is not None])
+    instances = [instances_by_pk.get(pk) if pk is not None else None for pk in pks]
+    errors.extend(ItemError(index=index, field='id', messages=[f'{model.__name__} not found.']) for index, (pk, instance) in enumerate(zip(pks, instances)) if pk is not None and instance is None)
+
+    return instances, errors
+
+
+def load_related_pks(node_type, global_ids_per_item: Sequence[Optional[Sequence[str]]], field: str) -> Tuple[List[Optional[List]], List[ItemError]]:
+    """
+    Decode the lists of global IDs of a relation given by each item, and verify them all with a single `in_bulk` query
+
+    Returns the primary keys of each item, None where the item gave no list or any of its IDs is invalid or not found, and the error of each such item
+    """
+    model = node_type._meta.model
+    pks_per_item = [None if global_ids is None else [decode_global_id(node_type, global_id) for global_id in global_ids] for global_ids in global_ids_per_item]
+    found = set(model.objects.only(model._meta.pk.name).in_bulk({pk for pks in pks_per_item if pks for pk in pks if pk is not None}))
+    errors = []
+
+    for index, pks in enumerate(pks_per_item):
+        if pks is not None and not found.issuperset(pks):
+            errors.append(ItemError(index=index, field=field, messages=[f'{model.__name__} not found.']))
+            pks_per_item[index] = None
+
+    return pks_per_item, errors
+
+
+def decode_global_id(node_type, global_id: str):
+    """
+    Return the primary key of a global ID of the given node type, None if the ID is invalid or of another type
+    """
+    try:
+        type_name, id = from_global_id(global_id)
+        return node_type._meta.model._meta.pk.to_python(id) if type_name == node_type._meta.name else None
+    except (ValidationError, ValueError, TypeError):
+        return None
+
+
+def set_related_pks(descriptor, related_pks: Dict) -> None:
+    """
+    Replace the related objects of many-to-many relations, e.g. `set_related_pks(Article.publications, {article.pk: [publication.pk]})`
+
+    The existing links are read with a single query, then only the missing ones are inserted with a single bulk insert
+    and the stale ones are removed with a single delete, unchanged links are not rewritten.
+    `m2m_changed` is not sent, so the versions of both models are bumped instead, see `starter.signals`
+    """
+    if not related_pks:
+        return
+
+    field = descriptor.field
+    through = descriptor.through
+    source = through._meta.get_field(field.m2m_field_name()).attname
+    target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+
+    existing = set(through.objects.filter(**{f'{source}__in': related_pks}).values_list(source, target))
+    wanted = {(pk, related_pk) for pk, pks in related_pks.items() for related_pk in pks}
+
+    through.objects.bulk_create([through(**{source: pk, target: related_pk}) for pk, related_pk in wanted - existing])
+
+    stale = defaultdict(list)
+    for pk, related_pk in existing - wanted:
+        stale[pk].append(related_pk)
+
+    if stale:
+        through.objects.filter(reduce(or_, (Q(**{source: pk, f'{target}__in': pks}) for pk, pks in stale.items()))).delete()
+
+    bump_model_version(field.model)
+    bump_model_version(field.related_model)
+
+
+def set_fields(instances: List[Optional[Model]], items: Sequence[Dict], exclude: Iterable[str] = ('id',)) -> Set[str]:
+    """
+    Set the fields given by each input item, other than its `id`, on its instance and return the names of every field set
+    """
+    fields = set()
+
+    for instance, item in zip(instances, items):
+        if instance is None:
+            continue
+
+        for field, value in item.items():
+            if field not in exclude:
+                setattr(instance, field, value)
+                fields.add(field)
+
+    return fields
+
+
+def discard_failed(instances: List[Optional[Model]], errors: List[ItemError]) -> None:
+    for error in errors:
+        instances[error.index] = None
+
+
+def validate_instances(instances: List[Optional[Model]], errors: List[ItemError]) -> None:
+    """
+    Run the field and uniqueness validation of every instance without a query per instance, and drop the invalid ones from `instances`
+
+    Relations are not validated, they are set by the mutations rather than taken from the input.
+    """
+    for index, instance in enumerate(instances):
+        if instance is None:
+            continue
+
+        try:
+            instance.clean_fields(exclude=[field.name for field in instance._meta.concrete_fields if field.is_relation])
+            instance.clean()
+        except ValidationError as error:
+            errors.extend(ItemError(index=index, field=None if field == '__all__' else field, messages=messages) for field, messages in error.message_dict.items())
+            instances[index] = None
+
+    validate_unique(instances, errors)
+
+
+def validate_unique(instances: List[Optional[Model]], errors: List[ItemError]) -> None:
+    """
+    Check the unique fields of every instance against the database, with a query per unique constraint, and against the
+    instances before it, and drop the duplicates from `instances`, like `Model.validate_unique` does one instance at a time
+    """
+    indexes = [index for index, instance in enumerate(instances) if instance is not None]
+    if not indexes:
+        return
+
+    unique_checks, _ = instances[indexes[0]]._get_unique_checks()
+
+    for model_class, unique_check in unique_checks:
+        if model_class._meta.pk.name in unique_check:
+            continue  # Set by the database or loaded from it
+
+        attnames = [model_class._meta.get_field(name).attname for name in unique_check]
+        values = {index: tuple(getattr(instances[index], attname) for attname in attnames) for index in indexes if instances[index] is not None}
+        values = {index: value for index, value in values.items() if None not in value}
+        if not values:
+            continue
+
+        lookup = reduce(or_, (Q(**dict(zip(attnames, value))) for value in set(values.values())))
+        pks = [instances[index].pk for index in values if instances[index].pk is not None]
+        taken = set(model_class._default_manager.filter(lookup).exclude(pk__in=pks).values_list(*attnames))
+
+        for index, value in values.items():
+            if value in taken:
+                error = instances[index].unique_error_message(model_class, unique_check)
+                errors.append(ItemError(index=index, field=unique_check[0] if len(unique_check) == 1 else None, messages=error.messages))
+                instances[index] = None
+
+            taken.add(value)
+
+
+def bulk_create(model: Model, instances: List[Optional[Model]], errors: List[ItemError], related: Optional[Dict] = None) -> BulkResult:
+    """
+    Insert the valid instances with `bulk_create`, one transaction per batch of `BULK_MUTATION_BATCH_SIZE` instances
+
+    `related` maps many-to-many descriptors to the related primary keys of each instance, None to leave them as they are, see `set_related_pks`
+
+    NOTE: Databases which cannot return the primary keys of a bulk insert, e.g. SQLite, insert the instances one by one in the same transaction
+    """
+    def create(batch: List[Model]) -> None:
+        if connections[router.db_for_write(model)].features.can_return_rows_from_bulk_insert:
+            model.objects.bulk_create(batch)
+        else:
+            for instance in batch:
+                instance.save(force_insert=True)
+
+    return _write_in_batches(model, instances, errors, create, related)
+
+
+def bulk_update(model: Model, instances: List[Optional[Model]], errors: List[ItemError], fields: Iterable[str], related: Optional[Dict] = None) -> BulkResult:
+    fields = list(fields)
+
+    def update(batch: List[Model]) -> None:
+        if fields:
+            model.objects.bulk_update(batch, fields)
+
+        for instance in batch:
+            node_cache.delete(model, instance.pk)
+
+    return _write_in_batches(model, instances, errors, update, related)
+
+
+def bulk_delete(model: Model, instances: List[Optional[Model]], errors: List[ItemError]) -> BulkResult:
+    """
+    Delete the found instances, one transaction and one `DELETE ... WHERE id IN (...)` per batch
+
+    Deletes send `post_delete` for every instance, which invalidates the caches as usual.
+    """
+    def delete(batch: List[Model]) -> None:
+        model.objects.filter(pk__in=[instance.pk for instance in batch]).delete()
+
+    return _write_in_batches(model, instances, errors, delete)
+
+
+def _write_in_batches(model: Model, instances: List[Optional[Model]], errors: List[ItemError], write: Callable[[List[Model]], None], related: Optional[Dict] = None) -> BulkResult:
+    """
+    Write the instances which are not None in batches, a failing batch is rolled back then written again one instance at
+    a time, so that only the instances which fail on their own are reported as errors
+
+    `bulk_create` and `bulk_update` send no `post_save`, so the version of the model is bumped once per batch instead, see `starter.signals`
+    """
+    indexes = [index for index, instance in enumerate(instances) if instance is not None]
+    batch_size = settings.BULK_MUTATION_BATCH_SIZE
+
+    def write_batch(batch: List[int]) -> bool:
+        states = [(instances[index].pk, instances[index]._state.adding) for index in batch]
+
+        try:
+            with transaction.atomic(using=router.db_for_write(model)):
+                write([instances[index] for index in batch])
+
+                for descriptor, related_pks in (related or {}).items():
+                    set_related_pks(descriptor, {instances[index].pk: related_pks[index] for index in batch if related_pks[index] is not None})
+        except DatabaseError:
+            logger.exception(f'Failed to write a batch of {len(batch)} {model.__name__}.')
+
+            # Left as before the rolled back write, e.g. without the primary key of a rolled back insert
+            for index, (pk, adding) in zip(batch, states):
+                instances[index].pk, instances[index]._state.adding = pk, adding
+
+            return False
+
+        return True
+
+    for start in range(0, len(indexes), batch_size):
+        batch = indexes[start:start + batch_size]
+
+        if not write_batch(batch):
+            failed = [index for index in batch if not write_batch([index])] if len(batch) > 1 else batch
+
+            for index in failed:
+                errors.append(ItemError(index=index, field=None, messages=[WRITE_FAILED_MESSAGE]))
+                instances[index] = None
+
+        bump_model_version(model)
+
+    return BulkResult(instances, sorted(errors, key=lambda error: error.index))
@@ -0,0 +1,134 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Hashable, Optional, Sequence
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ValidationError
+from django.db.models import Model
+
+
+def is_cache_shared() -> bool:
+    """
+    Whether the default cache is shared between processes, e.g. Redis, unlike the per-process `LocMemCache` Django defaults to
+
+    Version tags bumped by one worker only reach the other workers through a shared cache.
+    """
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def get_model_version(model: Model) -> int:
+    """
+    Return the current version tag of a model
+
+    Cache keys which embed the version tag are invalidated in O(1) by bumping the version on writes, see `starter.signals`
+    """
+    return cache.get_or_set(_get_version_key(model), 1, timeout=None)
+
+
+def bump_model_version(model: Model) -> None:
+    key = _get_version_key(model)
+
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)  # The version tag was evicted or never read, any value other than the default works
+
+
+def _get_version_key(model: Model) -> str:
+    return f'version:{model._meta.concrete_model._meta.label_lower}'
+
+
+class NodeCache:
+    """
+    A read-through cache of model instances by primary key, with a bounded in-process LRU tier in front of the shared cache
+
+    Only the given concrete fields are cached, e.g. the fields exposed by a node type, never the password hash of a Reporter.
+    Writes delete the entries of both tiers and bump the version of the model, see `starter.signals`, then mutations write the saved instance through.
+    The entries of the in-process tier are tagged with the version of their model, so that the writes of other processes invalidate them too.
+
+    Without a shared cache, see `is_cache_shared`, the writes of other processes would not reach this one, so nothing is cached.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, model: Model, pk, fields: Sequence[str], load: Callable[[], Optional[Model]]) -> Optional[Model]:
+        try:
+            key = _get_node_key(model, pk)
+        except ValidationError:
+            return load()  # Not a valid primary key, let the database lookup fail the usual way
+
+        if not is_cache_shared():
+            return load()
+
+        fields = tuple(fields)
+        version = get_model_version(model)
+
+        entry = self._get_local(key, version)
+        if entry is None:
+            entry = cache.get(key)
+            if entry is not None:
+                self._set_local(key, version, entry)
+
+        if entry is None or entry[0] != fields:  # Missing, or cached for other fields, e.g. before a deployment
+            instance = load()
+            if instance is not None:
+                self.set(instance, fields)
+            return instance
+
+        return model.from_db(None, fields, entry[1])
+
+    def set(self, instance: Model, fields: Sequence[str]) -> None:
+        if not is_cache_shared():
+            return
+
+        key = _get_node_key(type(instance), instance.pk)
+        entry = (tuple(fields), tuple(getattr(instance, attname) for attname in fields))
+
+        cache.set(key, entry, timeout=settings.NODE_CACHE_TIMEOUT)
+        self._set_local(key, get_model_version(type(instance)), entry)
+
+    def delete(self, model: Model, pk) -> None:
+        key = _get_node_key(model, pk)
+
+        cache.delete(key)
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def _get_local(self, key: Hashable, version: int) -> Optional[tuple]:
+        with self.lock:
+            if key not in self.entries:
+                return None
+
+            expires_at, entry_version, entry = self.entries[key]
+            if expires_at < time.monotonic() or entry_version != version:
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return entry
+
+    def _set_local(self, key: Hashable, version: int, entry: tuple) -> None:
+        with self.lock:
+            self.entries[key] = (time.monotonic() + settings.NODE_CACHE_LOCAL_TIMEOUT, version, entry)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+def _get_node_key(model: Model, pk) -> str:
+    concrete_model = model._meta.concrete_model
+    return f'node:{concrete_model._meta.label_lower}:{concrete_model._meta.pk.to_python(pk)}'
+
+
+node_cache = NodeCache(maxsize=settings.NODE_CACHE_SIZE)
@@ -0,0 +1,75 @@
+import hashlib
+from typing import Optional, Union
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Manager, Model
+from django.db.models.query import QuerySet
+
+from .cache import get_model_version, is_cache_shared
+
+
+def count_queryset(queryset: QuerySet, estimate: bool = False) -> int:
+    """
+    Count a queryset for `totalCount`, from cheapest to most expensive:
+
+    1. If `estimate` is allowed and the queryset is unfiltered, use the planner estimate when it is above `TOTAL_COUNT_ESTIMATE_THRESHOLD`
+    2. Use the exact count cached per filter signature for `TOTAL_COUNT_CACHE_TIMEOUT` seconds, invalidated on writes to the model
+    3. Run `SELECT COUNT(*)`
+
+    Counts are only cached in a shared cache, see `starter.cache.is_cache_shared`, as the writes of other processes would not invalidate them otherwise.
+
+    NOTE: Never use this count where it drives pagination, it may be estimated or cached, count the queryset itself
+    """
+    if estimate and not queryset.query.where:
+        estimated_count = estimate_count(queryset.model, using=queryset.db)
+        if estimated_count is not None and estimated_count >= settings.TOTAL_COUNT_ESTIMATE_THRESHOLD:
+            return estimated_count
+
+    if not is_cache_shared():
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    signature = hashlib.sha1(f'{sql}{params}'.encode()).hexdigest()
+    key = f'total_count:{queryset.model._meta.label_lower}:{get_model_version(queryset.model)}:{signature}'
+
+    return cache.get_or_set(key, queryset.count, timeout=settings.TOTAL_COUNT_CACHE_TIMEOUT)
+
+
+def estimate_count(model: Model, using: str = 'default') -> Optional[int]:
+    """
+    Return the row count estimated by the PostgreSQL planner (`pg_class.reltuples`) which is kept up to date by VACUUM and ANALYZE
+
+    Returns None for other databases or if the table was never analyzed
+    """
+    connection = connections[using]
+
+    if connection.vendor != 'postgresql':
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [model._meta.db_table])
+        row = cursor.fetchone()
+
+    return int(row[0]) if row and row[0] >= 0 else None
+
+
+def get_related_lookup(iterable: Union[Manager, QuerySet]) -> Optional[str]:
+    """
+    Return the lookup from the related model back to the parent instance of a related manager, e.g.
+
+    article.publications -> 'articles'
+    publication.articles -> 'publications'
+    reporter.articles -> 'reporter'
+    """
+    if not hasattr(iterable, 'instance'):
+        return None
+
+    if hasattr(iterable, 'query_field_name'):
+        return iterable.query_field_name  # Many-to-many
+
+    if hasattr(iterable, 'core_filters'):
+        return iterable.field.name  # Reverse foreign key
+
+    return None
@@ -0,0 +1,410 @@
+import json
+from itertools import islice
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Model, Q, prefetch_related_objects
+from django.db.models.query import QuerySet
+from graphene.relay import PageInfo
+from graphene_django.filter import DjangoFilterConnectionField
+from graphene_django.utils import maybe_queryset
+from graphql import GraphQLError
+from graphql.execution.base import ResolveInfo
+from graphql_relay.connection.arrayconnection import connection_from_list_slice, cursor_to_offset, get_offset_with_default, offset_to_cursor
+from graphql_relay.utils import base64, unbase64
+from promise import Promise
+
+from .counts import get_related_lookup
+from .optimizer import PAGINATION_ARGUMENTS, get_page_limit, get_selections, is_count_only_selection, optimize_queryset
+
+
+def resolves_without_query(predicate: Callable[..., bool] = None) -> Callable:
+    """
+    Mark a resolver which sends no SQL query, or none when `predicate` holds, so that `SyncToAsyncMiddleware` resolves it
+    on the event loop instead of the ORM thread. `predicate` is called with the arguments of the resolver, but `cls`.
+    """
+
+    def decorator(resolver: Callable) -> Callable:
+        resolver.resolves_without_query = predicate or (lambda *args, **kwargs: True)
+        return resolver
+
+    return decorator
+
+
+def is_connection_served_without_query(resolver, connection, default_manager, queryset_resolver, max_limit, enforce_first_or_last, root, info: ResolveInfo, **args) -> bool:
+    """
+    Whether `OptimizedConnectionField.connection_resolver` serves a nested connection without a query of its own,
+    i.e. counted by a DataLoader or prefetched by its parent connection
+    """
+    if root is None or any(value is not None for name, value in args.items() if name not in PAGINATION_ARGUMENTS):
+        return False
+
+    iterable = resolver(root, info, **args)
+    if is_count_only_selection(info.field_asts, info.fragments):
+        return get_related_lookup(iterable) is not None
+
+    queryset = maybe_queryset(iterable)
+    return isinstance(queryset, QuerySet) and queryset._result_cache is not None
+
+
+def get_limited_prefetch_lookup(iterable, info: ResolveInfo, args) -> Optional[str]:
+    """
+    Return the lookup of a nested connection prefetched up to the rows of its page, see `limit_per_parent`, when it
+    selects `totalCount` and has at least as many rows as the page may need, so that their number is not its total count
+    """
+    queryset = maybe_queryset(iterable)
+    if not isinstance(queryset, QuerySet) or queryset._result_cache is None:
+        return None
+
+    limit = get_page_limit(args.get('first'), args.get('after'), args.get('offset'))
+    if limit is None or len(queryset._result_cache) < limit or 'totalCount' not in {selection.name.value for selection in get_selections(info.field_asts, info.fragments)}:
+        return None
+
+    return get_related_lookup(iterable)
+
+
+class OptimizedConnectionField(DjangoFilterConnectionField):
+    """
+    A DjangoFilterConnectionField which plans `select_related`, `prefetch_related` and `only` from the selection set
+
+    Nested connections that were prefetched by their parent connection are served from the prefetch cache
+    as long as no filtering arguments are given, up to the rows of their page when paginated with `first`, see
+    `limit_per_parent`. Nested connections which only select `totalCount`, or select it on such a page, are counted
+    in batch with a single GROUP BY query for all their parents.
+
+    Pages of at least `GRAPHQL_CONNECTION_ITERATOR_THRESHOLD` edges are built lazily from the queryset, see `QuerySetEdges`.
+    """
+
+    @classmethod
+    @resolves_without_query(is_connection_served_without_query)
+    def connection_resolver(cls, resolver, connection, default_manager, queryset_resolver, max_limit, enforce_first_or_last, root, info: ResolveInfo, **args):
+        if root is not None and is_count_only_selection(info.field_asts, info.fragments) and not any(value is not None for name, value in args.items() if name not in PAGINATION_ARGUMENTS):
+            iterable = resolver(root, info, **args)
+            attr = get_related_lookup(iterable)
+
+            if attr is not None:
+                loader = info.context.loaders.get_count_loader(connection._meta.node, attr)
+                return Promise.resolve(loader.load(root.pk)).then(lambda count: cls.resolve_count_only_connection(connection, iterable, count))
+
+        attr = get_limited_prefetch_lookup(resolver(root, info, **args), info, args) if root is not None else None
+        resolved = super().connection_resolver(resolver, connection, default_manager, queryset_resolver, max_limit, enforce_first_or_last, root, info, **args)
+
+        if attr is not None:
+            loader = info.context.loaders.get_count_loader(connection._meta.node, attr)
+            return Promise.all([resolved, loader.load(root.pk)]).then(lambda results: cls.set_length(*results))
+
+        return resolved
+
+    @classmethod
+    def set_length(cls, connection, count: int):
+        connection.length = count
+        return connection
+
+    @classmethod
+    def resolve_count_only_connection(cls, connection, iterable, count: int):
+        connection = connection(edges=[], page_info=PageInfo(has_previous_page=False, has_next_page=False))
+        connection.iterable = iterable
+        connection.length = count
+        return connection
+
+    @classmethod
+    def resolve_connection(cls, connection, args, iterable, max_limit=None):
+        """
+        Mirrors `DjangoConnectionField.resolve_connection`, except that large pages are fetched in chunks, see `QuerySetEdges`
+
+        The exact count bounding the page is reused by `totalCount`, it is never cached nor estimated, which could cut pages short.
+        """
+        offset = args.pop('offset', None)
+        after = args.get('after')
+        if offset:
+            if after:
+                offset += cursor_to_offset(after) + 1
+            # input offset starts at 1 while the graphene offset starts at 0
+            args['after'] = offset_to_cursor(offset - 1)
+
+        iterable = maybe_queryset(iterable)
+
+        list_length = iterable.count() if isinstance(iterable, QuerySet) else len(iterable)
+        list_slice_length = min(max_limit, list_length) if max_limit is not None else list_length
+
+        after = min(get_offset_with_default(args.get('after'), -1) + 1, list_length)
+
+        if max_limit is not None and 'first' not in args:
+            if 'last' in args:
+                args['first'] = list_length
+                list_slice_length = list_length
+            else:
+                args['first'] = max_limit
+
+        start_offset, end_offset = get_slice_offsets(args, after, list_length, list_slice_length)
+        threshold = settings.GRAPHQL_CONNECTION_ITERATOR_THRESHOLD
+
+        if isinstance(iterable, QuerySet) and threshold and end_offset - start_offset >= threshold:
+            connection = connection_from_queryset_slice(iterable, args, start_offset, end_offset, list_length, connection)
+        else:
+            connection = connection_from_list_slice(
+                iterable[after:],
+                args,
+                slice_start=after,
+                list_length=list_length,
+                list_slice_length=list_slice_length,
+                connection_type=connection,
+                edge_type=connection.Edge,
+                pageinfo_type=PageInfo,
+            )
+        connection.iterable = iterable
+        connection.length = list_length
+        return connection
+
+    @classmethod
+    def resolve_queryset(cls, connection, iterable, info: ResolveInfo, args, filtering_args, filterset_class):
+        queryset = maybe_queryset(iterable)
+
+        if isinstance(queryset, QuerySet) and queryset._result_cache is not None and not any(args.get(name) is not None for name in filtering_args):
+            return list(queryset)
+
+        queryset = super().resolve_queryset(connection, iterable, info, args, filtering_args, filterset_class)
+        return cls.optimize_queryset(queryset, info)
+
+    @classmethod
+    def optimize_queryset(cls, queryset: QuerySet, info: ResolveInfo) -> QuerySet:
+        return optimize_queryset(queryset, info)
+
+
+class QuerySetEdges:
+    """
+    The edges of a page, built while they are iterated from rows fetched `GRAPHQL_CONNECTION_ITERATOR_CHUNK_SIZE` at a time
+
+    graphql-core completes the items of a list one after the other, so only a chunk of model instances, pruned
+    by `only()`, is held at once instead of the whole page. Iterating again, e.g. for an aliased `edges`, queries again.
+    """
+
+    def __init__(self, queryset: QuerySet, edge_type, start_offset: int):
+        self.queryset = queryset
+        self.edge_type = edge_type
+        self.start_offset = start_offset
+
+    def __iter__(self):
+        chunk_size = settings.GRAPHQL_CONNECTION_ITERATOR_CHUNK_SIZE
+
+        for index, node in enumerate(iterate_in_chunks(self.queryset, chunk_size)):
+            yield self.edge_type(node=node, cursor=offset_to_cursor(self.start_offset + index))
+
+            if (index + 1) % chunk_size == 0:
+                run_queued_callbacks()
+
+
+def iterate_in_chunks(queryset: QuerySet, chunk_size: int) -> Iterator[Model]:
+    """
+    Iterate over `queryset.iterator(chunk_size)`, a server-side cursor where supported, prefetching the related objects of each chunk
+
+    Django 3.2 ignores `prefetch_related` on `QuerySet.iterator`, which would resolve the nested connections one row at a time.
+    """
+    rows = queryset.iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+
+        prefetch_related_objects(chunk, *queryset._prefetch_related_lookups)
+        yield from chunk
+        del chunk  # Release the instances before fetching the next chunk
+
+
+def run_queued_callbacks() -> None:
+    """
+    Run the promise callbacks queued so far, e.g. the completion of the edges already iterated
+
+    graphql-core completes the values resolved as a Promise, which are all the fields going through a middleware,
+    in callbacks that only run once the current one returns, holding on to every node of the page until then.
+    Waiting on a callback queued after them runs them first.
+
+    DataLoaders queue their dispatch the same way, so they batch the keys of a chunk at a time: the nested prefetches
+    and DataLoader batches run once per chunk instead of once per page, e.g. 30 queries instead of 6 for a page of
+    250 edges in chunks of 40. The memory is traded for queries, hence `GRAPHQL_CONNECTION_ITERATOR_THRESHOLD` is 0 by default.
+    """
+    Promise.resolve(None).then(lambda _: None).get()
+
+
+def get_slice_offsets(args, slice_start: int, list_length: int, list_slice_length: int) -> Tuple[int, int]:
+    """
+    Return the offsets of the first and past the last edge of a page, as computed by `connection_from_list_slice`
+    """
+    before_offset = get_offset_with_default(args.get('before'), list_length)
+    after_offset = get_offset_with_default(args.get('after'), -1)
+
+    start_offset = max(slice_start - 1, after_offset, -1) + 1
+    end_offset = min(slice_start + list_slice_length, before_offset, list_length)
+
+    if isinstance(args.get('first'), int):
+        end_offset = min(end_offset, start_offset + args['first'])
+    if isinstance(args.get('last'), int):
+        start_offset = max(start_offset, end_offset - args['last'])
+
+    return start_offset, end_offset
+
+
+def connection_from_queryset_slice(queryset: QuerySet, args, start_offset: int, end_offset: int, list_length: int, connection_type):
+    """
+    Same as `connection_from_list_slice`, except that the page is not fetched until its `edges` are iterated, see `QuerySetEdges`
+    """
+    after, before = args.get('after'), args.get('before')
+    lower_bound = get_offset_with_default(after, -1) + 1 if after else 0
+    upper_bound = get_offset_with_default(before, list_length) if before else list_length
+    has_edges = end_offset > start_offset
+
+    return connection_type(
+        edges=QuerySetEdges(queryset[start_offset:end_offset], connection_type.Edge, start_offset),
+        page_info=PageInfo(
+            start_cursor=offset_to_cursor(start_offset) if has_edges else None,
+            end_cursor=offset_to_cursor(end_offset - 1) if has_edges else None,
+            has_previous_page=isinstance(args.get('last'), int) and start_offset > lower_bound,
+            has_next_page=isinstance(args.get('first'), int) and end_offset < upper_bound,
+        ),
+    )
+
+
+class KeysetConnectionField(OptimizedConnectionField):
+    """
+    An OptimizedConnectionField which paginates by seeking on the sort key instead of using an offset
+
+    The cursor encodes the values of the `orderBy` fields (or the default model ordering) plus the primary key as a tiebreaker, e.g.
+    `orderBy: "-pubDate"` paginates on `(pub_date DESC, id ASC)` and `after` becomes:
+
+    WHERE pub_date < '2021-01-01' OR (pub_date = '2021-01-01' AND id > 42) ORDER BY pub_date DESC, id ASC LIMIT 11
+
+    This way, fetching the N-th page costs the same as fetching the first page.
+    """
+
+    @classmethod
+    def optimize_queryset(cls, queryset: QuerySet, info: ResolveInfo) -> QuerySet:
+        ordering = get_keyset_ordering(queryset)
+        only = [field.lstrip('-') for field in ordering if field.lstrip('-') not in queryset.query.annotations]  # Annotations, e.g. `search_rank`, are always selected
+        return optimize_queryset(queryset, info, only=only).order_by(*ordering)
+
+    @classmethod
+    def resolve_connection(cls, connection, args, iterable, max_limit=None):
+        if args.get('offset') is not None:
+            raise GraphQLError('Keyset pagination does not support `offset`, use `after` or `before` instead.')
+
+        iterable = maybe_queryset(iterable)
+
+        if not isinstance(iterable, QuerySet):
+            return super().resolve_connection(connection, args, iterable, max_limit=max_limit)
+
+        first, last = args.get('first'), args.get('last')
+        after, before = args.get('after'), args.get('before')
+
+        ordering = get_keyset_ordering(iterable)
+        queryset = iterable
+
+        if after:
+            queryset = queryset.filter(get_keyset_filter(ordering, decode_keyset_cursor(after, ordering, queryset.model)))
+        if before:
+            queryset = queryset.filter(get_keyset_filter(ordering, decode_keyset_cursor(before, ordering, queryset.model), reverse=True))
+
+        if first is None and last is not None:
+            # Fetch one extra row in reverse to know whether there is a previous page, then flip the page back
+            nodes = list(queryset.reverse()[:last + 1])
+            has_previous_page = len(nodes) > last
+            nodes = nodes[:last][::-1]
+            has_next_page = bool(before)
+        else:
+            first = first if first is not None else max_limit
+            nodes = list(queryset[:first + 1] if first is not None else queryset)
+            has_next_page = first is not None and len(nodes) > first
+            nodes = nodes[:first]
+            has_previous_page = bool(after)
+
+            if last is not None:
+                has_previous_page = has_previous_page or len(nodes) > last
+                nodes = nodes[-last:] if last else []
+
+        edges = [connection.Edge(node=node, cursor=encode_keyset_cursor(node, ordering)) for node in nodes]
+
+        connection = connection(
+            edges=edges,
+            page_info=PageInfo(
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+                has_previous_page=has_previous_page,
+                has_next_page=has_next_page,
+            ),
+        )
+        connection.iterable = iterable
+        return connection
+
+
+def get_keyset_ordering(queryset: QuerySet) -> List[str]:
+    """
+    Return the ordering of a queryset with the primary key appended as a tiebreaker, e.g. ['-pub_date', 'pk']
+    """
+    ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+
+    for field in ordering:
+        if not isinstance(field, str) or field == '?' or '__' in field:
+            raise GraphQLError(f'Keyset pagination does not support ordering by {field!r}.')
+
+    if not any(field.lstrip('-') in ('pk', queryset.model._meta.pk.name) for field in ordering):
+        ordering.append('pk')
+
+    return ordering
+
+
+def get_keyset_filter(ordering: List[str], values: List[Any], reverse: bool = False) -> Q:
+    """
+    Expand a row value comparison such as `(headline, id) > (x, y)` into `headline > x OR (headline = x AND id > y)`
+
+    Each field honours its own direction, so mixed orderings like `-pub_date, id` are supported.
+    """
+    keyset_filter = Q()
+
+    for index, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'gt' if field.startswith('-') == reverse else 'lt'
+
+        equals = {ordering[i].lstrip('-'): values[i] for i in range(index)}
+        keyset_filter |= Q(**equals, **{f'{name}__{lookup}': values[index]})
+
+    return keyset_filter
+
+
+def encode_keyset_cursor(node: Model, ordering: List[str]) -> str:
+    values = [getattr(node, field.lstrip('-')) for field in ordering]
+    return base64(json.dumps([ordering, values], cls=DjangoJSONEncoder))
+
+
+def decode_keyset_cursor(cursor: str, ordering: List[str], model: Model) -> List[Any]:
+    """
+    Return the values of a keyset cursor, checked against `ordering` and converted to the fields of `model`,
+    so that a malformed cursor raises a GraphQLError rather than failing within the query
+    """
+    try:
+        cursor_ordering, values = json.loads(unbase64(cursor))
+    except (TypeError, ValueError):
+        raise GraphQLError(f'Invalid cursor {cursor!r}.')
+
+    if cursor_ordering != ordering:
+        raise GraphQLError('The cursor does not match the `orderBy` of the connection.')
+
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise GraphQLError(f'Invalid cursor {cursor!r}.')
+
+    try:
+        return [to_keyset_value(model, field, value) for field, value in zip(ordering, values)]
+    except (TypeError, ValidationError):
+        raise GraphQLError(f'Invalid cursor {cursor!r}.')
+
+
+def to_keyset_value(model: Model, field: str, value: Any) -> Any:
+    name = field.lstrip('-')
+
+    try:
+        model_field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return value  # e.g. an annotation
+
+    return model_field.to_python(value)
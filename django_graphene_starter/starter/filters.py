@@ -1,6 +1,8 @@
-from django_filters import FilterSet, OrderingFilter
+from django.db.models.query import QuerySet
+from django_filters import CharFilter, FilterSet, OrderingFilter
 
 from .models import Article, Publication, Reporter
+from .search import search_queryset
 
 
 class ReporterFilter(FilterSet):
@@ -17,11 +19,22 @@ class ReporterFilter(FilterSet):
     )
 
 
-class PublicationFilter(FilterSet):
+class SearchFilterSet(FilterSet):
+    """
+    NOTE: `search` must be declared before `order_by`, which overrides the ordering by relevance when given
+    """
+
+    def filter_search(self, queryset: QuerySet, name: str, value: str) -> QuerySet:
+        return search_queryset(queryset, value)
+
+
+class PublicationFilter(SearchFilterSet):
     class Meta:
         model = Publication
         fields = ['title']
 
+    search = CharFilter(method='filter_search', label='Full-text search of the title, ordered by relevance unless `orderBy` is given.')
+
     order_by = OrderingFilter(
         fields=(
             ('title'),
@@ -29,11 +42,13 @@ class PublicationFilter(FilterSet):
     )
 
 
-class ArticleFilter(FilterSet):
+class ArticleFilter(SearchFilterSet):
     class Meta:
         model = Article
         fields = ['headline', 'pub_date']
 
+    search = CharFilter(method='filter_search', label='Full-text search of the headline, ordered by relevance unless `orderBy` is given.')
+
     order_by = OrderingFilter(
         fields=(
             ('headline'),
@@ -1,22 +1,38 @@
+import asyncio
 from collections import defaultdict
-from typing import List
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type
 
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Model
 from graphene_django import DjangoObjectType
 from promise import Promise
 from promise.dataloader import DataLoader
 
-from .models import Article, Reporter
-
 
 def generate_loader_by_many_to_many_key(Type: DjangoObjectType, attr: str):
     class Loader(DataLoader):
+        """
+        Example case of query One Publication to Many Articles:
+
+        Given a list of publication id, return: { Publication1_id: [Article1_obj, Article2_obj],... }
+        The whole batch is resolved from the M2M through table in a single query, joined to the Article table, e.g.
+
+        SELECT ... FROM starter_article_publications INNER JOIN starter_article ... WHERE publication_id IN (1, 2, 3,...)
+        """
+
         def batch_load_fn(self, keys: List[str]) -> Promise:
+            model = Type._meta.model
+            field = model._meta.get_field(attr)
+            source = field.m2m_field_name()  # For example: 'article'
+            target = field.m2m_reverse_name()  # For example: 'publication_id'
+            ordering = [f'-{source}__{order[1:]}' if order.startswith('-') else f'{source}__{order}' for order in model._meta.ordering]
+
             results_by_ids = defaultdict(list)
-            lookup = {f'{attr}__id__in': keys}
+            lookup = {f'{target}__in': keys}
 
-            for result in Type._meta.model.objects.filter(**lookup).iterator():
-                for related in getattr(result, attr).iterator():
-                    results_by_ids[related.id].append(result)
+            # For example: Article.publications.through.objects.filter(publication_id__in=[1, 2, 3,...]).select_related('article')
+            for row in field.remote_field.through.objects.filter(**lookup).select_related(source).order_by(*ordering).iterator():
+                results_by_ids[getattr(row, target)].append(getattr(row, source))
 
             return Promise.resolve([results_by_ids.get(id, []) for id in keys])
 
@@ -61,29 +77,163 @@ def generate_loader_by_foreign_key(Type: DjangoObjectType, attr: str):
     return Loader
 
 
-def generate_loader(Type: DjangoObjectType, attr: str):
-    class ReporterByIdLoader(DataLoader):
+def generate_loader_by_related_object(Type: DjangoObjectType, attr: str):
+    class Loader(DataLoader):
+        """
+        Example case of query Many Articles to One Reporter for each Article:
 
-        def batch_load_fn(self, keys: List[str]):
-            reporters = Reporter.objects.all().in_bulk(keys)
-            return Promise.resolve([reporters.get(reporter_id) for reporter_id in keys])
+        Given a list of article id, return: [Reporter_obj_of_article1, Reporter_obj_of_article2,...] in a single joined query, e.g.
 
-    class ArticleByIdLoader(DataLoader):
+        SELECT ... FROM starter_article INNER JOIN auth_user ... WHERE starter_article.id IN (1, 2, 3,...)
+        """
 
-        def batch_load_fn(self, keys: List[str]):
-            article = Article.objects.in_bulk(keys)
-            return Promise.resolve([article.get(key) for key in keys])
+        def batch_load_fn(self, keys: List[str]) -> Promise:
+            # For example: Article.objects.filter(pk__in=[1, 2, 3,...]).select_related('reporter')
+            instances = Type._meta.model.objects.filter(pk__in=keys).select_related(attr).in_bulk()
+
+            return Promise.resolve([getattr(instances[id], attr) if id in instances else None for id in keys])
+
+    return Loader
 
+
+def generate_count_loader(Type: DjangoObjectType, attr: str):
     class Loader(DataLoader):
         """
-        Example case of query Many Articles to One Reporter for each Article
+        Example case of query the total count of Publications for each Article:
+
+        Given a list of article id, return: { Article1_id: 1, Article2_id: 5,... } using a single GROUP BY query, e.g.
+
+        SELECT article_id, COUNT(id) FROM starter_publication INNER JOIN starter_article_publications ... WHERE article_id IN (1, 2, 3,...) GROUP BY article_id
         """
 
-        def batch_load_fn(self, keys: List[str]):
-            def with_articles(articles: list):
-                reporter_ids = [article.reporter_id for article in articles]
-                return ReporterByIdLoader().load_many(reporter_ids)
+        def batch_load_fn(self, keys: List[str]) -> Promise:
+            lookup = {f'{attr}__in': keys}
+
+            # For example: Publication.objects.filter(articles__in=[1, 2, 3,...]).values('articles').annotate(total_count=Count('pk'))
+            rows = Type._meta.model.objects.filter(**lookup).values(attr).annotate(total_count=Count('pk')).order_by()
+            counts_by_ids = {row[attr]: row['total_count'] for row in rows}
+
+            return Promise.resolve([counts_by_ids.get(id, 0) for id in keys])
+
+    return Loader
+
+
+# DataLoader classes by (model, attribute), each one loading `attribute` of `model` instances by primary key, see `register_loader`,
+# and the count loaders by (type, '<attribute>__count'), see `get_count_loader_class`
+LOADERS: Dict[Tuple[Type[Model], str], Type[DataLoader]] = {}
 
-            return ArticleByIdLoader().load_many(keys).then(with_articles)
 
+def register_loader(model: Type[Model], attr: str, Loader: Type[DataLoader]) -> Type[DataLoader]:
+    """
+    Register the DataLoader class loading `attr` of `model` instances by primary key, resolvers get a request-scoped
+    instance of it from `info.context.loaders.get(model, attr)`, e.g.
+
+    register_loader(Reporter, 'articles', generate_loader_by_foreign_key(Article, 'reporter_id'))
+
+    Relations don't need to be registered, see `get_loader_class`.
+    """
+    LOADERS[(model, attr)] = Loader
     return Loader
+
+
+def get_loader_class(model: Type[Model], attr: str) -> Type[DataLoader]:
+    """
+    Return the DataLoader class registered for `(model, attr)`, or generate it once for a relation of `model`:
+
+    - a foreign key or one-to-one field, e.g. (Article, 'reporter'), loads the related object
+    - a reverse foreign key, e.g. (Reporter, 'articles'), loads the list of related objects
+    - a reverse many-to-many relation, e.g. (Publication, 'articles'), loads the list of related objects
+    """
+    if (model, attr) not in LOADERS:
+        field = model._meta.get_field(attr)
+
+        if field.many_to_one or (field.one_to_one and field.concrete):
+            Loader = generate_loader_by_related_object(model, attr)
+        elif field.one_to_many:
+            Loader = generate_loader_by_foreign_key(field.related_model, field.field.attname)
+        elif field.many_to_many and field.auto_created:
+            Loader = generate_loader_by_many_to_many_key(field.related_model, field.field.name)
+        else:
+            raise ValueError(f'Cannot generate a DataLoader for {model.__name__}.{attr}, register one with `register_loader`.')
+
+        register_loader(model, attr, Loader)
+
+    return LOADERS[(model, attr)]
+
+
+def get_count_loader_class(Type: DjangoObjectType, attr: str) -> Type[DataLoader]:
+    """
+    Return the DataLoader class counting `Type` rows grouped by `attr`, e.g. (PublicationNode, 'articles') for `article.publications.totalCount`,
+    registered as `(Type, '<attr>__count')`, or generate it once with `generate_count_loader`
+    """
+    key = (Type, f'{attr}__count')
+
+    if key not in LOADERS:
+        register_loader(*key, generate_count_loader(Type, attr))
+
+    return LOADERS[key]
+
+
+class AsyncDataLoader:
+    """
+    A minimal asyncio DataLoader: keys loaded during the same iteration of the event loop are batched into a single `batch_load_fn` call
+
+    Unlike `promise.dataloader.DataLoader`, `load` returns an `asyncio.Future` and must be called on the event loop.
+    Like it, `batch_load_fn` is either passed to the constructor or defined by a subclass, as a coroutine function
+    returning the values of the keys in order.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, batch_load_fn: Optional[Callable[[List[Any]], Awaitable[List[Any]]]] = None):
+        if batch_load_fn is not None:
+            self.batch_load_fn = batch_load_fn
+
+        if not callable(getattr(self, 'batch_load_fn', None)):
+            raise TypeError(f'AsyncDataLoader must be constructed with a batch_load_fn or define one, but got: {batch_load_fn!r}.')
+
+        self.loop = loop
+        self.futures = {}
+        self.queue = []
+
+    def load(self, key: Any) -> asyncio.Future:
+        if key not in self.futures:
+            if not self.queue:
+                self.loop.call_soon(self.dispatch)
+
+            self.queue.append(key)
+            self.futures[key] = self.loop.create_future()
+
+        return self.futures[key]
+
+    def load_many(self, keys: List[Any]) -> asyncio.Future:
+        return asyncio.gather(*[self.load(key) for key in keys])
+
+    def dispatch(self) -> None:
+        keys, self.queue = self.queue, []
+        self.loop.create_task(self.resolve(keys))
+
+    async def resolve(self, keys: List[Any]) -> None:
+        try:
+            values = await self.batch_load_fn(keys)
+        except Exception as e:
+            for key in keys:
+                self.futures.pop(key).set_exception(e)  # Failed keys are not cached, a later load retries them
+            return
+
+        for key, value in zip(keys, values):
+            self.futures[key].set_result(value)
+
+
+def generate_async_batch_load_fn(Loader: Type[DataLoader]) -> Callable[[List[Any]], Awaitable[List[Any]]]:
+    """
+    Adapt the `batch_load_fn` of any of the Promise-based loaders above to `AsyncDataLoader`, each batch runs on the ORM thread through `sync_to_async`
+    """
+
+    async def batch_load_fn(keys: List[Any]) -> List[Any]:
+        return await sync_to_async(run_batch_load_fn)(Loader(), keys)
+
+    return batch_load_fn
+
+
+def run_batch_load_fn(loader: DataLoader, keys: List[Any]) -> List[Any]:
+    # Run within a promise tick, so that the loads of loaders the batch may use are batched too
+    return Promise.resolve(None).then(lambda _: loader.batch_load_fn(keys)).get()
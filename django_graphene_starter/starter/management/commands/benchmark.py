@@ -0,0 +1,345 @@
+import json
+import platform
+import time
+import tracemalloc
+from io import StringIO
+from typing import Callable, Dict, List, Optional, Tuple
+
+import django
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_graphene_starter.views import RateLimitedGraphQLView
+from graphql_relay import to_global_id
+
+from ...cache import node_cache
+from ...models import Article
+
+ARTICLES_QUERY = '''
+query articles {
+  articles(first: 100, orderBy: "-pubDate") {
+    edges {
+      cursor
+      node {
+        id
+        headline
+        pubDate
+        reporter {
+          email
+        }
+      }
+    }
+  }
+}
+'''
+
+ARTICLES_TOTAL_COUNT_QUERY = '''
+query articlesTotalCount {
+  articles {
+    totalCount
+  }
+}
+'''
+
+KEYSET_ARTICLES_QUERY = '''
+query keysetArticles {
+  keysetArticles(first: 100, orderBy: "-pubDate") {
+    edges {
+      cursor
+      node {
+        id
+        headline
+      }
+    }
+  }
+}
+'''
+
+NESTED_CONNECTIONS_QUERY = '''
+query nestedConnections {
+  reporters(first: 20) {
+    edges {
+      node {
+        email
+        articles(first: 10) {
+          totalCount
+          edges {
+            node {
+              headline
+              publications(first: 10) {
+                edges {
+                  node {
+                    title
+                  }
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
+PUBLICATIONS_COUNT_QUERY = '''
+query publicationsCount {
+  articles(first: 100) {
+    edges {
+      node {
+        headline
+        publications {
+          totalCount
+        }
+      }
+    }
+  }
+}
+'''
+
+DATALOADER_QUERY = '''
+query dataloaders {
+  reporters(first: 20) {
+    edges {
+      node {
+        email
+        dataloaderArticles(first: 10) {
+          totalCount
+          edges {
+            node {
+              headline
+              dataloaderReporter {
+                email
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
+ARTICLE_NODE_QUERY = '''
+query article($id: ID!) {
+  article(id: $id) {
+    headline
+    reporter {
+      email
+    }
+    publications(first: 10) {
+      totalCount
+    }
+  }
+}
+'''
+
+CREATE_PUBLICATION_MUTATION = '''
+mutation createPublication {
+  createPublication(input: {title: "Benchmark"}) {
+    publication {
+      id
+      title
+    }
+  }
+}
+'''
+
+CREATE_PUBLICATIONS_MUTATION = '''
+mutation createPublications($publications: [CreatePublicationItem!]!) {
+  createPublications(input: {publications: $publications}) {
+    publications {
+      id
+    }
+    errors {
+      index
+    }
+  }
+}
+'''
+
+
+def get_first_article_variables() -> Dict:
+    return {'id': to_global_id('ArticleNode', Article.objects.order_by('pk').values_list('pk', flat=True).first())}
+
+
+# Name: (query, variables), the variables are looked up once the dataset is generated
+CATALOGUE: Dict[str, Tuple[str, Callable[[], Dict]]] = {
+    'articles': (ARTICLES_QUERY, dict),
+    'articles_total_count': (ARTICLES_TOTAL_COUNT_QUERY, dict),
+    'keyset_articles': (KEYSET_ARTICLES_QUERY, dict),
+    'nested_connections': (NESTED_CONNECTIONS_QUERY, dict),
+    'publications_count': (PUBLICATIONS_COUNT_QUERY, dict),
+    'dataloaders': (DATALOADER_QUERY, dict),
+    'article_node': (ARTICLE_NODE_QUERY, get_first_article_variables),
+    'create_publication': (CREATE_PUBLICATION_MUTATION, dict),
+    'create_publications': (CREATE_PUBLICATIONS_MUTATION, lambda: {'publications': [{'title': f'Benchmark {index}'} for index in range(20)]}),
+}
+
+
+BENCHMARK_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'}}
+
+# The transaction of each execution, and the `EXPLAIN` django-silk may send for each query
+IGNORED_STATEMENTS = ('BEGIN', 'EXPLAIN')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark a catalogue of GraphQL operations on datasets of several scales, recording SQL queries, wall time and peak memory to a JSON baseline.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-s', '--scales', type=str, nargs='+', default=['10x10', '100x10'], required=False, help='Which datasets to generate, as Reporters x Articles per Reporter?')
+        parser.add_argument('-p', '--publications', type=int, default=3, required=False, help='How many Publications per Article?')
+        parser.add_argument('--publication-pool', type=int, default=100, required=False, help='How many Publications to share between every Article?')
+        parser.add_argument('--seed', type=int, default=1, required=False, help='Seed of the generated datasets, keep it to compare runs.')
+        parser.add_argument('-n', '--iterations', type=int, default=10, required=False, help='How many times to execute each operation?')
+        parser.add_argument('-q', '--queries', type=str, nargs='+', choices=list(CATALOGUE), default=list(CATALOGUE), required=False, help='Which operations of the catalogue to run?')
+        parser.add_argument('-o', '--output', type=str, default='benchmark.json', required=False, help='Where to write the results?')
+        parser.add_argument('--compare', type=str, default=None, required=False, help='A previous output to compare the results with.')
+        parser.add_argument('--fail', action='store_true', help='Exit with an error if an operation sends more SQL queries than in --compare.')
+
+    def handle(self, *args, **options):
+        scales = [parse_scale(scale) for scale in options['scales']]
+        baseline = self.load_baseline(options['compare'])
+
+        # The datasets are generated in a test database, created then destroyed like the test runner does
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        try:
+            # A cache of its own, cleared before every execution, rather than the default one, e.g. the Redis cache shared with the servers
+            with override_settings(CACHES=BENCHMARK_CACHES, RATELIMIT_ENABLE=False, GRAPHQL_RESPONSE_CACHE_TIMEOUT=0, GRAPHQL_N_PLUS_ONE_RAISE=False, GRAPHQL_N_PLUS_ONE_SAMPLE_RATE=0):
+                results = {name: self.run_scale(reporters, articles, options) for name, (reporters, articles) in zip(options['scales'], scales)}
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        output = {
+            'created_at': timezone.now().isoformat(),
+            'environment': {'python': platform.python_version(), 'django': django.get_version(), 'database': connection.vendor},
+            'options': {name: options[name] for name in ('publications', 'publication_pool', 'seed', 'iterations')},
+            'results': results,
+        }
+
+        with open(options['output'], 'w') as file:
+            json.dump(output, file, indent=2, sort_keys=True)
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote the results to {options["output"]}.'))
+
+        if baseline is not None:
+            regressions = self.compare(baseline['results'], results)
+            if regressions and options['fail']:
+                raise CommandError(f'{len(regressions)} operations send more SQL queries than in {options["compare"]}: {", ".join(regressions)}.')
+
+    def load_baseline(self, path: Optional[str]) -> Optional[Dict]:
+        if path is None:
+            return None
+
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read the baseline {path}: {e}')
+
+    def run_scale(self, reporters: int, articles: int, options) -> Dict:
+        call_command('flush', interactive=False, verbosity=0)
+        call_command(
+            'generate_fixtures', bulk=True, reporters=reporters, articles=articles, publications=options['publications'],
+            publication_pool=options['publication_pool'], seed=options['seed'], stdout=StringIO(),
+        )
+
+        results = {}
+        for name in options['queries']:
+            query, get_variables = CATALOGUE[name]
+            results[name] = self.measure(query, get_variables(), options['iterations'])
+
+            self.stdout.write(
+                f'{reporters}x{articles} | {name}: {results[name]["sql_queries"]} queries | median {results[name]["median_ms"]:.2f} ms | '
+                f'min {results[name]["min_ms"]:.2f} ms | peak {results[name]["peak_memory_kib"]:.0f} KiB'
+            )
+
+        return results
+
+    def measure(self, query: str, variables: Dict, iterations: int) -> Dict:
+        """
+        Execute an operation through `RateLimitedGraphQLView` with cold caches, each time in a transaction rolled back afterwards
+
+        The SQL queries are counted on a first execution, and the peak memory is traced on a last one, as tracing slows down the execution.
+        """
+        with CaptureQueriesContext(connection) as context:
+            self.execute_operation(query, variables)
+
+        durations = []
+        for _ in range(iterations):
+            started_at = time.perf_counter()
+            self.execute_operation(query, variables)
+            durations.append(time.perf_counter() - started_at)
+
+        tracemalloc.start()
+        try:
+            self.execute_operation(query, variables)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        durations.sort()
+        return {
+            'sql_queries': len([query for query in context.captured_queries if not query['sql'].startswith(IGNORED_STATEMENTS)]),
+            'median_ms': durations[len(durations) // 2] * 1000,
+            'min_ms': durations[0] * 1000,
+            'peak_memory_kib': peak / 1024,
+        }
+
+    def execute_operation(self, query: str, variables: Dict) -> None:
+        cache.clear()
+        node_cache.clear()
+
+        request = RequestFactory().post('/graphql', json.dumps({'query': query, 'variables': variables}), content_type='application/json')
+        request.user = AnonymousUser()
+
+        with transaction.atomic():
+            response = RateLimitedGraphQLView.as_view()(request)
+            transaction.set_rollback(True)  # e.g. the created publications
+
+        content = json.loads(response.content)
+        if response.status_code != 200 or content.get('errors'):
+            raise CommandError(f'The operation failed: {content.get("errors")}')
+
+    def compare(self, baseline: Dict, results: Dict) -> List[str]:
+        """
+        Write the difference of every operation with the baseline and return the ones sending more SQL queries
+        """
+        regressions = []
+
+        for scale, operations in results.items():
+            for name, result in operations.items():
+                previous = baseline.get(scale, {}).get(name)
+                if previous is None:
+                    continue
+
+                if result['sql_queries'] > previous['sql_queries']:
+                    regressions.append(f'{scale} {name}')
+
+                self.stdout.write(
+                    f'{scale} | {name}: {previous["sql_queries"]} -> {result["sql_queries"]} queries | '
+                    f'median {previous["median_ms"]:.2f} -> {result["median_ms"]:.2f} ms ({get_change(previous["median_ms"], result["median_ms"])}) | '
+                    f'peak {previous["peak_memory_kib"]:.0f} -> {result["peak_memory_kib"]:.0f} KiB ({get_change(previous["peak_memory_kib"], result["peak_memory_kib"])})'
+                )
+
+        return regressions
+
+
+def parse_scale(scale: str) -> Tuple[int, int]:
+    try:
+        reporters, articles = (int(value) for value in scale.lower().split('x'))
+    except ValueError:
+        raise CommandError(f'Invalid scale {scale!r}, expected Reporters x Articles per Reporter, e.g. 100x10.')
+
+    return reporters, articles
+
+
+def get_change(previous: float, current: float) -> str:
+    return f'{(current - previous) / previous * 100:+.1f}%' if previous else 'n/a'
@@ -0,0 +1,87 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django_graphene_starter.middlewares import FieldMiddlewareManager, Loaders
+from graphene_django.settings import graphene_settings
+from graphene_django.views import instantiate_middleware
+
+DEFAULT_QUERY = '''
+query articles {
+  articles(first: 100) {
+    edges {
+      cursor
+      node {
+        id
+        headline
+        pubDate
+        dataloaderReporter {
+          id
+          email
+          firstName
+          lastName
+        }
+      }
+    }
+  }
+}
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure the overhead of the GraphQL middlewares per resolved field, running every middleware on every field against `FieldMiddlewareManager`.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-n', '--iterations', type=int, default=50, required=False, help='How many times to execute the query in each mode?')
+        parser.add_argument('-q', '--query', type=str, default=DEFAULT_QUERY, required=False, help='Which GraphQL query to execute? Run `generate_fixtures` beforehand.')
+
+    def handle(self, *args, **options):
+        schema = graphene_settings.SCHEMA
+        middlewares = list(instantiate_middleware(graphene_settings.MIDDLEWARE))
+
+        fields = self.count_fields(schema, options['query'])
+        if not fields:
+            raise CommandError('The query resolved no field, is the database empty?')
+
+        modes = {
+            'every field': lambda: middlewares,
+            'per field kind': lambda: FieldMiddlewareManager(schema, *middlewares),
+        }
+        baseline = self.measure(schema, options['query'], options['iterations'], lambda: [])
+        self.stdout.write(f'{fields} fields per execution | no middleware: {baseline * 1000:.2f} ms')
+
+        for name, get_middleware in modes.items():
+            elapsed = self.measure(schema, options['query'], options['iterations'], get_middleware)
+            self.stdout.write(f'{name}: {elapsed * 1000:.2f} ms | {(elapsed - baseline) / fields * 1000000:.2f} µs per field')
+
+    def execute_query(self, schema, query: str, middleware) -> None:
+        request = RequestFactory().post('/graphql')
+        request.loaders = Loaders()  # As `LoaderMiddleware` would, so that the baseline runs without any middleware
+
+        result = schema.execute(query, context_value=request, middleware=middleware)
+        if result.errors:
+            raise CommandError(f'The query failed: {result.errors[0]}')
+
+    def count_fields(self, schema, query: str) -> int:
+        calls = []
+
+        def count(next, root, info, **args):
+            calls.append(info.field_name)
+            return next(root, info, **args)
+
+        self.execute_query(schema, query, [count])
+        return len(calls)
+
+    def measure(self, schema, query: str, iterations: int, get_middleware) -> float:
+        """
+        Return the median duration of an execution, each one builds its middlewares like a request of `RateLimitedGraphQLView` does
+        """
+        self.execute_query(schema, query, get_middleware())  # Warm up the document and the resolver classification
+
+        durations = []
+        for _ in range(iterations):
+            started_at = time.perf_counter()
+            self.execute_query(schema, query, get_middleware())
+            durations.append(time.perf_counter() - started_at)
+
+        return sorted(durations)[len(durations) // 2]
@@ -0,0 +1,76 @@
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_QUERY = '''
+query articles {
+  articles(first: 20) {
+    totalCount
+    edges {
+      node {
+        headline
+        dataloaderReporter {
+          email
+        }
+        publications {
+          totalCount
+        }
+      }
+    }
+  }
+}
+'''
+
+
+class Command(BaseCommand):
+    help = 'Compare the throughput and latency of running GraphQL servers, e.g. gunicorn (WSGI) against uvicorn (ASGI).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('servers', nargs='+', help='Servers to benchmark as name=url, e.g. wsgi=http://localhost:8000/graphql')
+        parser.add_argument('-n', '--requests', type=int, default=500, required=False, help='How many requests to send to each server?')
+        parser.add_argument('-c', '--concurrency', type=int, default=50, required=False, help='How many requests to keep in flight?')
+        parser.add_argument('-q', '--query', type=str, default=DEFAULT_QUERY, required=False, help='Which GraphQL query to send?')
+
+    def handle(self, *args, **options):
+        body = json.dumps({'query': options['query']}).encode()
+
+        for server in options['servers']:
+            name, _, url = server.partition('=')
+            if not url:
+                raise CommandError(f'Expected a server as name=url, got {server!r}.')
+
+            self.send(url, body)  # Warm up the document cache and the database connections
+
+            started_at = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                results = list(executor.map(lambda _: self.send(url, body), range(options['requests'])))
+            elapsed = time.perf_counter() - started_at
+
+            latencies = sorted(latency for ok, latency in results if ok)
+            errors = len(results) - len(latencies)
+            if not latencies:
+                raise CommandError(f'Every request to {url} failed.')
+
+            percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            self.stdout.write(
+                f'{name}: {len(results) / elapsed:.1f} req/s | '
+                f'p50 {percentiles[49] * 1000:.1f} ms | p95 {percentiles[94] * 1000:.1f} ms | p99 {percentiles[98] * 1000:.1f} ms | '
+                f'{errors} errors'
+            )
+
+    def send(self, url: str, body: bytes):
+        request = Request(url, data=body, headers={'Content-Type': 'application/json'})
+        started_at = time.perf_counter()
+
+        try:
+            with urlopen(request) as response:
+                ok = response.status == 200 and 'errors' not in json.loads(response.read())
+        except (URLError, ValueError):
+            ok = False
+
+        return ok, time.perf_counter() - started_at
@@ -0,0 +1,98 @@
+import json
+import multiprocessing
+import resource
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import RequestFactory, override_settings
+from django_graphene_starter.streaming import iter_json
+from django_graphene_starter.views import RateLimitedGraphQLView
+
+from ...models import Article
+
+QUERY = '''
+query articles($first: Int) {
+  articles(first: $first) {
+    edges {
+      cursor
+      node {
+        id
+        headline
+        pubDate
+        reporter {
+          id
+          email
+          firstName
+          lastName
+        }
+      }
+    }
+  }
+}
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the growth of peak RSS, the time to the first chunk of the response, the total time and the time to encode '
+        'the result of buffered and streamed GraphQL responses, served in process. The time to the first chunk includes the '
+        'execution of the whole operation.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('-s', '--sizes', type=int, nargs='+', default=[1000, 5000], required=False, help='How many edges to request? Run `generate_fixtures` beforehand.')
+
+    def handle(self, *args, **options):
+        if Article.objects.count() < max(options['sizes']):
+            raise CommandError(f'Expected at least {max(options["sizes"])} articles, generate more fixtures.')
+
+        connections.close_all()  # Each measure runs in a forked process, which opens its own connection
+        context = multiprocessing.get_context('fork')
+
+        for size in options['sizes']:
+            for stream_response in (False, True):
+                with context.Pool(1) as pool:
+                    size_in_bytes, memory, ttfb, total, encoding = pool.apply(measure, (size, stream_response))
+
+                self.stdout.write(
+                    f'{size} edges | {"streamed" if stream_response else "buffered"}: {size_in_bytes / 1024:.0f} KiB | '
+                    f'peak RSS +{memory / 1024:.1f} MiB | TTFB {ttfb * 1000:.1f} ms | total {total * 1000:.1f} ms | encoding {encoding * 1000:.1f} ms'
+                )
+
+
+def measure(size: int, stream_response: bool):
+    """
+    Send a request in a fresh process, so that the growth of its peak RSS is due to this request only
+    """
+    view = RateLimitedGraphQLView.as_view(stream_response=stream_response)
+    factory = RequestFactory()
+
+    def get_request(first: int):
+        request = factory.post('/graphql', json.dumps({'query': QUERY, 'variables': {'first': first}}), content_type='application/json')
+        request.user = AnonymousUser()
+        return request
+
+    with override_settings(RATELIMIT_ENABLE=False, GRAPHQL_RESPONSE_CACHE_TIMEOUT=0):
+        view(get_request(1))  # Warm up the document cache, the schema and the database connection
+
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started_at = time.perf_counter()
+
+        response = view(get_request(size))
+        chunks = iter(response.streaming_content if response.streaming else [response.content])
+        size_in_bytes = len(next(chunks))
+        ttfb = time.perf_counter() - started_at
+
+        size_in_bytes += sum(len(chunk) for chunk in chunks)  # Sent to the client and dropped, as a WSGI server would
+        total = time.perf_counter() - started_at
+        memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+
+        # The share of the encoder alone, measured on a result of the same shape once the peak RSS is measured
+        result = json.loads(view(get_request(size)).getvalue())
+        started_at = time.perf_counter()
+        sum(len(chunk) for chunk in iter_json(result)) if stream_response else len(json.dumps(result, separators=(',', ':')).encode())
+        encoding = time.perf_counter() - started_at
+
+    return size_in_bytes, memory, ttfb, total, encoding
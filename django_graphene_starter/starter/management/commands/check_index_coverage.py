@@ -0,0 +1,141 @@
+from collections import namedtuple
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Model
+from django.db.models.constants import LOOKUP_SEP
+from django_filters import OrderingFilter
+from graphene_django import DjangoObjectType
+from graphene_django.settings import graphene_settings
+
+# Lookups which a B-tree index on the leading column can serve
+INDEXABLE_LOOKUPS = {'exact', 'in', 'gt', 'gte', 'lt', 'lte', 'range', 'isnull', 'startswith', 'year', 'date'}
+
+Path = namedtuple('Path', ['node', 'kind', 'name', 'table', 'columns'])
+Index = namedtuple('Index', ['name', 'columns', 'unique'])
+
+
+class Command(BaseCommand):
+    help = 'Report the filtering and ordering paths of the GraphQL connections which are not covered by a database index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Report the covered paths too.')
+        parser.add_argument('--fail', action='store_true', help='Exit with an error if any path is not covered, e.g. in CI.')
+
+    def handle(self, *args, **options):
+        indexes = {}
+        uncovered = 0
+
+        for path in get_paths(graphene_settings.SCHEMA):
+            if path.table not in indexes:
+                indexes[path.table] = get_indexes(path.table)
+
+            index = find_index(indexes[path.table], path) if path.columns else None
+            uncovered += index is None
+
+            if index is None or options['all']:
+                columns = ', '.join(f'{column} {order}' for column, order in path.columns) if path.columns else 'not indexable'
+                status = self.style.SUCCESS(f'covered by {index}') if index else self.style.WARNING('NOT COVERED')
+                self.stdout.write(f'{path.node:<16} {path.kind:<8} {path.name:<28} {path.table}({columns}) {status}')
+
+        if uncovered and options['fail']:
+            raise CommandError(f'{uncovered} paths are not covered by an index.')
+
+
+def get_paths(schema) -> Iterator[Path]:
+    """
+    Yield the paths of every DjangoObjectType of the schema with the columns an index must start with to serve them:
+
+    - filter: `WHERE column = ...`, the column of the filter
+    - order: `ORDER BY column, id`, the column then the primary key as a tiebreaker, see `starter.fields.get_keyset_ordering`
+    - nested: `WHERE parent_id = ... ORDER BY column, id`, the connections of children by a foreign key to the node
+    """
+    node_types = [
+        graphql_type.graphene_type for graphql_type in schema.get_type_map().values()
+        if isinstance(getattr(graphql_type, 'graphene_type', None), type) and issubclass(graphql_type.graphene_type, DjangoObjectType)
+    ]
+    models = {node_type._meta.model._meta.concrete_model for node_type in node_types}
+
+    for node_type in node_types:
+        if node_type._meta.filterset_class is None:
+            continue
+
+        model = node_type._meta.model
+        name = node_type._meta.name
+
+        for filter_name, filter in node_type._meta.filterset_class.base_filters.items():
+            if isinstance(filter, OrderingFilter):
+                for field_name, param in filter.param_map.items():
+                    for ordering in (field_name, f'-{field_name}'):
+                        yield Path(name, 'order', ordering.replace(field_name, param), model._meta.db_table, get_ordering_columns(model, [ordering]))
+
+            elif filter.method is None:  # Filters with their own lookups, e.g. full-text search, are not checked
+                columns = get_columns(model, [filter.field_name]) if filter.lookup_expr in INDEXABLE_LOOKUPS else []
+                yield Path(name, 'filter', f'{filter_name} ({filter.lookup_expr})', model._meta.db_table, columns)
+
+        yield Path(name, 'order', '(default)', model._meta.db_table, get_ordering_columns(model, model._meta.ordering))
+
+        for relation in model._meta.related_objects:
+            if relation.one_to_many and relation.related_model._meta.concrete_model in models:
+                related_model = relation.related_model
+                columns = [(relation.field.column, 'ASC')] + get_ordering_columns(related_model, related_model._meta.ordering)
+                yield Path(name, 'nested', relation.get_accessor_name(), related_model._meta.db_table, columns)
+
+
+def get_ordering_columns(model: Model, ordering: Sequence[str]) -> List[Tuple[str, str]]:
+    columns = get_columns(model, ordering)
+    if columns and model._meta.pk.column not in [column for column, _ in columns]:
+        columns.append((model._meta.pk.column, 'ASC'))
+    return columns
+
+
+def get_columns(model: Model, field_names: Sequence[str]) -> List[Tuple[str, str]]:
+    """
+    Return the columns and orders of field names, empty if any of them spans a relation which a single index cannot serve
+    """
+    columns = []
+
+    for field_name in field_names:
+        name = field_name.lstrip('-')
+        if LOOKUP_SEP in name:
+            return []
+
+        field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        columns.append((field.column, 'DESC' if field_name.startswith('-') else 'ASC'))
+
+    return columns
+
+
+def get_indexes(table: str) -> List[Index]:
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+
+    return [
+        Index(name, list(zip(constraint['columns'], constraint.get('orders') or ['ASC'] * len(constraint['columns']))), constraint['unique'] or constraint['primary_key'])
+        for name, constraint in constraints.items()
+        if constraint['index'] or constraint['unique'] or constraint['primary_key']
+    ]
+
+
+def find_index(indexes: List[Index], path: Path) -> Optional[str]:
+    """
+    Return the name of an index serving a path:
+
+    - filter: the index starts with the column
+    - order and nested: the index starts with the columns in the same orders, or in the opposite orders as it can be scanned backwards.
+      A unique index on the columns before the primary key tiebreaker serves them too.
+    """
+    if path.kind == 'filter':
+        return next((index.name for index in indexes if index.columns[0][0] == path.columns[0][0]), None)
+
+    reversed_columns = [(column, 'ASC' if order == 'DESC' else 'DESC') for column, order in path.columns]
+
+    for index in indexes:
+        if index.columns[:len(path.columns)] in (path.columns, reversed_columns):
+            return index.name
+
+        if index.unique and [column for column, _ in index.columns] == [column for column, _ in path.columns[:-1]]:
+            return index.name
+
+    return None
@@ -1,6 +1,21 @@
-from django.core.management.base import BaseCommand
+import csv
+import io
+import random
+import time
+from collections import Counter, defaultdict
+from datetime import date
+from typing import Iterator, List
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max, Model
+from django.utils import timezone
+from faker import Faker
 from mixer.backend.django import mixer
 
+from ...cache import bump_model_version
 from ...models import Article, Publication, Reporter
 
 
@@ -12,7 +27,20 @@ class Command(BaseCommand):
         parser.add_argument('-a', '--articles', type=int, default=5, required=False, help='How many Article fixtures to generate per Reporter?')
         parser.add_argument('-p', '--publications', type=int, default=5, required=False, help='How many Publication fixtures to generate per Article?')
 
+        parser.add_argument('--bulk', action='store_true', help='Build the rows in memory and write them with bulk inserts, to generate large datasets for load testing.')
+        parser.add_argument('--chunk-size', type=int, default=5000, required=False, help='How many rows to write per bulk insert with --bulk?')
+        parser.add_argument('--copy', action='store_true', help='Write the rows with PostgreSQL COPY instead of bulk inserts with --bulk.')
+        parser.add_argument('--seed', type=int, default=None, required=False, help='Seed of the random data with --bulk, to generate the same dataset again.')
+        parser.add_argument('--publication-pool', type=int, default=100, required=False, help='How many Publication fixtures to share between every Article with --bulk?')
+        parser.add_argument(
+            '--fan-out', choices=FAN_OUTS, default='fixed', required=False,
+            help='How to pick the Publications of each Article with --bulk: exactly -p, between 0 and 2 * -p, or -p skewed towards popular Publications (zipf)?',
+        )
+
     def handle(self, *args, **options):
+        if options['bulk']:
+            return self.handle_bulk(**options)
+
         reporters_count = options['reporters']
         articles_count = options['articles']
         publications_count = options['publications']
@@ -26,3 +54,171 @@ class Command(BaseCommand):
             )
 
         self.stdout.write(self.style.SUCCESS(f'Successfully generated fixtures: {reporters_count} Reporters | {reporters_count * articles_count} Articles | {reporters_count * publications_count} Publications.'))
+
+    def handle_bulk(self, **options):
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy requires PostgreSQL.')
+
+        if options['publications'] > options['publication_pool']:
+            raise CommandError('--publications must not be greater than --publication-pool.')
+
+        generator = FixtureGenerator(options['seed'], options['publication_pool'], options['publications'], options['fan_out'])
+        writer = BulkWriter(options['chunk_size'], options['copy'])
+        started_at = time.perf_counter()
+
+        with transaction.atomic():
+            for instance in generator.generate(options['reporters'], options['articles']):
+                writer.add(instance)
+
+            writer.flush()
+            reset_sequences([Reporter, Publication, Article])
+
+        for model in (Reporter, Publication, Article):
+            bump_model_version(model)  # Bulk writes send no `post_save`, see `starter.signals`
+
+        elapsed = time.perf_counter() - started_at
+        rows = sum(writer.rows.values())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully generated fixtures: {writer.rows[Reporter]} Reporters | {writer.rows[Article]} Articles | {writer.rows[Publication]} Publications | '
+            f'{writer.rows[Article.publications.through]} Article Publications | {rows} rows in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s).',
+        ))
+
+
+FAN_OUTS = ['fixed', 'uniform', 'zipf']
+
+
+class FixtureGenerator:
+    """
+    Generate unsaved instances with explicit primary keys, parents first, so that they can be written in bulk without reading back their keys
+    """
+
+    def __init__(self, seed: int, publication_pool: int, publications: int, fan_out: str):
+        self.random = random.Random(seed)
+        self.faker = Faker()  # Of its own, seeding `mixer.faker` would seed every other user of it
+        self.faker.seed_instance(seed)
+
+        self.publication_pool = publication_pool
+        self.publications = publications
+        self.fan_out = fan_out
+
+    def generate(self, reporters: int, articles: int) -> Iterator[Model]:
+        publication_ids = yield from self.generate_publications()
+        weights = [1 / rank for rank in range(1, len(publication_ids) + 1)]  # Zipf, the first Publications are the most popular
+
+        password = make_password(None)  # Unusable, hashing a password per Reporter would dominate the run
+        joined_at = timezone.now()
+        today = date.today()
+
+        reporter_id = get_max_pk(Reporter)
+        article_id = get_max_pk(Article)
+
+        for _ in range(reporters):
+            reporter_id += 1
+            first_name, last_name = self.faker.first_name(), self.faker.last_name()
+            yield Reporter(
+                id=reporter_id, username=f'{self.faker.user_name()}{reporter_id}', email=f'{reporter_id}.{self.faker.email()}', first_name=first_name, last_name=last_name,
+                password=password, is_staff=False, is_active=True, is_superuser=False, date_joined=joined_at,
+            )
+
+            for _ in range(articles):
+                article_id += 1
+                yield Article(id=article_id, headline=self.faker.catch_phrase(), pub_date=today, reporter_id=reporter_id)
+
+                for publication_id in self.pick_publications(publication_ids, weights):
+                    yield Article.publications.through(article_id=article_id, publication_id=publication_id)
+
+    def generate_publications(self):
+        publication_id = get_max_pk(Publication)
+        publication_ids = []
+
+        for _ in range(self.publication_pool):
+            publication_id += 1
+            publication_ids.append(publication_id)
+            yield Publication(id=publication_id, title=self.faker.catch_phrase())
+
+        return publication_ids
+
+    def pick_publications(self, publication_ids: List[int], weights: List[float]) -> List[int]:
+        if self.fan_out == 'uniform':
+            return self.random.sample(publication_ids, min(self.random.randint(0, 2 * self.publications), len(publication_ids)))
+
+        if self.fan_out == 'zipf':
+            picked = set()
+            while len(picked) < self.publications:
+                picked.update(self.random.choices(publication_ids, weights=weights, k=self.publications - len(picked)))
+            return sorted(picked)
+
+        return self.random.sample(publication_ids, self.publications)
+
+
+class BulkWriter:
+    """
+    Buffer instances per model and write every buffer once one holds `chunk_size` rows, with `bulk_create` or PostgreSQL `COPY`
+
+    Buffers are written in the order their models were first added, parents before the children referencing them.
+
+    NOTE: Neither sends `post_save`, nor do they call `save()` so fields such as `auto_now_add` must be set on the instances
+    """
+
+    def __init__(self, chunk_size: int, copy: bool):
+        self.chunk_size = chunk_size
+        self.copy = copy
+        self.buffers = defaultdict(list)
+        self.rows = Counter()
+
+    def add(self, instance: Model) -> None:
+        model = type(instance)
+        self.buffers[model].append(instance)
+
+        if len(self.buffers[model]) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        for model, instances in self.buffers.items():
+            if not instances:
+                continue
+
+            self.buffers[model] = []
+
+            if self.copy:
+                copy_instances(model, instances)
+            else:
+                model.objects.bulk_create(instances)
+
+            self.rows[model] += len(instances)
+
+
+def copy_instances(model: Model, instances: List[Model]) -> None:
+    """
+    Write instances with `COPY ... FROM STDIN` which skips the parsing and planning of INSERT statements
+
+    Primary keys which are not set are left to the database.
+    """
+    fields = [field for field in model._meta.concrete_fields if not (field.primary_key and instances[0].pk is None)]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)  # Quote strings, so that an empty string is not read as NULL
+
+    for instance in instances:
+        writer.writerow([field.get_db_prep_save(getattr(instance, field.attname), connection) for field in fields])
+
+    buffer.seek(0)
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def get_max_pk(model: Model) -> int:
+    return model.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+
+
+def reset_sequences(models: List[Model]) -> None:
+    """
+    Move the sequences of the primary keys past the explicit primary keys, a no-op on SQLite
+    """
+    statements = connection.ops.sequence_reset_sql(no_style(), [model._meta.concrete_model for model in models])
+
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
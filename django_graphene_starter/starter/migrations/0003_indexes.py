@@ -0,0 +1,46 @@
+# Generated by Django 3.2.11 on 2026-10-18 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('starter', '0002_reporter_meta_ordering'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['headline', 'id'], name='article_headline_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['pub_date', 'id'], name='article_pub_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['-pub_date', 'id'], name='article_pub_date_desc_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['reporter', 'headline', 'id'], name='article_reporter_headline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(fields=['title', 'id'], name='publication_title_id_idx'),
+        ),
+        # Reporter is a proxy of auth.User, which cannot declare the indexes of its table
+        migrations.RunSQL(
+            sql='CREATE INDEX reporter_first_name_id_idx ON auth_user (first_name, id)',
+            reverse_sql='DROP INDEX reporter_first_name_id_idx',
+        ),
+        migrations.RunSQL(
+            sql='CREATE INDEX reporter_last_name_id_idx ON auth_user (last_name, id)',
+            reverse_sql='DROP INDEX reporter_last_name_id_idx',
+        ),
+        migrations.RunSQL(
+            sql='CREATE INDEX reporter_email_id_idx ON auth_user (email, id)',
+            reverse_sql='DROP INDEX reporter_email_id_idx',
+        ),
+    ]
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+class RunOnVendor(migrations.operations.base.Operation):
+    """
+    Run the database operations only on the databases of a vendor, leaving the state of the models unchanged
+    """
+
+    reversible = True
+
+    def __init__(self, vendor, operations):
+        self.vendor = vendor
+        self.operations = operations
+
+    def deconstruct(self):
+        return self.__class__.__name__, [self.vendor, self.operations], {}
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            for operation in self.operations:
+                operation.database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            for operation in reversed(self.operations):
+                operation.database_backwards(app_label, schema_editor, from_state, to_state)
+
+    def describe(self):
+        return f'Run {len(self.operations)} operations on {self.vendor}'
+
+
+def get_fts_operation(table, column):
+    """
+    An FTS5 table of the column kept up to date by triggers rather than signals, so that bulk writes, e.g. `starter.bulk`, are indexed too
+    """
+    fts_table = f'{table}_fts'
+
+    return migrations.RunSQL(
+        sql=[
+            f"CREATE VIRTUAL TABLE {fts_table} USING fts5({column}, content='{table}', content_rowid='id', tokenize='porter unicode61')",
+            f'CREATE TRIGGER {fts_table}_insert AFTER INSERT ON {table} BEGIN INSERT INTO {fts_table}(rowid, {column}) VALUES (new.id, new.{column}); END',
+            f"CREATE TRIGGER {fts_table}_delete AFTER DELETE ON {table} BEGIN INSERT INTO {fts_table}({fts_table}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END",
+            f"CREATE TRIGGER {fts_table}_update AFTER UPDATE ON {table} BEGIN INSERT INTO {fts_table}({fts_table}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+            f'INSERT INTO {fts_table}(rowid, {column}) VALUES (new.id, new.{column}); END',
+            f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')",
+        ],
+        reverse_sql=[
+            f'DROP TRIGGER {fts_table}_update',
+            f'DROP TRIGGER {fts_table}_delete',
+            f'DROP TRIGGER {fts_table}_insert',
+            f'DROP TABLE {fts_table}',
+        ],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('starter', '0003_indexes'),
+    ]
+
+    # The indexes of `starter.search.search_queryset`, whose expressions must match the `SearchVector` of the PostgreSQL queries.
+    # They are not declared by the models, as the GIN indexes cannot be created on SQLite.
+    operations = [
+        RunOnVendor('postgresql', [
+            migrations.AddIndex(
+                model_name='article',
+                index=GinIndex(SearchVector('headline', config=settings.SEARCH_CONFIG), name='article_headline_search_idx'),
+            ),
+            migrations.AddIndex(
+                model_name='publication',
+                index=GinIndex(SearchVector('title', config=settings.SEARCH_CONFIG), name='publication_title_search_idx'),
+            ),
+        ]),
+        RunOnVendor('sqlite', [
+            get_fts_operation('starter_article', 'headline'),
+            get_fts_operation('starter_publication', 'title'),
+        ]),
+    ]
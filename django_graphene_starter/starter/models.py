@@ -17,6 +17,9 @@ class Publication(models.Model):
 
     class Meta:
         ordering = ['title']
+        indexes = [
+            models.Index(fields=['title', 'id'], name='publication_title_id_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -30,6 +33,12 @@ class Article(models.Model):
 
     class Meta:
         ordering = ['headline']
+        indexes = [
+            models.Index(fields=['headline', 'id'], name='article_headline_id_idx'),
+            models.Index(fields=['pub_date', 'id'], name='article_pub_date_id_idx'),
+            models.Index(fields=['-pub_date', 'id'], name='article_pub_date_desc_id_idx'),
+            models.Index(fields=['reporter', 'headline', 'id'], name='article_reporter_headline_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.headline
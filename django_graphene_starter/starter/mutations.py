@@ -1,11 +1,16 @@
+from typing import List as ListType
+from typing import Optional
+
 from django.contrib.auth.models import Permission
-from graphene import ID, ClientIDMutation, Field, ResolveInfo, String
+from django.db import transaction
+from graphene import ID, ClientIDMutation, Field, InputObjectType, List, NonNull, ResolveInfo, String
 from graphql import GraphQLError
 from graphql_jwt.decorators import login_required, permission_required, staff_member_required
 from graphql_relay import from_global_id
 
+from .bulk import bulk_create, bulk_delete, bulk_update, discard_failed, load_instances, load_related_pks, set_fields, set_related_pks, validate_instances
 from .models import Article, Publication, Reporter
-from .types import ArticleNode, PublicationNode, ReporterNode
+from .types import ArticleNode, ItemError, PublicationNode, ReporterNode
 
 
 # Reporter
@@ -46,6 +51,8 @@ class CreateReporter(ClientIDMutation):
         if not created:
             raise GraphQLError('Reporter already exist!')
 
+        ReporterNode.cache_node(reporter)
+
         return CreateReporter(reporter=reporter)
 
 
@@ -76,6 +83,7 @@ class UpdateReporter(ClientIDMutation):
 
         reporter.full_clean()
         reporter.save()
+        ReporterNode.cache_node(reporter)
 
         return UpdateReporter(reporter=reporter)
 
@@ -97,6 +105,91 @@ class DeleteReporter(ClientIDMutation):
         return DeleteReporter(reporter=reporter)
 
 
+class CreateReporterItem(InputObjectType):
+    first_name = String(required=True)
+    last_name = String(required=True)
+    username = String(required=True)
+    email = String(required=True)
+    password = String(required=True)
+
+
+class UpdateReporterItem(InputObjectType):
+    id = ID(required=True, description='ID of the Reporter to be updated.')
+    first_name = String()
+    last_name = String()
+    email = String()
+
+
+class CreateReporters(ClientIDMutation):
+    reporters = List(ReporterNode, description='The created Reporters in the order of the input, null where the item failed.')
+    errors = List(NonNull(ItemError), required=True)
+
+    class Input:
+        reporters = List(NonNull(CreateReporterItem), required=True)
+
+    @classmethod
+    def mutate_and_get_payload(cls, root, info: ResolveInfo, **input) -> 'CreateReporters':
+        items = input['reporters']
+        reporters = [Reporter(first_name=item['first_name'], last_name=item['last_name'], username=item['username'], email=item['email']) for item in items]
+        errors = []
+
+        for reporter, item in zip(reporters, items):
+            reporter.set_password(item['password'])
+
+        validate_instances(reporters, errors)  # Taken usernames included
+
+        # Granted in the transaction of each batch, so that no reporter is created without it
+        permission = Permission.objects.get(name='Can change reporter')
+        result = bulk_create(Reporter, reporters, errors, related={Reporter.user_permissions: [[permission.pk]] * len(reporters)})
+
+        return CreateReporters(reporters=result.instances, errors=result.errors)
+
+
+class UpdateReporters(ClientIDMutation):
+    """
+    A reporter can only update his/her own details if he/she has `Can change reporter` permission
+    """
+    reporters = List(ReporterNode, description='The updated Reporters in the order of the input, null where the item failed.')
+    errors = List(NonNull(ItemError), required=True)
+
+    class Input:
+        reporters = List(NonNull(UpdateReporterItem), required=True)
+
+    @classmethod
+    @permission_required('starter.change_reporter')
+    def mutate_and_get_payload(cls, root, info: ResolveInfo, **input) -> 'UpdateReporters':
+        items = input['reporters']
+        reporters, errors = load_instances(ReporterNode, [item['id'] for item in items])
+
+        for index, reporter in enumerate(reporters):
+            if reporter is not None and not (info.context.user.is_staff or info.context.user.pk == reporter.pk):
+                errors.append(ItemError(index=index, field='id', messages=['Permission denied. You can only update your own account.']))
+                reporters[index] = None
+
+        fields = set_fields(reporters, items)
+        validate_instances(reporters, errors)
+
+        result = bulk_update(Reporter, reporters, errors, fields)
+
+        return UpdateReporters(reporters=result.instances, errors=result.errors)
+
+
+class DeleteReporters(ClientIDMutation):
+    deleted_ids = List(NonNull(ID), required=True, description='IDs of the deleted Reporters.')
+    errors = List(NonNull(ItemError), required=True)
+
+    class Input:
+        ids = List(NonNull(ID), required=True, description='IDs of the Reporters to be deleted.')
+
+    @classmethod
+    @staff_member_required
+    def mutate_and_get_payload(cls, root, info: ResolveInfo, **input) -> 'DeleteReporters':
+        reporters, errors = load_instances(ReporterNode, input['ids'])
+        result = bulk_delete(Reporter, reporters, errors)
+
+        return DeleteReporters(deleted_ids=get_deleted_ids(input['ids'], result.instances), errors=result.errors)
+
+
 # Publication
 # ^^^^^^^^^^^
 class CreatePublication(ClientIDMutation):
@@ -110,6 +203,7 @@ class CreatePublication(ClientIDMutation):
         title = input['title']
 
         publication = Publication.objects.create(title=title)
+        PublicationNode.cache_node(publication)
 
         return CreatePublication(publication=publication)
 
@@ -133,6 +227,7 @@ class UpdatePublication(ClientIDMutation):
 
         publication.full_clean()
         publication.save()
+        PublicationNode.cache_node(publication)
 
         return UpdatePublication(publication=publication)
 
@@ -153,6 +248,68 @@ class DeletePublication(ClientIDMutation):
         return DeletePublication(publication=publication)
 
 
+class CreatePublicationItem(InputObjectType):
+    title = String(required=True)
+
+
+class UpdatePublicationItem(InputObjectType):
+    id = ID(required=True, description='ID of the Publication to be updated.')
+    title = String()
+
+
+class CreatePublications(ClientIDMutation):
+    publications = List(PublicationNode, description='The created Publications in the order of the input, null where the item failed.')
+    errors = List(NonNull(ItemError), required=True)
+
+    class Input:
+        publications = List(NonNull(CreatePublicationItem), required=True)
+
+    @classmethod
+    def mutate_and_get_payload(cls, root, info: ResolveInfo, **input) -> 'CreatePublications':
+        publications = [Publication(title=item['title']) for item in input['publications']]
+        errors = []
+
+        validate_instances(publications, errors)
+        result = bulk_create(Publication, publications, errors)
+
+        return CreatePublications(publications=result.instances, errors=result.errors)
+
+
+class UpdatePublications(ClientIDMutation):
+    publications = List(PublicationNode, description='The updated Publications in the order of the input, null where the item failed.')
+    errors = List(NonNull(ItemError), required=True)
+
+    class Input:
+        publications = List(NonNull(UpdatePublicationItem), required=True)
+
+    @classmethod
+    def mutate_and_get_payload(cls, root, info: ResolveInfo, **input) -> 'UpdatePublications':
+        items = input['publications']
+        publications, errors = load_instances(PublicationNode, [item['id'] for item in items])
+
+        fields = set_fields(publications, items)
+        validate_instances(publications, errors)
+
+        result = bulk_update(Publication, publications, errors, fields)
+
+        return UpdatePublications(publications=result.instances, errors=result.errors)
+
+
+class DeletePublications(ClientIDMutation):
+    deleted_ids = List(NonNull(ID), required=True, description='IDs of the deleted Publications.')
+    errors = List(NonNull(ItemError), required=True)
+
+    class Input:
+        ids = List(NonNull(ID), required=True, description='IDs of the Publications to be deleted.')
+
+    @classmethod
+    def mutate_and_get_payload(cls, root, info: ResolveInfo, **input) -> 'DeletePublications':
+        publications, errors = load_instances(PublicationNode, input['ids'])
+        result = bulk_delete(Publication, publications, errors)
+
+        return DeletePublications(deleted_ids=get_deleted_ids(input['ids'], result.instances), errors=result.errors)
+
+
 # Article
 # ^^^^^^^
 class CreateArticle(ClientIDMutation):
@@ -160,15 +317,21 @@ class CreateArticle(ClientIDMutation):
 
     class Input:
         headline = String(required=True)
+        publication_ids = List(NonNull(ID), description='IDs of the Publications of the Article.')
 
     @classmethod
     @login_required
     def mutate_and_get_payload(cls, root, info: ResolveInfo, **input) -> 'CreateArticle':
         headline = input['headline']
+        publication_pks = get_publication_pks(input)
 
         reporter = Reporter.objects.get(username=info.context.user.username)  # TODO: Find a better way to reference to Proxy user model
 
-        article = Article.objects.create(headline=headline, reporter=reporter)
+        with transaction.atomic():
+            article = Article.objects.create(headline=headline, reporter=reporter)
+            set_related_pks(Article.publications, {article.pk: publication_pks} if publication_pks is not None else {})
+
+        ArticleNode.cache_node(article)
 
         return CreateArticle(article=article)
 
@@ -179,19 +342,26 @@ class UpdateArticle(ClientIDMutation):
     class Input:
         id = ID(required=True, description='ID of the Article to be updated.')
         headline = String()
+        publication_ids = List(NonNull(ID), description='IDs of the Publications of the Article, replacing the current ones.')
 
     @classmethod
     def mutate_and_get_payload(cls, root, info: ResolveInfo, **input) -> 'UpdateArticle':
         _, id = from_global_id(input['id'])
+        publication_pks = get_publication_pks(input)
 
         article = Article.objects.get(id=id)
 
         for field, value in input.items():
-            if field != 'id':
+            if field not in ('id', 'publication_ids'):
                 setattr(article, field, value)
 
         article.full_clean()
-        article.save()
+
+        with transaction.atomic():
+            article.save()
+            set_related_pks(Article.publications, {article.pk: publication_pks} if publication_pks is not None else {})
+
+        ArticleNode.cache_node(article)
 
         return UpdateArticle(article=article)
 
@@ -210,3 +380,92 @@ class DeleteArticle(ClientIDMutation):
         article.delete()
 
         return DeleteArticle(article=article)
+
+
+class CreateArticleItem(InputObjectType):
+    headline = String(required=True)
+    publication_ids = List(NonNull(ID), description='IDs of the Publications of the Article.')
+
+
+class UpdateArticleItem(InputObjectType):
+    id = ID(required=True, description='ID of the Article to be updated.')
+    headline = String()
+    publication_ids = List(NonNull(ID), description='IDs of the Publications of the Article, replacing the current ones.')
+
+
+class CreateArticles(ClientIDMutation):
+    articles = List(ArticleNode, description='The created Articles in the order of the input, null where the item failed.')
+    errors = List(NonNull(ItemError), required=True)
+
+    class Input:
+        articles = List(NonNull(CreateArticleItem), required=True)
+
+    @classmethod
+    @login_required
+    def mutate_and_get_payload(cls, root, info: ResolveInfo, **input) -> 'CreateArticles':
+        reporter = Reporter.objects.get(username=info.context.user.username)  # TODO: Find a better way to reference to Proxy user model
+
+        items = input['articles']
+        articles = [Article(headline=item['headline'], reporter=reporter) for item in items]
+        publication_pks, errors = load_related_pks(PublicationNode, [item.get('publication_ids') for item in items], 'publication_ids')
+
+        discard_failed(articles, errors)
+        validate_instances(articles, errors)
+        result = bulk_create(Article, articles, errors, related={Article.publications: publication_pks})
+
+        return CreateArticles(articles=result.instances, errors=result.errors)
+
+
+class UpdateArticles(ClientIDMutation):
+    articles = List(ArticleNode, description='The updated Articles in the order of the input, null where the item failed.')
+    errors = List(NonNull(ItemError), required=True)
+
+    class Input:
+        articles = List(NonNull(UpdateArticleItem), required=True)
+
+    @classmethod
+    def mutate_and_get_payload(cls, root, info: ResolveInfo, **input) -> 'UpdateArticles':
+        items = input['articles']
+        articles, errors = load_instances(ArticleNode, [item['id'] for item in items])
+        publication_pks, publication_errors = load_related_pks(PublicationNode, [item.get('publication_ids') for item in items], 'publication_ids')
+
+        discard_failed(articles, publication_errors)
+        errors.extend(publication_errors)
+
+        fields = set_fields(articles, items, exclude=('id', 'publication_ids'))
+        validate_instances(articles, errors)
+
+        result = bulk_update(Article, articles, errors, fields, related={Article.publications: publication_pks})
+
+        return UpdateArticles(articles=result.instances, errors=result.errors)
+
+
+class DeleteArticles(ClientIDMutation):
+    deleted_ids = List(NonNull(ID), required=True, description='IDs of the deleted Articles.')
+    errors = List(NonNull(ItemError), required=True)
+
+    class Input:
+        ids = List(NonNull(ID), required=True, description='IDs of the Articles to be deleted.')
+
+    @classmethod
+    def mutate_and_get_payload(cls, root, info: ResolveInfo, **input) -> 'DeleteArticles':
+        articles, errors = load_instances(ArticleNode, input['ids'])
+        result = bulk_delete(Article, articles, errors)
+
+        return DeleteArticles(deleted_ids=get_deleted_ids(input['ids'], result.instances), errors=result.errors)
+
+
+def get_deleted_ids(ids: ListType[str], instances: ListType) -> ListType[str]:
+    return [id for id, instance in zip(ids, instances) if instance is not None]
+
+
+def get_publication_pks(input: dict) -> Optional[ListType]:
+    """
+    Return the primary keys of the `publication_ids` of an article mutation, None if they were not given
+    """
+    (publication_pks,), errors = load_related_pks(PublicationNode, [input.get('publication_ids')], 'publication_ids')
+
+    if errors:
+        raise GraphQLError(errors[0].messages[0])
+
+    return publication_pks
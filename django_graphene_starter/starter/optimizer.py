@@ -0,0 +1,250 @@
+from collections import OrderedDict
+from typing import AbstractSet, Dict, Iterable, List, Optional, Tuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import Model, OuterRef, Prefetch, Subquery
+from django.db.models.expressions import RawSQL
+from django.db.models.query import QuerySet
+from graphene.utils.str_converters import to_snake_case
+from graphql import GraphQLInt, GraphQLString
+from graphql.execution.base import ResolveInfo
+from graphql.language.ast import Field, FragmentSpread, InlineFragment
+from graphql.utils.value_from_ast import value_from_ast
+from graphql_relay.connection.arrayconnection import cursor_to_offset
+
+PAGINATION_ARGUMENTS = ('first', 'last', 'before', 'after', 'offset')
+COUNT_ONLY_SELECTIONS = ('totalCount', '__typename')
+
+
+def optimize_queryset(queryset: QuerySet, info: ResolveInfo, only: Iterable[str] = ()) -> QuerySet:
+    """
+    Apply `select_related`, `prefetch_related` and `only` to a connection queryset based on the GraphQL selection set
+
+    For example, given:
+
+    articles { edges { node { id headline reporter { id email } publications { edges { node { title } } } } } }
+
+    This returns:
+
+    Article.objects.select_related('reporter').prefetch_related(Prefetch('publications', queryset=Publication.objects.only('id', 'title'))).only('id', 'headline', 'reporter', 'reporter__id', 'reporter__email')
+
+    Fields given in `only` are always loaded on top of the selected ones, e.g. the columns used as a keyset cursor
+
+    NOTE: Custom resolvers on the node types (e.g. `dataloader_*`) are expected to only rely on the primary key of their root
+    """
+    selections = get_node_selections(info.field_asts, info.fragments)
+    return optimize_selections(queryset, selections, info.fragments, info.variable_values, only=only)
+
+
+def optimize_nodes_queryset(queryset: QuerySet, info: ResolveInfo, excluded_types: AbstractSet[str]) -> QuerySet:
+    """
+    Like `optimize_queryset`, for the nodes of a single type within a list of nodes of any type, e.g.
+
+    nodes(ids: [...]) { ... on ArticleNode { headline reporter { email } } ... on ReporterNode { email } }
+
+    The fragments on `excluded_types`, i.e. on the other node types, are left out, e.g. `email` for the ArticleNode queryset.
+    """
+    selections = get_selections(info.field_asts, info.fragments, excluded_types)
+    return optimize_selections(queryset, selections, info.fragments, info.variable_values)
+
+
+def optimize_selections(queryset: QuerySet, selections: List[Field], fragments: Dict, variables: Dict, only: Iterable[str] = ()) -> QuerySet:
+    """
+    Apply the plan of `selections`, the fields selected on the nodes of `queryset`, see `plan_queryset`
+    """
+    planned_only, select_related, prefetch_related = plan_queryset(queryset.model, selections, fragments, variables)
+    only = planned_only + list(only)
+
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+
+    return queryset.only(*only)
+
+
+def plan_queryset(model: Model, selections: List[Field], fragments: Dict, variables: Dict, prefix: str = '') -> Tuple[List[str], List[str], List[Prefetch]]:
+    """
+    Return the `only`, `select_related` and `prefetch_related` of `model` needed by `selections`, prefixed with `prefix`
+    """
+    only, select_related, prefetch_related = [f'{prefix}{model._meta.pk.name}'], [], []
+
+    for name, field_asts in group_selections(selections).items():
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue  # Not backed by a model field, e.g. `dataloader_articles` or `__typename`
+
+        if not field.is_relation:
+            only.append(f'{prefix}{field.name}')
+
+        elif field.concrete and (field.many_to_one or field.one_to_one):
+            # For example: Article.reporter
+            only.append(f'{prefix}{field.name}')
+            select_related.append(f'{prefix}{field.name}')
+
+            related_only, related_select_related, related_prefetch_related = plan_queryset(
+                field.related_model,
+                get_node_selections(field_asts, fragments),
+                fragments,
+                variables,
+                prefix=f'{prefix}{field.name}__',
+            )
+            only.extend(related_only)
+            select_related.extend(related_select_related)
+            prefetch_related.extend(related_prefetch_related)
+
+        elif (field.one_to_many or field.many_to_many) and not has_filtering_arguments(field_asts) and not has_backward_pagination_arguments(field_asts) and not is_count_only_selection(field_asts, fragments):
+            # For example: Article.publications or Reporter.articles
+            # Filtered or ordered relations are left to be resolved lazily as the prefetched results would not be used
+            # So are the relations paginated backwards, which would need every related row to find their last ones
+            # Relations which only select `totalCount` are counted in batch instead, see `OptimizedConnectionField`
+            accessor_name = field.get_accessor_name() if field.auto_created else field.name
+            queryset = optimize_selections(
+                field.related_model._default_manager.all(),
+                get_node_selections(field_asts, fragments),
+                fragments,
+                variables,
+                # Prefetching a reverse foreign key requires the foreign key column on the related rows
+                only=[field.field.name] if field.one_to_many else (),
+            )
+
+            limit = get_prefetch_limit(field_asts, variables)
+            if limit is not None:
+                queryset = limit_per_parent(field, queryset, limit)
+
+            prefetch_related.append(Prefetch(f'{prefix}{accessor_name}', queryset=queryset))
+
+    return only, select_related, prefetch_related
+
+
+def is_count_only_selection(field_asts: List[Field], fragments: Dict) -> bool:
+    """
+    Whether a connection only selects its `totalCount`, e.g. `publications { totalCount }`
+    """
+    selections = get_selections(field_asts, fragments)
+    return bool(selections) and all(selection.name.value in COUNT_ONLY_SELECTIONS for selection in selections)
+
+
+def get_selections(field_asts: List[Field], fragments: Dict, excluded_types: AbstractSet[str] = frozenset()) -> List[Field]:
+    """
+    Flatten the selection sets of the given fields, expanding both named and inline fragments, but the ones on `excluded_types`
+    """
+    selections = []
+
+    def collect(selection_set):
+        if not selection_set:
+            return
+
+        for selection in selection_set.selections:
+            if isinstance(selection, Field):
+                selections.append(selection)
+            elif isinstance(selection, FragmentSpread):
+                fragment = fragments[selection.name.value]
+                if fragment.type_condition.name.value not in excluded_types:
+                    collect(fragment.selection_set)
+            elif isinstance(selection, InlineFragment):
+                if not selection.type_condition or selection.type_condition.name.value not in excluded_types:
+                    collect(selection.selection_set)
+
+    for field_ast in field_asts:
+        collect(field_ast.selection_set)
+
+    return selections
+
+
+def get_node_selections(field_asts: List[Field], fragments: Dict) -> List[Field]:
+    """
+    Return the selections of a node, looking through `edges { node { ... } }` of Relay connections
+    """
+    selections = get_selections(field_asts, fragments)
+
+    edges = [selection for selection in selections if selection.name.value == 'edges']
+    nodes = [selection for selection in get_selections(edges, fragments) if selection.name.value == 'node']
+
+    return selections + get_selections(nodes, fragments)
+
+
+def group_selections(selections: List[Field]) -> Dict[str, List[Field]]:
+    """
+    Group selections by field name so that aliased or repeated fields are planned once
+    """
+    grouped = OrderedDict()
+
+    for selection in selections:
+        grouped.setdefault(to_snake_case(selection.name.value), []).append(selection)
+
+    return grouped
+
+
+def has_filtering_arguments(field_asts: List[Field]) -> bool:
+    return any(argument.name.value not in PAGINATION_ARGUMENTS for field_ast in field_asts for argument in field_ast.arguments)
+
+
+def has_backward_pagination_arguments(field_asts: List[Field]) -> bool:
+    return any(argument.name.value in ('last', 'before') for field_ast in field_asts for argument in field_ast.arguments)
+
+
+def get_prefetch_limit(field_asts: List[Field], variables: Dict) -> Optional[int]:
+    """
+    Return how many related rows of each parent a nested connection needs, None for all of them, see `get_page_limit`
+    """
+    limits = []
+
+    for field_ast in field_asts:
+        arguments = {argument.name.value: argument.value for argument in field_ast.arguments}
+        limits.append(get_page_limit(
+            value_from_ast(arguments['first'], GraphQLInt, variables) if 'first' in arguments else None,
+            value_from_ast(arguments['after'], GraphQLString, variables) if 'after' in arguments else None,
+            value_from_ast(arguments['offset'], GraphQLInt, variables) if 'offset' in arguments else None,
+        ))
+
+    return None if None in limits else max(limits)
+
+
+def get_page_limit(first: Optional[int], after: Optional[str], offset: Optional[int]) -> Optional[int]:
+    """
+    Return how many rows from the start of a list serve a forward page of `first` rows, and tell whether it has a next
+    page by one more row, None if the page is not bounded, see `OptimizedConnectionField.resolve_connection`
+    """
+    if first is None:
+        return None
+
+    start = offset or 0
+    if after is not None:
+        after_offset = cursor_to_offset(after)
+        if after_offset is None:
+            return None  # Rejected when the connection is resolved
+
+        start += after_offset + 1
+
+    return start + max(first, 0) + 1
+
+
+def limit_per_parent(field, queryset: QuerySet, limit: int) -> QuerySet:
+    """
+    Limit the prefetch of a reverse foreign key or a many-to-many relation to the first `limit` related rows of each parent,
+    with a subquery correlated to the parent of each row, as Django 3.2 cannot filter on a window function, e.g. for `Reporter.articles`:
+
+    SELECT ... FROM starter_article WHERE id IN (SELECT U0.id FROM starter_article U0 WHERE U0.reporter_id = (starter_article.reporter_id) ORDER BY U0.headline, U0.id LIMIT 11) AND reporter_id IN (...)
+
+    The parent of a row of a many-to-many relation is the column of the table joined by the prefetch, which Django names
+    after the table itself, see `ManyRelatedManager.get_prefetch_queryset`.
+    """
+    ordering = [*queryset.model._meta.ordering, 'pk']
+
+    if field.one_to_many:
+        lookup, parent = field.field.name, OuterRef(field.field.attname)
+    else:
+        # The forward field, e.g. Article.publications, or its reverse relation, e.g. Publication.articles
+        forward, is_forward = (field, True) if field.concrete else (field.field, False)
+        through = forward.remote_field.through
+        source = through._meta.get_field(forward.m2m_field_name() if is_forward else forward.m2m_reverse_field_name())
+        quote_name = connections[queryset.db].ops.quote_name
+
+        lookup = forward.related_query_name() if is_forward else forward.name
+        parent = RawSQL(f'{quote_name(through._meta.db_table)}.{quote_name(source.column)}', ())
+
+    rows = queryset.model._default_manager.filter(**{lookup: parent}).order_by(*ordering).values('pk')[:limit]
+    return queryset.filter(pk__in=Subquery(rows)).order_by(*ordering)
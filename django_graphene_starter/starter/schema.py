@@ -1,31 +1,45 @@
 from graphene import ObjectType
 from graphene.relay import Node
-from graphene_django.filter import DjangoFilterConnectionField
 
-from .mutations import CreateArticle, CreatePublication, CreateReporter, DeleteArticle, DeletePublication, DeleteReporter, UpdateArticle, UpdatePublication, UpdateReporter
-from .types import ArticleNode, PublicationNode, ReporterNode
+from .fields import KeysetConnectionField, OptimizedConnectionField
+from .mutations import CreateArticle, CreateArticles, CreatePublication, CreatePublications, CreateReporter, CreateReporters, DeleteArticle, DeleteArticles, DeletePublication, DeletePublications, DeleteReporter, DeleteReporters, UpdateArticle, UpdateArticles, UpdatePublication, UpdatePublications, UpdateReporter, UpdateReporters
+from .types import ArticleNode, NodesField, PublicationNode, ReporterNode
 
 
 class Mutation(ObjectType):
     create_reporter = CreateReporter.Field(description='Create a single Reporter.')
     update_reporter = UpdateReporter.Field(description='Update a single Reporter.')
     delete_reporter = DeleteReporter.Field(description='Delete a single Reporter.')
+    create_reporters = CreateReporters.Field(description='Create a list of Reporter, reporting the errors of each item.')
+    update_reporters = UpdateReporters.Field(description='Update a list of Reporter, reporting the errors of each item.')
+    delete_reporters = DeleteReporters.Field(description='Delete a list of Reporter, reporting the errors of each item.')
 
     create_publication = CreatePublication.Field(description='Create a single Publication.')
     update_publication = UpdatePublication.Field(description='Update a single Publication.')
     delete_publication = DeletePublication.Field(description='Delete a single Publication.')
+    create_publications = CreatePublications.Field(description='Create a list of Publication, reporting the errors of each item.')
+    update_publications = UpdatePublications.Field(description='Update a list of Publication, reporting the errors of each item.')
+    delete_publications = DeletePublications.Field(description='Delete a list of Publication, reporting the errors of each item.')
 
     create_article = CreateArticle.Field(description='Create a single Article.')
     update_article = UpdateArticle.Field(description='Update a single Article.')
     delete_article = DeleteArticle.Field(description='Delete a single Article.')
+    create_articles = CreateArticles.Field(description='Create a list of Article, reporting the errors of each item.')
+    update_articles = UpdateArticles.Field(description='Update a list of Article, reporting the errors of each item.')
+    delete_articles = DeleteArticles.Field(description='Delete a list of Article, reporting the errors of each item.')
 
 
 class Query(ObjectType):
+    nodes = NodesField(ReporterNode, PublicationNode, ArticleNode, description='Retrieve Reporter, Publication and Article nodes by global ID, in the order of `ids`, null where missing.')
+
     reporter = Node.Field(ReporterNode, description='Retrieve a single Reporter node.')
-    reporters = DjangoFilterConnectionField(ReporterNode, description='Return a connection of Reporter.')
+    reporters = OptimizedConnectionField(ReporterNode, description='Return a connection of Reporter.')
+    keyset_reporters = KeysetConnectionField(ReporterNode, description='Return a connection of Reporter which paginates by seeking on the `orderBy` fields.')
 
     publication = Node.Field(PublicationNode, description='Retrieve a single Publication node.')
-    publications = DjangoFilterConnectionField(PublicationNode, description='Return a connection of Publication.')
+    publications = OptimizedConnectionField(PublicationNode, description='Return a connection of Publication.')
+    keyset_publications = KeysetConnectionField(PublicationNode, description='Return a connection of Publication which paginates by seeking on the `orderBy` fields.')
 
     article = Node.Field(ArticleNode, description='Retrieve a single Article node.')
-    articles = DjangoFilterConnectionField(ArticleNode, description='Return a connection of Article.')
+    articles = OptimizedConnectionField(ArticleNode, description='Return a connection of Article.')
+    keyset_articles = KeysetConnectionField(ArticleNode, description='Return a connection of Article which paginates by seeking on the `orderBy` fields.')
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import Model
+from django.db.models.expressions import RawSQL
+from django.db.models.query import QuerySet
+
+from .models import Article, Publication
+
+# The text column searched by `search_queryset` for each model
+SEARCH_FIELDS = {
+    Article: 'headline',
+    Publication: 'title',
+}
+
+
+def search_queryset(queryset: QuerySet, value: str) -> QuerySet:
+    """
+    Filter a queryset by a full-text search and order it by rank, most relevant first with the primary key as a tiebreaker
+
+    - PostgreSQL: matches `websearch_to_tsquery` against `to_tsvector` of the column, served by a GIN expression index, and ranks with `ts_rank`
+    - SQLite: matches every term against an FTS5 table kept up to date by triggers and ranks with bm25, for local development and tests
+
+    See the `0004_search` migration for the indexes.
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+
+    if connection.vendor == 'postgresql':
+        vector = SearchVector(SEARCH_FIELDS[model._meta.concrete_model], config=settings.SEARCH_CONFIG)  # Must match the expression of the index
+        query = SearchQuery(value, config=settings.SEARCH_CONFIG, search_type='websearch')
+        return queryset.annotate(search_vector=vector).filter(search_vector=query).annotate(search_rank=SearchRank(vector, query)).order_by('-search_rank', 'pk')
+
+    terms = ' '.join('"{}"'.format(term.replace('"', '""')) for term in value.split())  # Quote the terms, FTS5 operators in user input are not supported
+    if not terms:
+        return queryset
+
+    table, fts_table, pk = (connection.ops.quote_name(name) for name in (model._meta.db_table, _get_fts_table(model), model._meta.pk.column))
+
+    return queryset.filter(
+        pk__in=RawSQL(f'SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s', [terms]),
+    ).annotate(
+        search_rank=RawSQL(f'SELECT -bm25({fts_table}) FROM {fts_table} WHERE {fts_table} MATCH %s AND rowid = {table}.{pk}', [terms]),
+    ).order_by('-search_rank', 'pk')
+
+
+def _get_fts_table(model: Model) -> str:
+    return f'{model._meta.db_table}_fts'
@@ -0,0 +1,27 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_model_version, node_cache
+from .models import Article, Publication, Reporter
+
+
+# Reporter is a proxy of User, whose writes, e.g. from the admin, are sent by User
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Reporter)
+@receiver(post_save, sender=Publication)
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Reporter)
+@receiver(post_delete, sender=Publication)
+@receiver(post_delete, sender=Article)
+def invalidate_model(sender, instance, **kwargs) -> None:
+    bump_model_version(sender)
+    node_cache.delete(sender, instance.pk)
+
+
+@receiver(m2m_changed, sender=Article.publications.through)
+def invalidate_article_publications(sender, action: str, **kwargs) -> None:
+    if action.startswith('post_'):
+        bump_model_version(Article)
+        bump_model_version(Publication)
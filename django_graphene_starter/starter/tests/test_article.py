@@ -1,13 +1,41 @@
 import json
+import weakref
+from types import SimpleNamespace
 
+from django.db import connection
+from django.db.models.signals import post_init
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django_graphene_starter.middlewares import LoaderMiddleware
 from django_graphene_starter.schema import schema
+from graphene.utils.str_converters import to_snake_case
 from graphene_django.utils.testing import GraphQLTestCase
-from graphql_relay import to_global_id
+from graphql_relay import from_global_id, to_global_id
+from graphql_relay.utils import base64
 from mixer.backend.django import mixer
 
 from ..models import Article, Publication, Reporter
 
+PAGINATED_PUBLICATIONS_BY_ARTICLES_QUERY = '''
+query articles {
+  articles(first: 1000) {
+    edges {
+      node {
+        id
+        publications(first: 2) {
+          totalCount
+          edges {
+            node {
+              title
+            }
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
 TOKEN_AUTH_MUTATION = '''
 mutation tokenAuth($username: String!, $password: String!) {
   tokenAuth(username: $username, password: $password) {
@@ -20,12 +48,12 @@ mutation tokenAuth($username: String!, $password: String!) {
 
 ARTICLES_QUERY = '''
 query articles {
-  articles(orderBy: "-pubDate") {
+  articles(orderBy: "-pubDate", first: 1000) {
     totalCount
     edges {
       node {
         id
-        publications {
+        publications(first: 10) {
           totalCount
           edges {
             node {
@@ -71,6 +99,61 @@ query articles {
 }
 '''
 
+PUBLICATIONS_COUNT_BY_ARTICLES_QUERY = '''
+query articles {
+  articles(first: 1000) {
+    edges {
+      node {
+        id
+        publications {
+          totalCount
+        }
+      }
+    }
+  }
+}
+'''
+
+PAGINATED_ARTICLES_QUERY = '''
+query articles($first: Int, $after: String, $last: Int, $before: String, $offset: Int) {
+  articles(first: $first, after: $after, last: $last, before: $before, offset: $offset, orderBy: "headline") {
+    totalCount
+    pageInfo {
+      hasNextPage
+      hasPreviousPage
+      startCursor
+      endCursor
+    }
+    edges {
+      cursor
+      node {
+        id
+        headline
+      }
+    }
+  }
+}
+'''
+
+KEYSET_ARTICLES_QUERY = '''
+query keysetArticles($first: Int, $after: String, $last: Int, $before: String, $orderBy: String) {
+  keysetArticles(first: $first, after: $after, last: $last, before: $before, orderBy: $orderBy) {
+    totalCount
+    pageInfo {
+      hasNextPage
+      hasPreviousPage
+      startCursor
+      endCursor
+    }
+    edges {
+      node {
+        id
+      }
+    }
+  }
+}
+'''
+
 ARTICLE_QUERY = '''
 query article($id: ID!) {
   article(id: $id) {
@@ -118,6 +201,22 @@ mutation updateArticle($input: UpdateArticleInput!) {
 
 '''
 
+UPDATE_ARTICLE_PUBLICATIONS_MUTATION = '''
+mutation updateArticle($input: UpdateArticleInput!) {
+  updateArticle(input: $input) {
+    article {
+      publications {
+        edges {
+          node {
+            id
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
 DELETE_ARTICLE_MUTATION = '''
 mutation deleteArticle($input: DeleteArticleInput!) {
   deleteArticle(input: $input) {
@@ -213,6 +312,175 @@ class ArticleTestCase(GraphQLTestCase):
 
         self.assertEqual(result, dataloader_result)
 
+    def test_articles_query_is_optimized(self):
+        with CaptureQueriesContext(connection) as context:
+            result = schema.execute(ARTICLES_QUERY, context_value=SimpleNamespace(), middleware=[LoaderMiddleware()])
+
+        self.assertIsNone(result.errors)
+
+        # 1 COUNT and 1 SELECT for the Article connection and 1 prefetch for every `publications`
+        self.assertEqual(len(context.captured_queries), 3)
+
+    def test_reporter_by_articles_query_is_optimized(self):
+        with CaptureQueriesContext(connection) as context:
+            result = schema.execute(REPORTER_BY_ARTICLES_QUERY, context_value=SimpleNamespace(), middleware=[LoaderMiddleware()])
+
+        self.assertIsNone(result.errors)
+
+        # 1 COUNT and 1 SELECT joined with the Reporter table for the Article connection
+        self.assertEqual(len(context.captured_queries), 2)
+
+    def test_publications_count_by_articles_query_is_batched(self):
+        with CaptureQueriesContext(connection) as context:
+            result = schema.execute(PUBLICATIONS_COUNT_BY_ARTICLES_QUERY, context_value=SimpleNamespace(), middleware=[LoaderMiddleware()])
+
+        self.assertIsNone(result.errors)
+
+        # 1 COUNT and 1 SELECT for the Article connection and 1 GROUP BY for every `publications.totalCount`
+        self.assertEqual(len(context.captured_queries), 3)
+
+        counts = {edge['node']['id']: edge['node']['publications']['totalCount'] for edge in result.data['articles']['edges']}
+
+        self.assertEqual(counts[to_global_id('ArticleNode', self.article1.id)], 1)
+        self.assertEqual(counts[to_global_id('ArticleNode', self.article2.id)], 5)
+        self.assertEqual(sum(counts.values()), 6)
+
+    def test_paginated_publications_by_articles_only_prefetch_their_page(self):
+        with CaptureQueriesContext(connection) as context:
+            result = schema.execute(PAGINATED_PUBLICATIONS_BY_ARTICLES_QUERY, context_value=SimpleNamespace(), middleware=[LoaderMiddleware()])
+
+        self.assertIsNone(result.errors)
+
+        # 1 COUNT and 1 SELECT for the Article connection, 1 prefetch of up to 3 publications of every article and 1 GROUP BY for every `publications.totalCount`
+        self.assertEqual(len(context.captured_queries), 4)
+        self.assertIn('LIMIT 3', context.captured_queries[2]['sql'])
+
+        for edge in result.data['articles']['edges']:
+            publications = Article.objects.get(pk=from_global_id(edge['node']['id'])[1]).publications.order_by('title', 'pk')
+
+            self.assertEqual([publication['node']['title'] for publication in edge['node']['publications']['edges']], [publication.title for publication in publications[:2]])
+            self.assertEqual(edge['node']['publications']['totalCount'], publications.count())
+
+    def test_articles_query_is_fetched_in_chunks(self):
+        expected = schema.execute(ARTICLES_QUERY, context_value=SimpleNamespace(), middleware=[LoaderMiddleware()])
+
+        with override_settings(GRAPHQL_CONNECTION_ITERATOR_THRESHOLD=10, GRAPHQL_CONNECTION_ITERATOR_CHUNK_SIZE=50), CaptureQueriesContext(connection) as context:
+            result = schema.execute(ARTICLES_QUERY, context_value=SimpleNamespace(), middleware=[LoaderMiddleware()])
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data, expected.data)
+
+        # The COUNT and the SELECT of the Article connection, and 1 prefetch of `publications` for every chunk of 50 articles
+        self.assertEqual(len(context.captured_queries), 5)
+
+    def test_articles_query_holds_a_chunk_of_articles_at_once(self):
+        articles, alive = weakref.WeakSet(), []
+
+        def track(instance, **kwargs):
+            articles.add(instance)
+            alive.append(len(articles))
+
+        post_init.connect(track, sender=Article)
+        try:
+            with override_settings(GRAPHQL_CONNECTION_ITERATOR_THRESHOLD=10, GRAPHQL_CONNECTION_ITERATOR_CHUNK_SIZE=10):
+                result = schema.execute(ARTICLES_QUERY, context_value=SimpleNamespace(), middleware=[LoaderMiddleware()])
+        finally:
+            post_init.disconnect(track, sender=Article)
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(len(alive), 102)
+        self.assertLessEqual(max(alive), 11)  # A chunk and the edge being completed
+
+    def test_chunked_articles_query_paginates_as_usual(self):
+        cursor = json.loads(self.query(PAGINATED_ARTICLES_QUERY, op_name='articles', variables={'first': 30}).content)['data']['articles']['edges'][-1]['cursor']
+
+        for variables in ({'first': 30}, {'first': 30, 'after': cursor}, {'last': 20}, {'last': 20, 'before': cursor}, {'first': 20, 'offset': 90}, {'first': 0}):
+            with self.subTest(variables=variables):
+                expected = json.loads(self.query(PAGINATED_ARTICLES_QUERY, op_name='articles', variables=variables).content)
+
+                with override_settings(GRAPHQL_CONNECTION_ITERATOR_THRESHOLD=1, GRAPHQL_CONNECTION_ITERATOR_CHUNK_SIZE=7):
+                    content = json.loads(self.query(PAGINATED_ARTICLES_QUERY, op_name='articles', variables=variables).content)
+
+                self.assertNotIn('errors', content)
+                self.assertEqual(content, expected)
+
+    def test_keyset_articles_query_paginates_through_every_article(self):
+        for order_by in ('headline', '-pubDate', 'pubDate,headline'):
+            expected = [to_global_id('ArticleNode', id) for id in Article.objects.order_by(*[to_snake_case(field) for field in order_by.split(',')], 'pk').values_list('id', flat=True)]
+
+            ids, after, has_next_page = [], None, True
+            while has_next_page:
+                response = self.query(
+                    KEYSET_ARTICLES_QUERY,
+                    op_name='keysetArticles',
+                    variables={'first': 10, 'after': after, 'orderBy': order_by},
+                )
+                self.assertResponseNoErrors(response)
+                content = json.loads(response.content)['data']['keysetArticles']
+
+                self.assertEqual(content['totalCount'], 102)
+                ids += [edge['node']['id'] for edge in content['edges']]
+                after, has_next_page = content['pageInfo']['endCursor'], content['pageInfo']['hasNextPage']
+
+            self.assertEqual(ids, expected)
+
+    def test_keyset_articles_query_paginates_backwards(self):
+        expected = [to_global_id('ArticleNode', id) for id in Article.objects.order_by('headline', 'pk').values_list('id', flat=True)]
+
+        response = self.query(
+            KEYSET_ARTICLES_QUERY,
+            op_name='keysetArticles',
+            variables={'last': 10},
+        )
+        self.assertResponseNoErrors(response)
+        content = json.loads(response.content)['data']['keysetArticles']
+
+        self.assertEqual([edge['node']['id'] for edge in content['edges']], expected[-10:])
+        self.assertTrue(content['pageInfo']['hasPreviousPage'])
+
+        response = self.query(
+            KEYSET_ARTICLES_QUERY,
+            op_name='keysetArticles',
+            variables={'last': 10, 'before': content['pageInfo']['startCursor']},
+        )
+        self.assertResponseNoErrors(response)
+        content = json.loads(response.content)['data']['keysetArticles']
+
+        self.assertEqual([edge['node']['id'] for edge in content['edges']], expected[-20:-10])
+        self.assertTrue(content['pageInfo']['hasNextPage'])
+
+    def test_keyset_articles_query_rejects_cursor_of_another_ordering(self):
+        response = self.query(
+            KEYSET_ARTICLES_QUERY,
+            op_name='keysetArticles',
+            variables={'first': 10, 'orderBy': 'headline'},
+        )
+        after = json.loads(response.content)['data']['keysetArticles']['pageInfo']['endCursor']
+
+        response = self.query(
+            KEYSET_ARTICLES_QUERY,
+            op_name='keysetArticles',
+            variables={'first': 10, 'after': after, 'orderBy': '-pubDate'},
+        )
+        self.assertResponseHasErrors(response)
+        content = json.loads(response.content)
+
+        self.assertEqual(content['errors'][0]['message'], 'The cursor does not match the `orderBy` of the connection.')
+
+    def test_keyset_articles_query_rejects_malformed_cursor(self):
+        for values in ([], ['headline'], ['headline', 'not an id']):
+            with self.subTest(values=values):
+                after = base64(json.dumps([['headline', 'pk'], values]))
+                response = self.query(
+                    KEYSET_ARTICLES_QUERY,
+                    op_name='keysetArticles',
+                    variables={'first': 10, 'after': after},
+                )
+                self.assertResponseHasErrors(response)
+                content = json.loads(response.content)
+
+                self.assertEqual(content['errors'][0]['message'], f'Invalid cursor {after!r}.')
+
     def test_article_reporter_query(self):
         id = to_global_id('ArticleNode', self.article2.id)
 
@@ -277,6 +545,54 @@ class ArticleTestCase(GraphQLTestCase):
         self.assertEqual(content['data']['updateArticle']['article']['id'], id)
         self.assertEqual(content['data']['updateArticle']['article']['headline'], 'Function-based homogeneous synergy')
 
+    def test_create_article_mutation_sets_publications(self):
+        publication_ids = [to_global_id('PublicationNode', publication.id) for publication in self.article2.publications.all()[:2]]
+
+        response = self.query(
+            CREATE_ARTICLE_MUTATION,
+            op_name='createArticle',
+            variables={'input': {'headline': mixer.faker.catch_phrase(), 'publicationIds': publication_ids}},
+            headers={'HTTP_AUTHORIZATION': f'JWT {self.access_token}'},
+        )
+
+        self.assertResponseNoErrors(response)
+        content = json.loads(response.content)
+
+        article = Article.objects.get(id=from_global_id(content['data']['createArticle']['article']['id'])[1])
+        self.assertEqual(sorted(to_global_id('PublicationNode', publication.id) for publication in article.publications.all()), sorted(publication_ids))
+
+    def test_update_article_mutation_replaces_publications_in_bulk(self):
+        publications = list(self.article2.publications.all())
+        new_publication = mixer.blend(Publication)
+        publication_ids = [to_global_id('PublicationNode', publication.id) for publication in publications[:2] + [new_publication]]
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.query(
+                UPDATE_ARTICLE_PUBLICATIONS_MUTATION,
+                op_name='updateArticle',
+                variables={'input': {'id': to_global_id('ArticleNode', self.article2.id), 'publicationIds': publication_ids}},
+            )
+
+        self.assertResponseNoErrors(response)
+        content = json.loads(response.content)
+
+        self.assertEqual(sorted(edge['node']['id'] for edge in content['data']['updateArticle']['article']['publications']['edges']), sorted(publication_ids))
+
+        # The links are written with 1 INSERT of the new link and 1 DELETE of the 3 stale links
+        through_table = Article.publications.through._meta.db_table
+        writes = [query['sql'].split()[0] for query in context.captured_queries if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE')) and f'"{through_table}"' in query['sql']]
+        self.assertEqual(writes, ['INSERT', 'DELETE'])
+
+    def test_update_article_mutation_rejects_unknown_publications(self):
+        response = self.query(
+            UPDATE_ARTICLE_PUBLICATIONS_MUTATION,
+            op_name='updateArticle',
+            variables={'input': {'id': to_global_id('ArticleNode', self.article2.id), 'publicationIds': [to_global_id('PublicationNode', 0)]}},
+        )
+
+        self.assertResponseHasErrors(response)
+        self.assertEqual(self.article2.publications.count(), 5)
+
     def test_delete_article_mutation(self):
         another_article_id = to_global_id('ArticleNode', self.article2.id)
         number_of_articles = Article.objects.count()
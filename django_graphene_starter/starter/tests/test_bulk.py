@@ -0,0 +1,241 @@
+import json
+from unittest.mock import patch
+
+from django.db import DatabaseError, connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django_graphene_starter.schema import schema
+from graphene_django.utils.testing import GraphQLTestCase
+from graphql_relay import to_global_id
+from mixer.backend.django import mixer
+
+from ..bulk import set_related_pks as original_set_related_pks
+from ..counts import count_queryset
+from ..models import Article, Publication, Reporter
+
+TOKEN_AUTH_MUTATION = '''
+mutation tokenAuth($username: String!, $password: String!) {
+  tokenAuth(username: $username, password: $password) {
+    token
+  }
+}
+'''
+
+CREATE_REPORTERS_MUTATION = '''
+mutation createReporters($input: CreateReportersInput!) {
+  createReporters(input: $input) {
+    reporters {
+      username
+    }
+    errors {
+      index
+      field
+      messages
+    }
+  }
+}
+'''
+
+CREATE_PUBLICATIONS_MUTATION = '''
+mutation createPublications($input: CreatePublicationsInput!) {
+  createPublications(input: $input) {
+    publications {
+      id
+      title
+    }
+    errors {
+      index
+      field
+      messages
+    }
+  }
+}
+'''
+
+DELETE_PUBLICATIONS_MUTATION = '''
+mutation deletePublications($input: DeletePublicationsInput!) {
+  deletePublications(input: $input) {
+    deletedIds
+    errors {
+      index
+      field
+    }
+  }
+}
+'''
+
+CREATE_ARTICLES_MUTATION = '''
+mutation createArticles($input: CreateArticlesInput!) {
+  createArticles(input: $input) {
+    articles {
+      headline
+      reporter {
+        username
+      }
+    }
+    errors {
+      index
+    }
+  }
+}
+'''
+
+UPDATE_ARTICLES_MUTATION = '''
+mutation updateArticles($input: UpdateArticlesInput!) {
+  updateArticles(input: $input) {
+    articles {
+      id
+      headline
+    }
+    errors {
+      index
+      field
+      messages
+    }
+  }
+}
+'''
+
+
+@override_settings(RATELIMIT_ENABLE=False)
+class BulkMutationTestCase(GraphQLTestCase):
+    GRAPHQL_SCHEMA = schema
+    GRAPHQL_URL = '/graphql'
+
+    def setUp(self):
+        self.reporter = Reporter.objects.create(username='testusername', email='test_reporter@test.com')
+        self.reporter.set_password('testpassword')
+        self.reporter.save()
+
+        self.articles = mixer.cycle(5).blend(Article, reporter=self.reporter)
+        self.publications = mixer.cycle(3).blend(Publication)
+
+    def test_create_reporters_mutation_reports_taken_usernames(self):
+        item = {'firstName': 'Bulk', 'lastName': 'Reporter', 'email': 'bulk@example.com', 'password': 'AUg5hAXtQ5ADqZsp'}
+
+        response = self.query(
+            CREATE_REPORTERS_MUTATION,
+            op_name='createReporters',
+            variables={'input': {'reporters': [{**item, 'username': 'bulk'}, {**item, 'username': 'bulk'}, {**item, 'username': self.reporter.username}]}},
+        )
+
+        self.assertResponseNoErrors(response)
+        content = json.loads(response.content)['data']['createReporters']
+
+        self.assertEqual(content['reporters'], [{'username': 'bulk'}, None, None])
+        self.assertEqual([(error['index'], error['field'], error['messages']) for error in content['errors']], [(1, 'username', ['A user with that username already exists.']), (2, 'username', ['A user with that username already exists.'])])
+        self.assertTrue(Reporter.objects.get(username='bulk').has_perm('starter.change_reporter'))
+
+    @override_settings(BULK_MUTATION_BATCH_SIZE=2)
+    def test_create_reporters_mutation_rolls_back_batches_failing_to_grant_the_permission(self):
+        items = [{'firstName': 'Bulk', 'lastName': 'Reporter', 'email': 'bulk@example.com', 'username': f'bulk{index}', 'password': 'AUg5hAXtQ5ADqZsp'} for index in range(3)]
+
+        with patch('starter.bulk.set_related_pks', side_effect=[None, DatabaseError('Permission denied')]):
+            response = self.query(CREATE_REPORTERS_MUTATION, op_name='createReporters', variables={'input': {'reporters': items}})
+
+        self.assertResponseNoErrors(response)
+        content = json.loads(response.content)['data']['createReporters']
+
+        self.assertEqual(content['reporters'], [{'username': 'bulk0'}, {'username': 'bulk1'}, None])
+        self.assertEqual([(error['index'], error['messages']) for error in content['errors']], [(2, ['Could not be saved.'])])
+        self.assertFalse(Reporter.objects.filter(username='bulk2').exists())
+
+    @override_settings(BULK_MUTATION_BATCH_SIZE=3)
+    def test_create_reporters_mutation_retries_failing_batches_item_by_item(self):
+        items = [{'firstName': 'Bulk', 'lastName': 'Reporter', 'email': 'bulk@example.com', 'username': f'bulk{index}', 'password': 'AUg5hAXtQ5ADqZsp'} for index in range(3)]
+
+        def set_related_pks(descriptor, related_pks):
+            if Reporter.objects.filter(pk__in=related_pks, username='bulk1').exists():
+                raise DatabaseError('permission denied for table auth_user_user_permissions')
+
+            return original_set_related_pks(descriptor, related_pks)
+
+        with patch('starter.bulk.set_related_pks', side_effect=set_related_pks), self.assertLogs('starter.bulk', 'ERROR'):
+            response = self.query(CREATE_REPORTERS_MUTATION, op_name='createReporters', variables={'input': {'reporters': items}})
+
+        self.assertResponseNoErrors(response)
+        content = json.loads(response.content)['data']['createReporters']
+
+        self.assertEqual(content['reporters'], [{'username': 'bulk0'}, None, {'username': 'bulk2'}])
+        self.assertEqual([(error['index'], error['messages']) for error in content['errors']], [(1, ['Could not be saved.'])])
+        self.assertEqual(sorted(Reporter.objects.filter(username__startswith='bulk').values_list('username', flat=True)), ['bulk0', 'bulk2'])
+        self.assertTrue(all(reporter.has_perm('starter.change_reporter') for reporter in Reporter.objects.filter(username__startswith='bulk')))
+
+    def test_create_publications_mutation_reports_invalid_items(self):
+        response = self.query(
+            CREATE_PUBLICATIONS_MUTATION,
+            op_name='createPublications',
+            variables={'input': {'publications': [{'title': 'First'}, {'title': 'x' * 257}, {'title': 'Third'}]}},
+        )
+
+        self.assertResponseNoErrors(response)
+        content = json.loads(response.content)['data']['createPublications']
+
+        self.assertEqual([publication and publication['title'] for publication in content['publications']], ['First', None, 'Third'])
+        self.assertEqual([(error['index'], error['field']) for error in content['errors']], [(1, 'title')])
+        self.assertEqual(Publication.objects.filter(title__in=['First', 'Third']).count(), 2)
+
+    def test_create_articles_mutation_requires_login(self):
+        response = self.query(CREATE_ARTICLES_MUTATION, op_name='createArticles', variables={'input': {'articles': [{'headline': 'Bulk'}]}})
+        self.assertResponseHasErrors(response)
+
+        token = json.loads(self.query(TOKEN_AUTH_MUTATION, op_name='tokenAuth', variables={'username': 'testusername', 'password': 'testpassword'}).content)['data']['tokenAuth']['token']
+
+        response = self.query(
+            CREATE_ARTICLES_MUTATION,
+            op_name='createArticles',
+            variables={'input': {'articles': [{'headline': 'Bulk'}]}},
+            headers={'HTTP_AUTHORIZATION': f'JWT {token}'},
+        )
+
+        self.assertResponseNoErrors(response)
+        self.assertEqual(json.loads(response.content)['data']['createArticles']['articles'], [{'headline': 'Bulk', 'reporter': {'username': 'testusername'}}])
+
+    @override_settings(BULK_MUTATION_BATCH_SIZE=2)
+    def test_update_articles_mutation_updates_in_batches(self):
+        items = [{'id': to_global_id('ArticleNode', article.id), 'headline': f'Updated {index}'} for index, article in enumerate(self.articles)]
+        items.append({'id': to_global_id('PublicationNode', self.publications[0].id), 'headline': 'Wrong type'})
+        items.append({'id': to_global_id('ArticleNode', 0), 'headline': 'Not found'})
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.query(UPDATE_ARTICLES_MUTATION, op_name='updateArticles', variables={'input': {'articles': items}})
+
+        self.assertResponseNoErrors(response)
+        content = json.loads(response.content)['data']['updateArticles']
+
+        self.assertEqual([article and article['headline'] for article in content['articles']], [f'Updated {index}' for index in range(5)] + [None, None])
+        self.assertEqual([(error['index'], error['messages']) for error in content['errors']], [(5, ['Invalid ArticleNode ID.']), (6, ['Article not found.'])])
+
+        # 1 query loading every article, then 1 UPDATE per batch of 2 articles
+        self.assertEqual(len([query for query in context.captured_queries if query['sql'].startswith(('SELECT', 'UPDATE')) and '"starter_article"' in query['sql']]), 4)
+
+    def test_update_articles_mutation_sets_publications(self):
+        publication_id = to_global_id('PublicationNode', self.publications[0].id)
+        items = [
+            {'id': to_global_id('ArticleNode', self.articles[0].id), 'publicationIds': [publication_id]},
+            {'id': to_global_id('ArticleNode', self.articles[1].id), 'publicationIds': [publication_id, to_global_id('PublicationNode', 0)]},
+            {'id': to_global_id('ArticleNode', self.articles[2].id), 'headline': 'Unchanged publications'},
+        ]
+
+        response = self.query(UPDATE_ARTICLES_MUTATION, op_name='updateArticles', variables={'input': {'articles': items}})
+
+        self.assertResponseNoErrors(response)
+        content = json.loads(response.content)['data']['updateArticles']
+
+        self.assertEqual([(error['index'], error['field']) for error in content['errors']], [(1, 'publication_ids')])
+        self.assertEqual(list(self.articles[0].publications.all()), [self.publications[0]])
+        self.assertEqual(self.articles[1].publications.count(), 0)
+        self.assertEqual(Article.objects.get(id=self.articles[2].id).headline, 'Unchanged publications')
+
+    def test_delete_publications_mutation_invalidates_counts(self):
+        self.assertEqual(count_queryset(Publication.objects.all()), 3)
+        ids = [to_global_id('PublicationNode', publication.id) for publication in self.publications[:2]]
+
+        response = self.query(DELETE_PUBLICATIONS_MUTATION, op_name='deletePublications', variables={'input': {'ids': ids + ['invalid']}})
+
+        self.assertResponseNoErrors(response)
+        content = json.loads(response.content)['data']['deletePublications']
+
+        self.assertEqual(content['deletedIds'], ids)
+        self.assertEqual(content['errors'], [{'index': 2, 'field': 'id'}])
+        self.assertEqual(count_queryset(Publication.objects.all()), 1)
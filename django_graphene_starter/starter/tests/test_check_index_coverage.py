@@ -0,0 +1,33 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+
+class CheckIndexCoverageTests(TestCase):
+    def check_index_coverage(self, *args: str) -> str:
+        stdout = StringIO()
+        call_command('check_index_coverage', *args, stdout=stdout, no_color=True)
+        return stdout.getvalue()
+
+    def test_default_orderings_are_covered(self) -> None:
+        lines = self.check_index_coverage('--all').splitlines()
+
+        # NOTE: The indexes of `auth_user` are created by `RunSQL`, which the test database skips with `--nomigrations`
+        for node, path, index in [
+            ('ArticleNode', '(default)', 'article_headline_id_idx'),
+            ('ArticleNode', '-pub_date', 'article_pub_date_desc_id_idx'),
+            ('PublicationNode', '(default)', 'publication_title_id_idx'),
+            ('ReporterNode', 'articles', 'article_reporter_headline_idx'),
+        ]:
+            with self.subTest(node=node, path=path):
+                self.assertTrue(any(line.split()[0] == node and line.split()[2] == path and line.endswith(f'covered by {index}') for line in lines))
+
+    def test_uncovered_paths_are_reported(self) -> None:
+        output = self.check_index_coverage()
+
+        self.assertIn('-headline', output)
+        self.assertNotIn('covered by', output)
+
+        with self.assertRaises(CommandError):
+            self.check_index_coverage('--fail')
@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django_graphene_starter.middlewares import LoaderMiddleware
+from django_graphene_starter.schema import schema
+from mixer.backend.django import mixer
+
+from ..counts import count_queryset
+from ..models import Article, Publication, Reporter
+
+ARTICLES_QUERY = '''
+query articles {
+  articles(first: 20) {
+    totalCount
+    edges {
+      node {
+        headline
+      }
+    }
+  }
+}
+'''
+
+
+@patch('starter.counts.is_cache_shared', return_value=True)
+class CountsTests(TestCase):
+    def setUp(self) -> None:
+        self.reporter = mixer.blend(Reporter)
+        mixer.cycle(5).blend(Article, reporter=self.reporter)
+        mixer.cycle(3).blend(Publication)
+
+    def test_count_queryset_is_cached(self, is_cache_shared_mock) -> None:
+        self.assertEqual(count_queryset(Article.objects.all()), 5)
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(count_queryset(Article.objects.all()), 5)
+
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_count_queryset_is_cached_per_filter_signature(self, is_cache_shared_mock) -> None:
+        other_reporter = mixer.blend(Reporter)
+        mixer.blend(Article, reporter=other_reporter)
+
+        self.assertEqual(count_queryset(Article.objects.filter(reporter=self.reporter)), 5)
+        self.assertEqual(count_queryset(Article.objects.filter(reporter=other_reporter)), 1)
+
+    def test_count_queryset_is_invalidated_on_writes(self, is_cache_shared_mock) -> None:
+        self.assertEqual(count_queryset(Publication.objects.all()), 3)
+
+        publication = mixer.blend(Publication)
+        self.assertEqual(count_queryset(Publication.objects.all()), 4)
+
+        publication.delete()
+        self.assertEqual(count_queryset(Publication.objects.all()), 3)
+
+        article = Article.objects.first()
+        self.assertEqual(count_queryset(Publication.objects.filter(articles=article)), 0)
+
+        article.publications.add(*Publication.objects.all())
+        self.assertEqual(count_queryset(Publication.objects.filter(articles=article)), 3)
+
+    @override_settings(TOTAL_COUNT_ESTIMATE_THRESHOLD=1000)
+    def test_count_queryset_uses_estimate_above_threshold(self, is_cache_shared_mock) -> None:
+        with patch('starter.counts.estimate_count', return_value=5000):
+            self.assertEqual(count_queryset(Article.objects.all(), estimate=True), 5000)
+            self.assertEqual(count_queryset(Article.objects.all()), 5)
+            self.assertEqual(count_queryset(Article.objects.filter(reporter=self.reporter), estimate=True), 5)
+
+        with patch('starter.counts.estimate_count', return_value=500):
+            self.assertEqual(count_queryset(Article.objects.all(), estimate=True), 5)
+
+    def test_count_queryset_is_not_cached_without_a_shared_cache(self, is_cache_shared_mock) -> None:
+        is_cache_shared_mock.return_value = False
+        self.assertEqual(count_queryset(Article.objects.all()), 5)
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(count_queryset(Article.objects.all()), 5)
+
+        self.assertEqual(len([query for query in context.captured_queries if query['sql'].startswith('SELECT COUNT(*)')]), 1)
+
+    def test_pages_are_not_bounded_by_a_cached_count(self, is_cache_shared_mock) -> None:
+        self.assertEqual(count_queryset(Article.objects.all()), 5)
+
+        # `bulk_create` sends no `post_save`, as if another process wrote them before its version bump reached this one
+        Article.objects.bulk_create([Article(headline=f'Bulk {index}', reporter=self.reporter) for index in range(3)])
+
+        result = schema.execute(ARTICLES_QUERY, context_value=SimpleNamespace(), middleware=[LoaderMiddleware()])
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data['articles']['totalCount'], 8)
+        self.assertEqual(len(result.data['articles']['edges']), 8)
@@ -0,0 +1,36 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from mixer.backend.django import mixer
+
+from ..models import Article, Publication, Reporter
+
+
+class GenerateFixturesTests(TestCase):
+    def generate(self, *args: str) -> str:
+        stdout = StringIO()
+        call_command('generate_fixtures', '--bulk', '--chunk-size', '7', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_bulk_fixtures_share_a_publication_pool(self) -> None:
+        mixer.blend(Article)  # Generated primary keys must not collide with existing rows
+
+        output = self.generate('-r', '3', '-a', '4', '-p', '2', '--publication-pool', '5')
+
+        self.assertIn('3 Reporters | 12 Articles | 5 Publications | 24 Article Publications', output)
+        self.assertEqual((Reporter.objects.count(), Article.objects.count(), Publication.objects.count()), (4, 13, 5))
+        self.assertTrue(all(article.publications.count() == 2 for article in Article.objects.exclude(publications=None)))
+
+        new_article = Article.objects.create(headline='After', reporter=Reporter.objects.first())
+        self.assertEqual(new_article.id, Article.objects.count())
+
+    def test_bulk_fixtures_are_reproducible_with_a_seed(self) -> None:
+        self.generate('-r', '2', '-a', '3', '--seed', '42', '--fan-out', 'zipf')
+        first = list(Article.objects.order_by('id').values_list('headline', 'publications__title'))
+
+        Article.objects.all().delete()
+        Publication.objects.all().delete()
+        self.generate('-r', '2', '-a', '3', '--seed', '42', '--fan-out', 'zipf')
+
+        self.assertEqual(list(Article.objects.order_by('id').values_list('headline', 'publications__title')), first)
@@ -0,0 +1,79 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django_graphene_starter.middlewares import Loaders
+from mixer.backend.django import mixer
+from promise import Promise
+from promise.dataloader import DataLoader
+
+from .. import loaders
+from ..models import Article, Publication, Reporter
+
+
+class LoadersTests(TestCase):
+    def setUp(self) -> None:
+        self.reporter = mixer.blend(Reporter)
+        self.articles = mixer.cycle(2).blend(Article, reporter=self.reporter)
+        self.publication = mixer.blend(Publication)
+        self.publication.articles.add(self.articles[0])
+
+    def test_loader_classes_are_generated_once(self) -> None:
+        Loader = loaders.get_loader_class(Reporter, 'articles')
+
+        self.assertIs(loaders.get_loader_class(Reporter, 'articles'), Loader)
+        self.assertIs(Loaders().get(Reporter, 'articles').__class__, Loader)
+        self.assertIs(loaders.get_count_loader_class(Article, 'publications'), loaders.get_count_loader_class(Article, 'publications'))
+
+    def test_loaders_are_instantiated_on_first_use(self) -> None:
+        request_loaders = Loaders()
+        self.assertEqual(request_loaders.instances, {})
+
+        loader = request_loaders.get(Publication, 'articles')
+        self.assertIs(request_loaders.get(Publication, 'articles'), loader)
+        self.assertEqual(list(request_loaders.instances), [(Publication, 'articles')])
+
+    def test_relations_are_loaded_without_registration(self) -> None:
+        request_loaders = Loaders()
+
+        articles = request_loaders.get(Reporter, 'articles').load(self.reporter.id).get()
+        publication_articles = request_loaders.get(Publication, 'articles').load(self.publication.id).get()
+
+        self.assertEqual(set(articles), set(self.articles))
+        self.assertEqual(publication_articles, [self.articles[0]])
+
+    def test_foreign_keys_are_loaded_in_a_single_query(self) -> None:
+        Loader = loaders.generate_loader_by_related_object(Article, 'reporter')
+
+        with CaptureQueriesContext(connection) as context:
+            # Within a promise tick, so that the keys are batched
+            reporters = Promise.resolve(None).then(lambda _: Loader().load_many([article.id for article in self.articles] + [0])).get()
+
+        self.assertEqual(reporters, [self.reporter, self.reporter, None])
+        self.assertEqual(len(context.captured_queries), 1)
+
+    def test_loaders_can_be_registered(self) -> None:
+        class HeadlineLoader(DataLoader):
+            def batch_load_fn(self, keys):
+                return Promise.resolve([f'headline {key}' for key in keys])
+
+        with patch.dict(loaders.LOADERS):
+            loaders.register_loader(Article, 'headline', HeadlineLoader)
+            self.assertEqual(Loaders().get(Article, 'headline').load(1).get(), 'headline 1')
+
+        with self.assertRaisesRegex(ValueError, 'register one with `register_loader`'):
+            loaders.get_loader_class(Article, 'headline')
+
+    def test_count_loaders_are_registered(self) -> None:
+        class CountLoader(DataLoader):
+            def batch_load_fn(self, keys):
+                return Promise.resolve([42 for key in keys])
+
+        with patch.dict(loaders.LOADERS):
+            Loader = loaders.get_count_loader_class(Publication, 'articles')
+            self.assertIs(loaders.LOADERS[(Publication, 'articles__count')], Loader)
+            self.assertEqual(Promise.resolve(None).then(lambda _: Loader().load(self.articles[0].id)).get(), 1)
+
+            loaders.register_loader(Publication, 'articles__count', CountLoader)
+            self.assertEqual(Loaders().get_count_loader(Publication, 'articles').load(self.articles[0].id).get(), 42)
@@ -0,0 +1,125 @@
+import json
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from graphql_relay import to_global_id
+from mixer.backend.django import mixer
+
+from ..cache import NodeCache, bump_model_version, node_cache
+from ..models import Article, Publication, Reporter
+from ..types import ArticleNode, PublicationNode, ReporterNode
+
+REPORTER_QUERY = '''
+query reporter($id: ID!) {
+  reporter(id: $id) {
+    email
+    firstName
+  }
+}
+'''
+
+
+# The LocMemCache of the tests serves a single process, just like a cache shared between workers
+@patch('starter.cache.is_cache_shared', return_value=True)
+class NodeCacheTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        node_cache.clear()
+
+        self.reporter = mixer.blend(Reporter)
+        self.publication = mixer.blend(Publication)
+        self.article = mixer.blend(Article, reporter=self.reporter)
+
+    def test_nodes_are_loaded_once(self, is_cache_shared_mock) -> None:
+        for node_type, instance in ((ReporterNode, self.reporter), (PublicationNode, self.publication), (ArticleNode, self.article)):
+            with self.subTest(node_type=node_type):
+                node_type.get_node(None, str(instance.pk))
+
+                with CaptureQueriesContext(connection) as context:
+                    node = node_type.get_node(None, str(instance.pk))
+
+                self.assertEqual(len(context.captured_queries), 0)
+                self.assertEqual(node, instance)
+
+    def test_nodes_are_served_from_the_shared_tier(self, is_cache_shared_mock) -> None:
+        ArticleNode.get_node(None, str(self.article.pk))
+        node_cache.clear()
+
+        with CaptureQueriesContext(connection) as context:
+            article = ArticleNode.get_node(None, str(self.article.pk))
+
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertEqual((article.headline, article.reporter_id), (self.article.headline, self.reporter.pk))
+
+    def test_writes_of_other_processes_invalidate_the_local_tier(self, is_cache_shared_mock) -> None:
+        PublicationNode.get_node(None, str(self.publication.pk))
+        Publication.objects.filter(pk=self.publication.pk).update(title='Updated')
+
+        # What the signals of another process would do: its own local tier is cleared, this one is left as is
+        cache.delete(f'node:starter.publication:{self.publication.pk}')
+        bump_model_version(Publication)
+
+        self.assertEqual(PublicationNode.get_node(None, str(self.publication.pk)).title, 'Updated')
+
+    def test_nothing_is_cached_without_a_shared_cache(self, is_cache_shared_mock) -> None:
+        is_cache_shared_mock.return_value = False
+        ArticleNode.get_node(None, str(self.article.pk))
+
+        with CaptureQueriesContext(connection) as context:
+            ArticleNode.get_node(None, str(self.article.pk))
+
+        self.assertEqual(len([query for query in context.captured_queries if query['sql'].startswith('SELECT')]), 1)
+        self.assertEqual(node_cache.entries, {})
+
+    def test_only_fields_of_the_node_type_are_cached(self, is_cache_shared_mock) -> None:
+        reporter = ReporterNode.get_node(None, str(self.reporter.pk))
+
+        self.assertIn('password', reporter.get_deferred_fields())
+        self.assertNotIn(self.reporter.password, str(cache.get(f'node:auth.user:{self.reporter.pk}')))
+
+    def test_writes_invalidate_nodes(self, is_cache_shared_mock) -> None:
+        id = str(self.publication.pk)
+        PublicationNode.get_node(None, id)
+
+        self.publication.title = 'Updated'
+        self.publication.save()
+        self.assertEqual(PublicationNode.get_node(None, id).title, 'Updated')
+
+        self.publication.delete()
+        self.assertIsNone(PublicationNode.get_node(None, id))
+
+    def test_mutations_write_nodes_through(self, is_cache_shared_mock) -> None:
+        self.publication.title = 'Updated'
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.publication.save()
+            PublicationNode.cache_node(self.publication)
+
+        with CaptureQueriesContext(connection) as context:
+            publication = PublicationNode.get_node(None, str(self.publication.pk))
+
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertEqual(publication.title, 'Updated')
+
+    def test_least_recently_used_nodes_are_evicted_from_the_local_tier(self, is_cache_shared_mock) -> None:
+        local_cache = NodeCache(maxsize=1)
+        fields = PublicationNode.get_cached_fields()
+
+        local_cache.set(self.publication, fields)
+        local_cache.set(mixer.blend(Publication), fields)
+
+        self.assertEqual(len(local_cache.entries), 1)
+
+    @override_settings(RATELIMIT_ENABLE=False, GRAPHQL_RESPONSE_CACHE_TIMEOUT=0)
+    def test_node_field_is_cached(self, is_cache_shared_mock) -> None:
+        body = json.dumps({'query': REPORTER_QUERY, 'variables': {'id': to_global_id('ReporterNode', self.reporter.pk)}})
+        self.client.post('/graphql', body, content_type='application/json')
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/graphql', body, content_type='application/json')
+
+        self.assertEqual(context.captured_queries, [])
+        self.assertEqual(json.loads(response.content)['data']['reporter']['email'], self.reporter.email)
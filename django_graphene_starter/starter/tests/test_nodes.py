@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django_graphene_starter.middlewares import LoaderMiddleware
+from django_graphene_starter.schema import schema
+from graphene import ObjectType, Schema
+from graphql_relay import to_global_id
+from mixer.backend.django import mixer
+
+from ..models import Article, Reporter
+from ..types import ArticleNode, NodesField, PublicationNode, ReporterNode
+
+NODES_QUERY = '''
+query nodes($ids: [ID!]!) {
+  nodes(ids: $ids) {
+    ... on ArticleNode {
+      headline
+      reporter {
+        email
+      }
+    }
+    ... on ReporterNode {
+      email
+    }
+  }
+}
+'''
+
+
+class NodesFieldTests(TestCase):
+    def setUp(self) -> None:
+        self.reporter1 = mixer.blend(Reporter)
+        self.reporter2 = mixer.blend(Reporter)
+        self.article1 = mixer.blend(Article, reporter=self.reporter1)
+        self.article2 = mixer.blend(Article, reporter=self.reporter2)
+
+    def execute(self, ids, schema=schema):
+        return schema.execute(NODES_QUERY, variables={'ids': ids}, context_value=SimpleNamespace(), middleware=[LoaderMiddleware()])
+
+    def test_nodes_are_looked_up_in_order(self) -> None:
+        ids = [to_global_id('ArticleNode', self.article2.id), to_global_id('ReporterNode', self.reporter2.id), to_global_id('ArticleNode', self.article1.id)]
+
+        with CaptureQueriesContext(connection) as context:
+            result = self.execute(ids)
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(
+            result.data['nodes'],
+            [
+                {'headline': self.article2.headline, 'reporter': {'email': self.reporter2.email}},
+                {'email': self.reporter2.email},
+                {'headline': self.article1.headline, 'reporter': {'email': self.reporter1.email}},
+            ],
+        )
+
+        # 1 SELECT joined with the Reporter table for the Articles and 1 SELECT for the Reporters
+        self.assertEqual(len(context.captured_queries), 2)
+
+    def test_missing_nodes_are_null(self) -> None:
+        ids = [to_global_id('ArticleNode', 0), to_global_id('UnknownNode', self.article1.id), to_global_id('ArticleNode', 'not a pk'), 'not a global id', to_global_id('ArticleNode', self.article1.id)]
+
+        result = self.execute(ids)
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data['nodes'], [None, None, None, None, {'headline': self.article1.headline, 'reporter': {'email': self.reporter1.email}}])
+
+    def test_nodes_of_other_types_are_null(self) -> None:
+        class Query(ObjectType):
+            nodes = NodesField(ArticleNode)
+
+        result = self.execute([to_global_id('ReporterNode', self.reporter1.id), to_global_id('ArticleNode', self.article1.id)], schema=Schema(query=Query, types=[ArticleNode, PublicationNode, ReporterNode]))
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data['nodes'], [None, {'headline': self.article1.headline, 'reporter': {'email': self.reporter1.email}}])
+
+    def test_nodes_are_filtered_by_the_queryset_of_their_type(self) -> None:
+        def get_queryset(queryset, info):
+            return queryset.exclude(pk=self.article1.pk)
+
+        with patch.object(ArticleNode, 'get_queryset', side_effect=get_queryset):
+            result = self.execute([to_global_id('ArticleNode', self.article1.id), to_global_id('ArticleNode', self.article2.id)])
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data['nodes'], [None, {'headline': self.article2.headline, 'reporter': {'email': self.reporter2.email}}])
@@ -1,12 +1,16 @@
 import json
+from types import SimpleNamespace
 
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django_graphene_starter.middlewares import LoaderMiddleware
 from django_graphene_starter.schema import schema
 from graphene_django.utils.testing import GraphQLTestCase
 from graphql_relay import to_global_id
 from mixer.backend.django import mixer
 
-from ..models import Publication
+from ..models import Article, Publication
 
 PUBLICATIONS_QUERY = '''
 query publications {
@@ -21,6 +25,46 @@ query publications {
 }
 '''
 
+ARTICLES_BY_PUBLICATIONS_QUERY = '''
+query publications {
+  publications(first: 100) {
+    edges {
+      node {
+        id
+        articles(first: 10) {
+          totalCount
+          edges {
+            node {
+              id
+            }
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
+ARTICLES_BY_PUBLICATIONS_QUERY_WITH_DATALOADER = '''
+query publications {
+  publications(first: 100) {
+    edges {
+      node {
+        id
+        dataloaderArticles(first: 10) {
+          totalCount
+          edges {
+            node {
+              id
+            }
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
 
 CREATE_PUBLICATION_MUTATION = '''
 mutation createPublication($input: CreatePublicationInput!) {
@@ -69,6 +113,9 @@ class PublicationTestCase(GraphQLTestCase):
         self.publication2 = mixer.blend(Publication)
         mixer.cycle(10).blend(Publication)
 
+        mixer.cycle(5).blend(Article, publications=[self.publication1, self.publication2])
+        mixer.cycle(3).blend(Article, publications=[self.publication2])
+
     def test_publications_query(self):
         response = self.query(
             PUBLICATIONS_QUERY,
@@ -80,6 +127,45 @@ class PublicationTestCase(GraphQLTestCase):
         self.assertEqual(len(content['data']['publications']['edges']), 12)
         self.assertEqual(content['data']['publications']['totalCount'], 12)
 
+    def test_articles_by_publications_dataloader_query(self):
+        response = self.query(
+            ARTICLES_BY_PUBLICATIONS_QUERY,
+            op_name='publications',
+        )
+
+        dataloader_response = self.query(
+            ARTICLES_BY_PUBLICATIONS_QUERY_WITH_DATALOADER,
+            op_name='publications',
+        )
+        self.assertResponseNoErrors(response)
+        self.assertResponseNoErrors(dataloader_response)
+
+        content = json.loads(response.content)
+        dataloader_content = json.loads(dataloader_response.content)
+
+        result = [edge['node']['articles'] for edge in content['data']['publications']['edges']]
+        dataloader_result = [edge['node']['dataloaderArticles'] for edge in dataloader_content['data']['publications']['edges']]
+
+        self.assertEqual(result, dataloader_result)
+
+    def test_articles_by_publications_dataloader_query_batches_through_table(self):
+        with CaptureQueriesContext(connection) as context:
+            result = schema.execute(
+                ARTICLES_BY_PUBLICATIONS_QUERY_WITH_DATALOADER,
+                context_value=SimpleNamespace(),
+                middleware=[LoaderMiddleware()],
+            )
+
+        self.assertIsNone(result.errors)
+
+        # 1 COUNT and 1 SELECT for the Publication connection, then a single batched query for every `dataloaderArticles`
+        self.assertEqual(len(context.captured_queries), 3)
+
+        counts = {edge['node']['id']: edge['node']['dataloaderArticles']['totalCount'] for edge in result.data['publications']['edges']}
+
+        self.assertEqual(counts[to_global_id('PublicationNode', self.publication1.id)], 5)
+        self.assertEqual(counts[to_global_id('PublicationNode', self.publication2.id)], 8)
+
     def test_create_publication_mutation(self):
 
         title = mixer.faker.catch_phrase()
@@ -1,10 +1,15 @@
 import json
+from types import SimpleNamespace
 
 from django.contrib.auth.models import Permission
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django_graphene_starter.middlewares import LoaderMiddleware
 from django_graphene_starter.schema import schema
 from graphene_django.utils.testing import GraphQLTestCase
-from graphql_relay import to_global_id
+from graphql_relay import from_global_id, to_global_id
+from graphql_relay.connection.arrayconnection import offset_to_cursor
 from mixer.backend.django import mixer
 
 from ..models import Article, Reporter
@@ -26,7 +31,7 @@ query reporters {
     edges {
       node {
         id
-        articles {
+        articles(first: 10) {
           totalCount
           edges {
             node {
@@ -40,6 +45,29 @@ query reporters {
 }
 '''
 
+PAGINATED_ARTICLES_BY_REPORTERS_QUERY = '''
+query reporters($first: Int, $after: String) {
+  reporters(first: 1000) {
+    edges {
+      node {
+        id
+        articles(first: $first, after: $after) {
+          totalCount
+          pageInfo {
+            hasNextPage
+          }
+          edges {
+            node {
+              headline
+            }
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
 ARTICLES_BY_REPORTERS_QUERY_WITH_DATALOADER = '''
 query reporters {
   reporters(first: 1000) {
@@ -47,7 +75,7 @@ query reporters {
     edges {
       node {
         id
-        dataloaderArticles {
+        dataloaderArticles(first: 10) {
           totalCount
           edges {
             node {
@@ -196,6 +224,32 @@ class ReporterTestCase(GraphQLTestCase):
 
         self.assertEqual(result, dataloader_result)
 
+    def test_articles_by_reporters_query_is_optimized(self):
+        with CaptureQueriesContext(connection) as context:
+            result = schema.execute(ARTICLES_BY_REPORTERS_QUERY, context_value=SimpleNamespace(), middleware=[LoaderMiddleware()])
+
+        self.assertIsNone(result.errors)
+
+        # 1 COUNT and 1 SELECT for the Reporter connection and 1 prefetch for every `articles`
+        self.assertEqual(len(context.captured_queries), 3)
+
+    def test_paginated_articles_by_reporters_only_prefetch_their_page(self):
+        with CaptureQueriesContext(connection) as context:
+            result = schema.execute(PAGINATED_ARTICLES_BY_REPORTERS_QUERY, variables={'first': 2, 'after': offset_to_cursor(0)}, context_value=SimpleNamespace(), middleware=[LoaderMiddleware()])
+
+        self.assertIsNone(result.errors)
+
+        # 1 COUNT and 1 SELECT for the Reporter connection, 1 prefetch of up to 4 articles of every reporter and 1 GROUP BY for every `articles.totalCount`
+        self.assertEqual(len(context.captured_queries), 4)
+        self.assertIn('LIMIT 4', context.captured_queries[2]['sql'])
+
+        for edge in result.data['reporters']['edges']:
+            articles = Reporter.objects.get(pk=from_global_id(edge['node']['id'])[1]).articles.order_by('headline', 'pk')
+
+            self.assertEqual([article['node']['headline'] for article in edge['node']['articles']['edges']], [article.headline for article in articles[1:3]])
+            self.assertEqual(edge['node']['articles']['totalCount'], articles.count())
+            self.assertEqual(edge['node']['articles']['pageInfo']['hasNextPage'], articles.count() > 3)
+
     def test_create_reporter_mutation(self):
 
         first_name = mixer.faker.first_name()
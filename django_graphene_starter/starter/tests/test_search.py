@@ -0,0 +1,114 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from mixer.backend.django import mixer
+
+from ..bulk import bulk_create
+from ..models import Article, Publication, Reporter
+
+ARTICLES_QUERY = '''
+query articles($search: String, $orderBy: String, $first: Int, $after: String) {
+  articles(search: $search, orderBy: $orderBy, first: $first, after: $after) {
+    totalCount
+    edges {
+      node {
+        headline
+      }
+    }
+  }
+}
+'''
+
+KEYSET_ARTICLES_QUERY = '''
+query keysetArticles($search: String, $first: Int, $after: String) {
+  keysetArticles(search: $search, first: $first, after: $after) {
+    pageInfo {
+      hasNextPage
+      endCursor
+    }
+    edges {
+      node {
+        headline
+      }
+    }
+  }
+}
+'''
+
+PUBLICATIONS_QUERY = '''
+query publications($search: String) {
+  publications(search: $search) {
+    edges {
+      node {
+        title
+      }
+    }
+  }
+}
+'''
+
+
+@override_settings(RATELIMIT_ENABLE=False)
+class SearchTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
+        reporter = mixer.blend(Reporter)
+        for headline in ('Searching the archive', 'A search for search engines', 'Unrelated news', 'Archived searches of the week'):
+            mixer.blend(Article, headline=headline, reporter=reporter)
+
+    def post(self, query: str, **variables) -> dict:
+        response = self.client.post('/graphql', json.dumps({'query': query, 'variables': variables}), content_type='application/json')
+        content = json.loads(response.content)
+        self.assertNotIn('errors', content)
+        return content['data']
+
+    def get_headlines(self, **variables) -> list:
+        return [edge['node']['headline'] for edge in self.post(ARTICLES_QUERY, **variables)['articles']['edges']]
+
+    def test_matches_are_ordered_by_relevance(self) -> None:
+        # Stemmed, so that "search" matches "Searching" and "searches"
+        self.assertEqual(self.get_headlines(search='search'), ['A search for search engines', 'Searching the archive', 'Archived searches of the week'])
+        self.assertEqual(self.get_headlines(search='search archive'), ['Searching the archive', 'Archived searches of the week'])
+
+    def test_order_by_overrides_relevance(self) -> None:
+        self.assertEqual(self.get_headlines(search='search', orderBy='headline'), ['A search for search engines', 'Archived searches of the week', 'Searching the archive'])
+
+    def test_user_input_is_not_parsed_as_a_query(self) -> None:
+        self.assertEqual(self.get_headlines(search='"search" OR (news'), [])
+        self.assertEqual(len(self.get_headlines(search='  ')), 4)
+
+    def test_matches_are_paginated(self) -> None:
+        content = self.post(ARTICLES_QUERY, search='search', first=2)['articles']
+        self.assertEqual(content['totalCount'], 3)
+        self.assertEqual(len(content['edges']), 2)
+
+        headlines = []
+        after = None
+        while True:
+            content = self.post(KEYSET_ARTICLES_QUERY, search='search', first=2, after=after)['keysetArticles']
+            headlines += [edge['node']['headline'] for edge in content['edges']]
+            if not content['pageInfo']['hasNextPage']:
+                break
+            after = content['pageInfo']['endCursor']
+
+        self.assertEqual(headlines, self.get_headlines(search='search'))
+
+    def test_writes_are_indexed(self) -> None:
+        article = Article.objects.get(headline='Unrelated news')
+        article.headline = 'Search news'
+        article.save()
+        self.assertIn('Search news', self.get_headlines(search='search'))
+
+        article.delete()
+        self.assertNotIn('Search news', self.get_headlines(search='search'))
+
+        Article.objects.filter(headline='Searching the archive').update(headline='Old news')
+        self.assertEqual(self.get_headlines(search='archive'), ['Archived searches of the week'])
+
+    def test_bulk_writes_are_indexed(self) -> None:
+        bulk_create(Publication, [Publication(title='Search weekly'), Publication(title='Daily news')], errors=[])
+
+        titles = [edge['node']['title'] for edge in self.post(PUBLICATIONS_QUERY, search='search')['publications']['edges']]
+        self.assertEqual(titles, ['Search weekly'])
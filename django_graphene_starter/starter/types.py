@@ -1,13 +1,24 @@
-from django.db.models.query import QuerySet
-from graphene import Field, Int
+from functools import partial
+from typing import Any, Dict
+from typing import List as ListType
+from typing import Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Manager, Model
+from graphene import ID, Field, Int, List, NonNull, ObjectType, String
 from graphene.relay import Connection, Node
 from graphene_django import DjangoConnectionField, DjangoObjectType
-from graphene_django.filter import DjangoFilterConnectionField
 from graphql.execution.base import ResolveInfo
+from graphql_relay import from_global_id
 from promise.promise import Promise
 
+from .cache import node_cache
+from .counts import count_queryset
+from .fields import OptimizedConnectionField, resolves_without_query
 from .filters import ArticleFilter, PublicationFilter, ReporterFilter
 from .models import Article, Publication, Reporter
+from .optimizer import optimize_nodes_queryset
 
 
 class CountableConnectionBase(Connection):
@@ -17,15 +28,52 @@ class CountableConnectionBase(Connection):
         abstract = True
 
     @staticmethod
+    @resolves_without_query(lambda root, *args, **kwargs: getattr(root, 'length', None) is not None or isinstance(root.iterable, list))
     def resolve_total_count(root, *args, **kwargs) -> int:
+        if getattr(root, 'length', None) is not None:
+            return root.length  # Already counted while paginating the connection
+
         if isinstance(root.iterable, list):
             return len(root.iterable)
 
-        return root.iterable.count()
+        return count_queryset(root.iterable, estimate=True)
+
+
+class CachedNode:
+    """
+    Serve `Node.Field` lookups of a DjangoObjectType from `starter.cache.node_cache` instead of a `get()` per call
+
+    Only the concrete fields exposed by the node type are loaded and cached.
+    """
+
+    @classmethod
+    def get_node(cls, info: ResolveInfo, id: str) -> Optional[Model]:
+        return node_cache.get(cls._meta.model, id, cls.get_cached_fields(), partial(cls.load_node, info, id))
+
+    @classmethod
+    def load_node(cls, info: ResolveInfo, id: str) -> Optional[Model]:
+        queryset = cls._meta.model.objects.only(*cls.get_cached_fields())
+
+        try:
+            return cls.get_queryset(queryset, info).get(pk=id)
+        except cls._meta.model.DoesNotExist:
+            return None
+
+    @classmethod
+    def cache_node(cls, instance: Model) -> None:
+        """
+        Write a saved instance through to the node cache once the transaction commits
+        """
+        transaction.on_commit(partial(node_cache.set, instance, cls.get_cached_fields()))
 
+    @classmethod
+    def get_cached_fields(cls) -> Tuple[str, ...]:
+        model = cls._meta.model
+        return tuple(field.attname for field in model._meta.concrete_fields if field.primary_key or field.name in cls._meta.fields)
 
-class ReporterNode(DjangoObjectType):
-    articles = DjangoFilterConnectionField('starter.types.ArticleNode', description='Return a connection of Article.')
+
+class ReporterNode(CachedNode, DjangoObjectType):
+    articles = OptimizedConnectionField('starter.types.ArticleNode', description='Return a connection of Article.')
     dataloader_articles = DjangoConnectionField('starter.types.ArticleNode', description='Return Article connection which contains pagination and Article information using dataloader.')
 
     class Meta:
@@ -36,15 +84,17 @@ class ReporterNode(DjangoObjectType):
         fields = ['email', 'username', 'first_name', 'last_name', 'articles']
 
     @staticmethod
-    def resolve_articles(root: Reporter, info: ResolveInfo, **kwargs) -> QuerySet:
-        return Article.objects.filter(reporter=root)
+    def resolve_articles(root: Reporter, info: ResolveInfo, **kwargs) -> Manager:
+        return root.articles
 
     @staticmethod
+    @resolves_without_query()
     def resolve_dataloader_articles(root: Reporter, info: ResolveInfo, **kwargs) -> Promise:
-        return info.context.loaders.articles_by_reporter_loader.load(root.id)
+        return info.context.loaders.get(Reporter, 'articles').load(root.id)
 
 
-class PublicationNode(DjangoObjectType):
+class PublicationNode(CachedNode, DjangoObjectType):
+    articles = OptimizedConnectionField('starter.types.ArticleNode', description='Return a connection of Article.')
     dataloader_articles = DjangoConnectionField('starter.types.ArticleNode', description='Return Article connection which contains pagination and Article information using dataloader.')
 
     class Meta:
@@ -54,11 +104,13 @@ class PublicationNode(DjangoObjectType):
         connection_class = CountableConnectionBase
 
     @staticmethod
+    @resolves_without_query()
     def resolve_dataloader_articles(root: Publication, info: ResolveInfo, **kwargs) -> Promise:
-        return info.context.loaders.articles_by_publication_loader.load(root.id)
+        return info.context.loaders.get(Publication, 'articles').load(root.id)
 
 
-class ArticleNode(DjangoObjectType):
+class ArticleNode(CachedNode, DjangoObjectType):
+    publications = OptimizedConnectionField('starter.types.PublicationNode', description='Return a connection of Publication.')
     dataloader_reporter = Field('starter.types.ReporterNode', description='Get a single Reporter detail using dataloader.')
 
     class Meta:
@@ -68,5 +120,57 @@ class ArticleNode(DjangoObjectType):
         connection_class = CountableConnectionBase
 
     @staticmethod
+    @resolves_without_query()
     def resolve_dataloader_reporter(root: Article, info: ResolveInfo, **kwargs) -> Promise:
-        return info.context.loaders.reporter_by_article_loader.load(root.id)
+        return info.context.loaders.get(Article, 'reporter').load(root.id)
+
+
+class NodesField(Field):
+    """
+    A list of nodes of the given types looked up by global ID, in the order of `ids`, null where a node does not exist,
+    is of another type or is filtered out by the `get_queryset` of its type, which must hold the access checks of the type like for `Node.Field`
+
+    The nodes are loaded with a query per node type, optimized like a connection, see `optimize_nodes_queryset`.
+    """
+
+    def __init__(self, *node_types, **kwargs):
+        super().__init__(List(Node), ids=List(NonNull(ID), required=True), **kwargs)
+        self.node_types = node_types
+
+    def get_resolver(self, parent_resolver):
+        return partial(self.resolve_nodes, {node_type._meta.name: node_type for node_type in self.node_types})
+
+    @staticmethod
+    def resolve_nodes(node_types: Dict[str, Any], root, info: ResolveInfo, ids: ListType[str]) -> ListType[Optional[Model]]:
+        keys = [_get_node_key(node_types, global_id) for global_id in ids]
+
+        pks_by_type = {}
+        for key in filter(None, keys):
+            pks_by_type.setdefault(key[0], []).append(key[1])
+
+        nodes = {}
+        for type_name, pks in pks_by_type.items():
+            node_type = node_types[type_name]
+            queryset = node_type.get_queryset(node_type._meta.model._default_manager.all(), info)
+            queryset = optimize_nodes_queryset(queryset, info, node_types.keys() - {type_name})
+            nodes.update(((type_name, node.pk), node) for node in queryset.filter(pk__in=pks))
+
+        return [nodes.get(key) for key in keys]
+
+
+def _get_node_key(node_types: Dict[str, Any], global_id: str) -> Optional[Tuple[str, Any]]:
+    try:
+        type_name, pk = from_global_id(global_id)
+        node_type = node_types[type_name]
+        return type_name, node_type._meta.model._meta.pk.to_python(pk)
+    except (KeyError, TypeError, ValueError, ValidationError):
+        return None  # Not the ID of a node
+
+
+class ItemError(ObjectType):
+    """
+    An error of a single item of a bulk mutation
+    """
+    index = Int(required=True, description='Position of the item in the input list.')
+    field = String(description='Field of the item which is invalid, null if the error concerns the whole item.')
+    messages = List(NonNull(String), required=True)